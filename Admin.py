@@ -1,14 +1,15 @@
-import base64
 import datetime
-import os
-
-import matplotlib.pyplot as plt
 
+from AutoAssign import auto_assign, batch_assign, suggest_doctor
+from Credentials import ADMIN_ROLE, DOCTOR_ROLE, get_credentials
+from DischargedArchive import PAGE_SIZE
 from Doctor import Doctor
 from Patient import Patient
+from PatientIndex import PatientIndex
 from Person import Person
-
-APPOINTMENT_HEADER = "Patient Name|Doctor Name|Appointment DateTime"
+from Reports import doctor_labels, get_report_aggregates, patient_columns
+from Scheduler import SUGGESTED_SLOTS, get_scheduler
+from Storage import get_storage
 
 class Admin(Person):
     def __init__(self, username, password, address='None'):
@@ -23,22 +24,14 @@ class Admin(Person):
         return self.__password
 
     def _persist_credentials(self):
-        encoded_password = base64.b64encode(self.__password.encode("utf-8")).decode("ascii")
-        with open("admin.txt", "w", encoding="utf-8") as f:
-            f.write(f"{self.__username}|{encoded_password}|{self.__address}\n")
+        """Stores the username, and password if one was set, in the credential store.
 
-    def _ensure_appointment_header(self, appointment_file: str):
-        if not os.path.exists(appointment_file) or os.path.getsize(appointment_file) == 0:
-            with open(appointment_file, "w", encoding="utf-8") as f:
-                f.write(APPOINTMENT_HEADER + "\n")
-            return
-
-        with open(appointment_file, "r", encoding="utf-8") as f:
-            existing = f.read().splitlines()
-
-        if existing and existing[0].strip() != APPOINTMENT_HEADER:
-            with open(appointment_file, "w", encoding="utf-8") as f:
-                f.write(APPOINTMENT_HEADER + "\n" + "\n".join(existing) + "\n")
+        admin.txt keeps the username and address; its password column is left empty.
+        """
+        get_credentials().save(self.__username, ADMIN_ROLE, password=self.__password)
+        self.__password = None
+        with open("admin.txt", "w", encoding="utf-8") as f:
+            f.write(f"{self.__username}||{self.__address}\n")
 
     def view(self,a_list):
         for index, item in enumerate(a_list):
@@ -54,7 +47,57 @@ class Admin(Person):
         except ValueError:
             print("Invalid index.")
 
-        return False 
+        return False
+
+    @staticmethod
+    def booking_confirmed(doctor_name, doctor_id, appointment_date, patient):
+        """Checks the doctor's schedule for the new appointment and asks before double booking.
+
+        Args:
+            doctor_name (str): Full name of the doctor.
+            doctor_id (int): ID of the doctor.
+            appointment_date (datetime): Start of the new appointment.
+            patient (Patient): The patient being booked.
+
+        Returns:
+            bool: True if the slot is free or the admin chose to book it anyway.
+        """
+        conflict = get_scheduler().conflict(doctor_name, appointment_date, doctor_id,
+                                            patient.full_name(), patient.record_id)
+        if conflict is None:
+            return True
+        print(f"Dr. {doctor_name} already has an appointment with {conflict.get_patient()} "
+              f"at {conflict.get_datetime().strftime('%Y/%m/%d %H:%M')}.")
+        return input("Book anyway? (yes/no): ").lower() == 'yes'
+
+    @staticmethod
+    def offer_free_slot(doctor, doctors=()):
+        """Lists the doctor's next free slots and offers to book the first one.
+
+        Args:
+            doctor (Doctor): The doctor being booked.
+            doctors: All doctors; an earlier free slot of another doctor with the
+                same speciality is pointed out.
+
+        Returns:
+            datetime: The first free slot if the admin takes it, otherwise None.
+        """
+        scheduler = get_scheduler()
+        slots = [start for start, _ in scheduler.free_slots([doctor], count=SUGGESTED_SLOTS)]
+        if not slots:
+            print(f"Dr. {doctor.full_name()} has no free slot within working hours this year.")
+            return None
+        print(f"Next free slots for Dr. {doctor.full_name()}: "
+              + ", ".join(start.strftime("%Y/%m/%d %H:%M") for start in slots))
+        others = [other for other in doctors if other is not doctor]
+        earlier = scheduler.free_slots_for_speciality(others, doctor.get_speciality(), end=slots[0], count=1)
+        if earlier:
+            start, other = earlier[0]
+            print(f"Dr. {other.full_name()} ({other.get_speciality()}) is free earlier, "
+                  f"on {start.strftime('%Y/%m/%d %H:%M')}.")
+        if input(f"Book the first free slot, {slots[0].strftime('%Y/%m/%d %H:%M')}? (yes/no): ").lower() == 'yes':
+            return slots[0]
+        return None
 
     # def login(self):
     #     """Admin login."""
@@ -80,7 +123,7 @@ class Admin(Person):
 
         return first_name, surname, speciality
     
-    def add_patients(self, patients):
+    def add_patients(self, patients, indexes=None):
         """Add a patient to the system."""
         print("-----Add Patient-----")
         try:
@@ -93,12 +136,14 @@ class Admin(Person):
             address = input("Enter the address: ")
             new_patient = Patient(f_name, l_name, age, mobile, postcode, address, symptoms)
             patients.append(new_patient)
-            Patient.append_patient_record('patients_file.txt', new_patient)
+            get_storage().add_patient(new_patient)
+            if indexes is not None:
+                indexes.add(new_patient)
             self.view(patients)
         except Exception as e:
             print(f"An error occurred while admitting the patient: {e}")
     
-    def add_view_symptoms(self, patients):
+    def add_view_symptoms(self, patients, indexes=None):
         """Add or view symptoms of a patient."""
         print("-----Add/View Symptoms for Patient-----")
         try:
@@ -115,11 +160,10 @@ class Admin(Person):
                     patients[index].add_symptoms(new_symptoms)
                     print("Successfully Added!")
                     self.view(patients)
-                    # Save updated patient to file
-                    with open('patients_file.txt', 'w') as f:
-                        f.write("Full Name|Age|Mobile|Postcode|Address|Symptoms|Doctor\n")
-                        for patient in patients:
-                            Patient.append_patient_record('patients_file.txt', patient)
+                    # Save updated patient
+                    get_storage().update_patient(patients[index], patients)
+                    if indexes is not None:
+                        indexes.update(patients[index])
                 elif op == '2':
                     print("Symptoms of the patient:")
                     patients[index].print_symptoms()
@@ -130,7 +174,7 @@ class Admin(Person):
         except ValueError:
             print("Invalid input. Please enter a valid number.")
             
-    def assign_doctor_patient(self, patients, doctors):
+    def assign_doctor_patient(self, patients, doctors, indexes=None):
         print("-----Assign Doctor to Patient-----")
         print("-----Patients-----")
         print(f'{"ID":^5}|{"Full Name":^30}|{"Age":^5}|{"Mobile":^15}|'
@@ -161,50 +205,61 @@ class Admin(Person):
         print('--------------------------------------------------')
         print('ID |          Full Name           |  Speciality')
         self.view(doctors)
+        if indexes is not None:
+            speciality, suggested = suggest_doctor(patients[patient_index], doctors, indexes)
+            if suggested is not None:
+                print(f"Suggested for {speciality}: ID {doctors.index(suggested) + 1} - Dr. {suggested.full_name()} "
+                      f"(fewest patients and upcoming appointments)")
         try:
             doctor_index = int(input('Please enter the doctor ID: ')) - 1
             if self.find_index(doctor_index, doctors):
-                # Get appointment date and time
-                appointment_year = int(input("\nEnter the appointment year (e.g., 2026): "))
-                appointment_month = int(input("Enter the appointment month (e.g., 2): "))
-                appointment_day = int(input("Enter the appointment day (e.g., 12): "))
-                appointment_hour = int(input("Enter the appointment hour (0-23, e.g., 12): "))
-                appointment_minute = int(input("Enter the appointment minute (0-59, e.g., 00): "))
+                appointment_date = self.offer_free_slot(doctors[doctor_index], doctors)
+                if appointment_date is None:
+                    # Get appointment date and time
+                    appointment_year = int(input("\nEnter the appointment year (e.g., 2026): "))
+                    appointment_month = int(input("Enter the appointment month (e.g., 2): "))
+                    appointment_day = int(input("Enter the appointment day (e.g., 12): "))
+                    appointment_hour = int(input("Enter the appointment hour (0-23, e.g., 12): "))
+                    appointment_minute = int(input("Enter the appointment minute (0-59, e.g., 00): "))
                 
-                # Validate hour and minute
-                if appointment_hour < 0 or appointment_hour > 23:
-                    print("Invalid hour. Please enter a value between 0 and 23.")
-                    return
-                if appointment_minute < 0 or appointment_minute > 59:
-                    print("Invalid minute. Please enter a value between 0 and 59.")
-                    return
+                    # Validate hour and minute
+                    if appointment_hour < 0 or appointment_hour > 23:
+                        print("Invalid hour. Please enter a value between 0 and 23.")
+                        return
+                    if appointment_minute < 0 or appointment_minute > 59:
+                        print("Invalid minute. Please enter a value between 0 and 59.")
+                        return
                 
-                appointment_date = datetime.datetime(appointment_year, appointment_month, appointment_day, appointment_hour, appointment_minute)
-                patients[patient_index].link(doctors[doctor_index].full_name(), appointment_date)
-                doctors[doctor_index].add_patient(patients[patient_index].full_name())
+                    appointment_date = datetime.datetime(appointment_year, appointment_month, appointment_day, appointment_hour, appointment_minute)
+                if not self.booking_confirmed(doctors[doctor_index].full_name(), doctors[doctor_index].record_id,
+                                              appointment_date, patients[patient_index]):
+                    print('The patient was not assigned.')
+                    return
+                patients[patient_index].link(doctors[doctor_index].full_name(), appointment_date,
+                                             doctors[doctor_index].record_id)
+                doctors[doctor_index].add_patient(patients[patient_index])
                 doctors[doctor_index].add_appointment(appointment_date)
+                if indexes is not None:
+                    indexes.update(patients[patient_index])
                 print(f'The patient is now assigned to the doctor on {appointment_date.strftime("%Y/%m/%d %H:%M")}.')
                 
-                # Save appointment to year-specific file
-                appointment_file = f"{appointment_year}_appointments.txt"
+                storage = get_storage()
+                # Save appointment
                 try:
-                    self._ensure_appointment_header(appointment_file)
-                    with open(appointment_file, 'a') as f:
-                        f.write(f"{patients[patient_index].full_name()}|{doctors[doctor_index].full_name()}|{appointment_date.strftime('%Y/%m/%d %H:%M')}\n")
+                    storage.add_appointment(patients[patient_index].full_name(), doctors[doctor_index].full_name(), appointment_date,
+                                            patient_id=patients[patient_index].record_id,
+                                            doctor_id=doctors[doctor_index].record_id)
                 except IOError as e:
                     print(f"Error saving appointment: {e}")
                 
-                # Save updated patient to file
-                with open('patients_file.txt', 'w') as f:
-                    f.write("Full Name|Age|Mobile|Postcode|Address|Symptoms|Doctor\n")
-                for patient in patients:
-                    Patient.append_patient_record('patients_file.txt', patient)
+                # Save updated patient
+                storage.update_patient(patients[patient_index], patients)
             else:
                 print('The ID entered was not found.')
         except ValueError:
             print('The ID entered is incorrect')
                 
-    def relocate_update_appointment_doctor_patient(self, patients, doctors):
+    def relocate_update_appointment_doctor_patient(self, patients, doctors, indexes=None):
         """Relocate doctor or update appointment for a patient."""
         print("-----Relocate or Update Appointment for Doctor-----")
         print("-----List of Patients-----")
@@ -228,6 +283,9 @@ class Admin(Person):
                 return
             
             print(f"Current doctor: Dr. {patients[patient_index].get_doctor()}")
+            current = get_storage().appointment_index().current_for(patients[patient_index].full_name(),
+                                                                    patients[patient_index].record_id)
+            print(f"Current appointment: {current.datetime_text() if current else 'No appointment'}")
             print("\nWhat would you like to do?")
             print(" 1 - Relocate to a different doctor")
             print(" 2 - Update appointment only")
@@ -247,43 +305,51 @@ class Admin(Person):
                     old_doctor_name = patients[patient_index].get_doctor()
                     new_doctor_name = doctors[new_doctor_index].full_name()
                     
-                    # Get appointment date and time
-                    appointment_year = int(input("\nEnter the appointment year (e.g., 2026): "))
-                    appointment_month = int(input("Enter the appointment month (e.g., 2): "))
-                    appointment_day = int(input("Enter the appointment day (e.g., 12): "))
-                    appointment_hour = int(input("Enter the appointment hour (0-23, e.g., 12): "))
-                    appointment_minute = int(input("Enter the appointment minute (0-59, e.g., 00): "))
+                    appointment_date = self.offer_free_slot(doctors[new_doctor_index], doctors)
+                    if appointment_date is None:
+                        # Get appointment date and time
+                        appointment_year = int(input("\nEnter the appointment year (e.g., 2026): "))
+                        appointment_month = int(input("Enter the appointment month (e.g., 2): "))
+                        appointment_day = int(input("Enter the appointment day (e.g., 12): "))
+                        appointment_hour = int(input("Enter the appointment hour (0-23, e.g., 12): "))
+                        appointment_minute = int(input("Enter the appointment minute (0-59, e.g., 00): "))
                     
-                    # Validate hour and minute
-                    if appointment_hour < 0 or appointment_hour > 23:
-                        print("Invalid hour. Please enter a value between 0 and 23.")
-                        return
-                    if appointment_minute < 0 or appointment_minute > 59:
-                        print("Invalid minute. Please enter a value between 0 and 59.")
-                        return
+                        # Validate hour and minute
+                        if appointment_hour < 0 or appointment_hour > 23:
+                            print("Invalid hour. Please enter a value between 0 and 23.")
+                            return
+                        if appointment_minute < 0 or appointment_minute > 59:
+                            print("Invalid minute. Please enter a value between 0 and 59.")
+                            return
                     
-                    appointment_date = datetime.datetime(appointment_year, appointment_month, appointment_day, appointment_hour, appointment_minute)
+                        appointment_date = datetime.datetime(appointment_year, appointment_month, appointment_day, appointment_hour, appointment_minute)
+                    if not self.booking_confirmed(new_doctor_name, doctors[new_doctor_index].record_id,
+                                                  appointment_date, patients[patient_index]):
+                        print('The patient was not relocated.')
+                        return
                     
                     # Update patient's doctor and appointment
-                    patients[patient_index].link(new_doctor_name, appointment_date)
-                    doctors[new_doctor_index].add_patient(patients[patient_index].full_name())
+                    for doctor in doctors:
+                        if doctor.record_id == patients[patient_index].doctor_id:
+                            doctor.remove_patient(patients[patient_index])
+                    patients[patient_index].link(new_doctor_name, appointment_date, doctors[new_doctor_index].record_id)
+                    doctors[new_doctor_index].add_patient(patients[patient_index])
+                    if indexes is not None:
+                        indexes.update(patients[patient_index])
                     
                     print(f'Successfully relocated from Dr. {old_doctor_name} to Dr. {new_doctor_name} on {appointment_date.strftime("%Y/%m/%d %H:%M")}.')
                     
-                    # Save appointment to year-specific file
-                    appointment_file = f"{appointment_year}_appointments.txt"
+                    storage = get_storage()
+                    # Save appointment
                     try:
-                        self._ensure_appointment_header(appointment_file)
-                        with open(appointment_file, 'a') as f:
-                            f.write(f"{patients[patient_index].full_name()}|{new_doctor_name}|{appointment_date.strftime('%Y/%m/%d %H:%M')}\n")
+                        storage.add_appointment(patients[patient_index].full_name(), new_doctor_name, appointment_date,
+                                                patient_id=patients[patient_index].record_id,
+                                                doctor_id=doctors[new_doctor_index].record_id)
                     except IOError as e:
                         print(f"Error saving appointment: {e}")
                     
-                    # Save updated patient to file
-                    with open('patients_file.txt', 'w') as f:
-                        f.write("Full Name|Age|Mobile|Postcode|Address|Symptoms|Doctor\n")
-                    for patient in patients:
-                        Patient.append_patient_record('patients_file.txt', patient)
+                    # Save updated patient
+                    storage.update_patient(patients[patient_index], patients)
                         
                 except ValueError:
                     print('Invalid input. Please enter valid numbers.')
@@ -291,32 +357,41 @@ class Admin(Person):
             elif choice == '2':
                 # Update appointment only
                 try:
-                    appointment_year = int(input("\nEnter the new appointment year (e.g., 2026): "))
-                    appointment_month = int(input("Enter the new appointment month (e.g., 2): "))
-                    appointment_day = int(input("Enter the new appointment day (e.g., 12): "))
-                    appointment_hour = int(input("Enter the new appointment hour (0-23, e.g., 12): "))
-                    appointment_minute = int(input("Enter the new appointment minute (0-59, e.g., 00): "))
+                    appointment_date = None
+                    current_doctor = next((doctor for doctor in doctors
+                                           if doctor.record_id == patients[patient_index].doctor_id), None)
+                    if current_doctor is not None:
+                        appointment_date = self.offer_free_slot(current_doctor)
+                    if appointment_date is None:
+                        appointment_year = int(input("\nEnter the new appointment year (e.g., 2026): "))
+                        appointment_month = int(input("Enter the new appointment month (e.g., 2): "))
+                        appointment_day = int(input("Enter the new appointment day (e.g., 12): "))
+                        appointment_hour = int(input("Enter the new appointment hour (0-23, e.g., 12): "))
+                        appointment_minute = int(input("Enter the new appointment minute (0-59, e.g., 00): "))
                     
-                    # Validate hour and minute
-                    if appointment_hour < 0 or appointment_hour > 23:
-                        print("Invalid hour. Please enter a value between 0 and 23.")
-                        return
-                    if appointment_minute < 0 or appointment_minute > 59:
-                        print("Invalid minute. Please enter a value between 0 and 59.")
-                        return
+                        # Validate hour and minute
+                        if appointment_hour < 0 or appointment_hour > 23:
+                            print("Invalid hour. Please enter a value between 0 and 23.")
+                            return
+                        if appointment_minute < 0 or appointment_minute > 59:
+                            print("Invalid minute. Please enter a value between 0 and 59.")
+                            return
                     
-                    appointment_date = datetime.datetime(appointment_year, appointment_month, appointment_day, appointment_hour, appointment_minute)
+                        appointment_date = datetime.datetime(appointment_year, appointment_month, appointment_day, appointment_hour, appointment_minute)
                     doctor_name = patients[patient_index].get_doctor()
+                    if not self.booking_confirmed(doctor_name, patients[patient_index].doctor_id,
+                                                  appointment_date, patients[patient_index]):
+                        print('The appointment was not changed.')
+                        return
                     
                     patients[patient_index].appointment_date = appointment_date
                     print(f'Appointment updated to {appointment_date.strftime("%Y/%m/%d %H:%M")} with Dr. {doctor_name}.')
                     
-                    # Save updated appointment to year-specific file
-                    appointment_file = f"{appointment_year}_appointments.txt"
+                    # Save updated appointment
                     try:
-                        self._ensure_appointment_header(appointment_file)
-                        with open(appointment_file, 'a') as f:
-                            f.write(f"{patients[patient_index].full_name()}|{doctor_name}|{appointment_date.strftime('%Y/%m/%d %H:%M')} (Updated)\n")
+                        get_storage().add_appointment(patients[patient_index].full_name(), doctor_name, appointment_date, updated=True,
+                                                      patient_id=patients[patient_index].record_id,
+                                                      doctor_id=patients[patient_index].doctor_id)
                     except IOError as e:
                         print(f"Error saving appointment: {e}")
                 except ValueError:
@@ -327,7 +402,7 @@ class Admin(Person):
         except ValueError:
             print('Invalid input. Please enter valid numbers.')
     
-    def update_patients_details(self, patients):
+    def update_patients_details(self, patients, indexes=None):
         """Update details of a patient."""
         print("-----Update Patient Details-----")
         self.view(patients)
@@ -375,17 +450,27 @@ class Admin(Person):
             else:
                 print("Invalid option.")
             
-            # Save updated patient to file
-            with open('patients_file.txt', 'w') as f:
-                f.write("Full Name|Age|Mobile|Postcode|Address|Symptoms|Doctor\n")
-            for patient in patients:
-                Patient.append_patient_record('patients_file.txt', patient)
+            # Save updated patient
+            get_storage().update_patient(patients[patient_index], patients)
+            if indexes is not None:
+                indexes.update(patients[patient_index])
                 
         except ValueError:
             print("Invalid input. Please enter a valid number.")
     
-    def patient_management(self, patients, doctors, discharged_patients):
-        """Manage patient-related operations."""
+    def patient_management(self, patients, doctors, discharged_patients=None, indexes=None):
+        """Manage patient-related operations.
+
+        Args:
+            patients (list): The active patients.
+            doctors (list): The doctors.
+            discharged_patients (list): Optional list that patients discharged here are appended to;
+                the archive itself is paged from storage.
+            indexes (PatientIndex): Lookups over patients, kept up to date by
+                every operation; built from patients when not given.
+        """
+        if indexes is None:
+            indexes = PatientIndex(patients)
         print("-----Patient Management-----")
         print('Choose the operation:')
         print(' 1 - Add patient')
@@ -397,30 +482,79 @@ class Admin(Person):
         print(' 7 - View Group of patients by family')
         print(' 8 - Update patient details')
         print(' 9 - Relocate or update appointment doctor for patient')
+        print(' 10 - Auto-assign waiting patients by speciality')
+        print(' 11 - Batch-assign waiting patients to the earliest free slots')
         print(' 0 - Back')
 
         op = input('Which operation do you want: ')
         
         if op == '1':
-            self.add_patients(patients)
+            self.add_patients(patients, indexes)
             
         if op == '2':
-            self.add_view_symptoms(patients)
+            self.add_view_symptoms(patients, indexes)
                 
         if op == '3':  
-            self.assign_doctor_patient(patients, doctors)
+            self.assign_doctor_patient(patients, doctors, indexes)
         if op == '4':
-            self.discharge(patients, discharged_patients)  
+            self.discharge(patients, discharged_patients, indexes)
         if op == '5':
             self.view_patient(patients)
         if op == '6':
-            self.view_discharge(discharged_patients)
+            self.view_discharge()
         if op == '7':
-            self.same_family(patients)
+            self.same_family(patients, indexes)
         if op == '8':
-            self.update_patients_details(patients)
+            self.update_patients_details(patients, indexes)
         if op == '9':
-            self.relocate_update_appointment_doctor_patient(patients, doctors)
+            self.relocate_update_appointment_doctor_patient(patients, doctors, indexes)
+        if op == '10':
+            self.auto_assign_doctors(patients, doctors, indexes)
+        if op == '11':
+            self.batch_assign_doctors(patients, doctors, indexes)
+
+    def auto_assign_doctors(self, patients, doctors, indexes):
+        """Assigns every patient without a doctor to the least-loaded doctor of the speciality their symptoms call for."""
+        print("-----Auto-assign Doctors-----")
+        waiting = [patient for patient in patients if patient.get_doctor() == "None"]
+        if not waiting:
+            print("Every patient already has a doctor.")
+            return
+        if input(f"Assign {len(waiting)} waiting patients by speciality? (yes/no): ").lower() != 'yes':
+            return
+        try:
+            booked, unassigned = auto_assign(waiting, patients, doctors, indexes)
+        except IOError as e:
+            print(f"Error saving appointment: {e}")
+            return
+        for patient, doctor, appointment_date in booked:
+            print(f"  {patient.full_name()} -> Dr. {doctor.full_name()} ({doctor.get_speciality()}) "
+                  f"on {appointment_date.strftime('%Y/%m/%d %H:%M')}")
+        for patient, speciality in unassigned:
+            print(f"  {patient.full_name()}: no {speciality} doctor with a free slot")
+        print(f"{len(booked)} patients assigned, {len(unassigned)} still waiting.")
+
+    def batch_assign_doctors(self, patients, doctors, indexes):
+        """Books every patient without a doctor into the earliest free slot of their speciality, saving them all at once."""
+        print("-----Batch-assign Doctors-----")
+        waiting = [patient for patient in patients if patient.get_doctor() == "None"]
+        if not waiting:
+            print("Every patient already has a doctor.")
+            return
+        if input(f"Book {len(waiting)} waiting patients into the earliest free slots? (yes/no): ").lower() != 'yes':
+            return
+        try:
+            booked, unassigned = batch_assign(waiting, patients, doctors, indexes)
+        except IOError as e:
+            print(f"Error saving appointments: {e}")
+            return
+        now = datetime.datetime.now()
+        for patient, speciality in unassigned:
+            print(f"  {patient.full_name()}: no {speciality} doctor with a free slot")
+        if booked:
+            wait = sum((appointment_date - now for _, _, appointment_date in booked), datetime.timedelta())
+            print(f"Average wait: {wait.total_seconds() / 86400 / len(booked):.1f} days.")
+        print(f"{len(booked)} patients booked, {len(unassigned)} still waiting.")
 
     def doctor_management(self, doctors):
         """Manage doctor-related operations."""
@@ -445,9 +579,23 @@ class Admin(Person):
             name_exists = any(first_name == doctor.get_first_name() and surname == doctor.get_surname() for doctor in doctors)
             if name_exists:
                 print('Name already exists.')
-            else:
-                doctors.append(Doctor(first_name, surname, speciality))
-                print('Doctor registered.')
+                return
+            username = input('Enter the username (0 to cancel): ').strip()
+            if username == '0':
+                print("Registration Cancelled")
+                return
+            if not username or not get_credentials().is_available(username, DOCTOR_ROLE):
+                print('Username is empty or already taken.')
+                return
+            password = input('Enter the password: ')
+            if not password:
+                print('Password cannot be empty.')
+                return
+            doctor = Doctor(first_name, surname, speciality, username, password)
+            doctor._persist_credentials()
+            doctors.append(doctor)
+            get_report_aggregates().add_doctor(doctor)
+            print('Doctor registered.')
 
         elif op == '2':
             print("-----List of Doctors-----")
@@ -483,9 +631,12 @@ class Admin(Person):
                     doctors[index].set_surname(new_surname)
                 elif op == 3:
                     speciality = input("Enter speciality: ")
+                    get_report_aggregates().change_speciality(doctors[index].get_speciality(), speciality)
                     doctors[index].set_speciality(speciality)
                 else:
                     print("Error: Invalid option")
+                if op in (1, 2, 3):
+                    get_storage().update_doctor(doctors[index])
             except ValueError:
                 print("Please enter a valid number.")
 
@@ -496,7 +647,9 @@ class Admin(Person):
             try:
                 doctor_index = int(input('Enter the ID of the doctor to be deleted: ')) - 1
                 if self.find_index(doctor_index, doctors):
-                    del doctors[doctor_index]
+                    doctor = doctors.pop(doctor_index)
+                    get_storage().delete_doctor(doctor, doctors)
+                    get_report_aggregates().remove_doctor(doctor)
                     print("Doctor deleted.")
                 else:
                     print('The ID entered is incorrect')
@@ -514,46 +667,66 @@ class Admin(Person):
                 f'{"Postcode":^10}|{"Address":^15}|{"Symptoms":^40}|{"Doctor Name":^10}')
         self.view(patients)
 
-    def discharge(self, patients, discharged_patients):
+    def discharge(self, patients, discharged_patients=None, indexes=None):
         """Discharge a patient."""
         print("-----Discharge Patient-----")
         try:
             self.view(patients)
             patient_index = int(input('Please enter the patient ID: ')) - 1
             if self.find_index(patient_index, patients):
-                discharged_patients.append(patients[patient_index])
-                
-                # Save discharged patient to discharged_patient.txt using static method
-                Patient.append_discharged_patient(patients[patient_index])
+                patient = patients[patient_index]
+                if discharged_patients is not None:
+                    discharged_patients.append(patient)
                 
-                print(f"{patients[patient_index].full_name()} has been discharged.")
+                print(f"{patient.full_name()} has been discharged.")
                 del patients[patient_index]
+                if indexes is not None:
+                    indexes.remove(patient)
                 
-                # Update patients_file.txt to remove the discharged patient
-                with open('patients_file.txt', 'w') as f:
-                    f.write("Full Name|Age|Mobile|Postcode|Address|Symptoms|Doctor\n")
-                for patient in patients:
-                    Patient.append_patient_record('patients_file.txt', patient)
+                # Archive the discharged patient and remove it from the active patients
+                get_storage().discharge_patient(patient, patients)
             else:
                 print('The ID entered is incorrect')
         except ValueError:
             print('Invalid patient ID.')
 
-    def view_discharge(self, discharged_patients):
-        """View list of discharged patients."""
-        print("-----Discharged Patients-----")
-        print(f'{"ID":^5}|{"Full Name":^30}|{"Age":^5}|{"Mobile":^15}|'
-                f'{"Postcode":^10}|{"Address":^15}|{"Symptoms":^40}|{"Doctor name":^10}')
-        self.view(discharged_patients)
+    def view_discharge(self):
+        """Page through the discharged patients, optionally searching by patient or doctor name."""
+        storage = get_storage()
+        page = 0
+        search = ""
+        while True:
+            total = storage.discharged_count(search)
+            pages = max((total + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+            page = min(max(page, 0), pages - 1)
+            print("-----Discharged Patients-----")
+            if search:
+                print(f"Matching '{search}'")
+            print(f'{"ID":^5}|{"Full Name":^30}|{"Age":^5}|{"Mobile":^15}|'
+                    f'{"Postcode":^10}|{"Address":^15}|{"Symptoms":^40}|{"Doctor name":^10}')
+            for patient in storage.discharged_page(page, PAGE_SIZE, search):
+                print(f'{patient.record_id or "":^5}|{patient}')
+            print(f"Page {page + 1} of {pages} ({total} patients)")
+
+            op = input("n - Next page, p - Previous page, s - Search, 0 - Back: ").strip().lower()
+            if op == 'n':
+                page += 1
+            elif op == 'p':
+                page -= 1
+            elif op == 's':
+                search = input("Search by patient or doctor name (empty to clear): ").strip()
+                page = 0
+            elif op == '0':
+                return
+            else:
+                print("Invalid option.")
 
-    def same_family(self, patients):
+    def same_family(self, patients, indexes=None):
         """Group patients by family (surname)."""
-        same_family = {}
-        for patient in patients:
-            patient_surname = patient.get_surname()
-            same_family.setdefault(patient_surname, []).append(patient)
+        if indexes is None:
+            indexes = PatientIndex(patients)
 
-        for family_name, family_members in same_family.items():
+        for family_name, family_members in indexes.families().items():
             print(f"Family Name: {family_name}")
             for patient in family_members:
                 print(patient)
@@ -597,13 +770,16 @@ class Admin(Person):
                 if not new_username:
                     print("Username cannot be empty.")
                     continue
+                if not get_credentials().is_available(new_username, ADMIN_ROLE):
+                    print("Username is already taken.")
+                    continue
                 self.__username = new_username
                 self._persist_credentials()
                 print("Username updated.")
 
             elif op == '2':
                 current_password = input("Enter current password: ")
-                if current_password != self.__password:
+                if get_credentials().authenticate(self.__username, current_password) is None:
                     print("Current password is incorrect.")
                     continue
                 new_password = input("Enter new password: ")
@@ -626,8 +802,18 @@ class Admin(Person):
             else:
                 print("Invalid option.")
 
-    def get_management_report(self, doctors, patients):
-        """Generate management reports."""
+    def get_management_report(self, doctors, patients, indexes=None):
+        """Generate management reports.
+
+        Args:
+            doctors (list): The doctors.
+            patients (list): The active patients.
+            indexes (PatientIndex): Lookups over patients, kept up to date by
+                every change; lets the reports reuse their counters and snapshot
+                of the patients.
+        """
+        if indexes is None:
+            indexes = PatientIndex(patients)
         print("-----Management Reports-----")
         print('Choose the operation:')
         print(' 1 - Total number of doctors in the system')
@@ -636,18 +822,21 @@ class Admin(Person):
         print(' 4 - Total number of patients based on illness type')
         print(' 5 - Total appointments')
         print(' 6 - View all appointments by year and month')
+        print(' 7 - Total number of patients per age group')
+        print(' 8 - Double-booked appointments')
         print(' 0 - Back')
         op = input('Choose an option: ')
+        if op in ('1', '2', '3', '4', '7'):
+            # Imported on demand so the login prompt does not wait for matplotlib
+            import matplotlib.pyplot as plt
+        aggregates = get_report_aggregates().attach(doctors, patients, indexes)
         try:
             if op == '1':
                 total_doctors = len(doctors)
                 print(f"\nThe total number of doctors: {total_doctors}")
                 
                 # Count doctors by speciality
-                speciality_counts = {}
-                for doctor in doctors:
-                    speciality = doctor.get_speciality()
-                    speciality_counts[speciality] = speciality_counts.get(speciality, 0) + 1
+                speciality_counts = aggregates.doctors_per_speciality()
                 
                 # Create visualization
                 fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
@@ -672,20 +861,18 @@ class Admin(Person):
                 
             elif op == '2':
                 print("\nTotal number of patients per doctor:")
-                doctor_names = []
-                total_patients_list = []
-                
-                for doctor in doctors:
-                    total_patients = doctor.get_total_patients()
-                    doctor_names.append(doctor.full_name())
-                    total_patients_list.append(total_patients)
-                    print(f"  {doctor.full_name()}: {total_patients} patients")
+                labels = doctor_labels(doctors)
+                doctor_names = [labels[doctor.record_id] for doctor in doctors]
+                total_patients_list = aggregates.patients_per_doctor(doctors)
+                for doctor_name, total_patients in zip(doctor_names, total_patients_list):
+                    print(f"  {doctor_name}: {total_patients} patients")
                 
                 if doctor_names:
                     # Create bar chart with colors
                     plt.figure(figsize=(12, 6))
                     colors = plt.cm.viridis(range(len(doctor_names)))
-                    bars = plt.bar(doctor_names, total_patients_list, color=colors, edgecolor='black', linewidth=1.2)
+                    bars = plt.bar(range(len(doctor_names)), total_patients_list, color=colors, edgecolor='black',
+                                   linewidth=1.2)
                     
                     # Add value labels on top of bars
                     for bar in bars:
@@ -696,7 +883,7 @@ class Admin(Person):
                     plt.xlabel('Doctors', fontsize=12, fontweight='bold')
                     plt.ylabel('Number of Patients', fontsize=12, fontweight='bold')
                     plt.title('Total Patients per Doctor', fontsize=14, fontweight='bold')
-                    plt.xticks(rotation=45, ha='right')
+                    plt.xticks(range(len(doctor_names)), doctor_names, rotation=45, ha='right')
                     plt.grid(axis='y', alpha=0.3, linestyle='--')
                     plt.tight_layout()
                     plt.show()
@@ -704,28 +891,7 @@ class Admin(Person):
             elif op == '3':
                 print("\nTotal number of appointments per month per doctor:")
                 
-                # Read appointments from year-specific files
-                import glob
-                appointments_data = {}
-                
-                appointment_files = glob.glob('*_appointments.txt')
-                for file in appointment_files:
-                    try:
-                        with open(file, 'r') as f:
-                            for line in f:
-                                if line.strip() == APPOINTMENT_HEADER:
-                                    continue
-                                data = line.strip().split('|')
-                                if len(data) >= 3:
-                                    doctor_name = data[1].strip()
-                                    appointment_datetime = data[2].strip().split()[0]  # Get date part
-                                    year_month = '/'.join(appointment_datetime.split('/')[:2])
-                                    
-                                    if doctor_name not in appointments_data:
-                                        appointments_data[doctor_name] = {}
-                                    appointments_data[doctor_name][year_month] = appointments_data[doctor_name].get(year_month, 0) + 1
-                    except FileNotFoundError:
-                        continue
+                appointments_data = aggregates.appointments_per_doctor_month(doctors)
                 
                 if appointments_data:
                     # Print summary
@@ -734,7 +900,7 @@ class Admin(Person):
                         for month, count in sorted(months.items()):
                             month_names = ['', 'January', 'February', 'March', 'April', 'May', 'June',
                                         'July', 'August', 'September', 'October', 'November', 'December']
-                            year, month_num = month.split('/')
+                            year, month_num = month
                             month_name = month_names[int(month_num)]
                             print(f"  - {month_name} {year}: {count} appointments")
                     
@@ -763,7 +929,7 @@ class Admin(Person):
                     # Format x-axis labels
                     month_labels = []
                     for month in all_months:
-                        year, month_num = month.split('/')
+                        year, month_num = month
                         month_names = ['', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
                                     'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
                         month_labels.append(f"{month_names[int(month_num)]} {year}")
@@ -773,7 +939,7 @@ class Admin(Person):
                     ax.set_title('Total Appointments per Month per Doctor', fontsize=14, fontweight='bold')
                     ax.set_xticks(x)
                     ax.set_xticklabels(month_labels, rotation=45, ha='right')
-                    ax.legend()
+                    ax.legend(loc='upper left', bbox_to_anchor=(1.01, 1), fontsize=8)
                     ax.grid(axis='y', alpha=0.3, linestyle='--')
                     plt.tight_layout()
                     plt.show()
@@ -781,17 +947,12 @@ class Admin(Person):
                     print("\nNo appointments found.")
 
             elif op == '4':
-                symptom_counts = {}
-                for patient in patients:
-                    for symptom in patient.get_symptoms():
-                        symptom = symptom.strip()
-                        if symptom:
-                            symptom_counts[symptom] = symptom_counts.get(symptom, 0) + 1
+                symptom_counts = aggregates.patients_per_symptom()
 
                 if symptom_counts:
                     # Print the total number of patients with each symptom
                     print("\nTotal number of patients per symptom:")
-                    for symptom, total in sorted(symptom_counts.items(), key=lambda x: x[1], reverse=True):
+                    for symptom, total in symptom_counts.items():
                         print(f'  {symptom}: {total} patients')
 
                     # Prepare data for visualization
@@ -833,41 +994,15 @@ class Admin(Person):
             elif op == '5':
                 print("-----View All Appointments-----")
                 try:
-                    import glob
                     appointments = {}
                     
-                    # Read appointments from all year-specific files
-                    appointment_files = glob.glob('*_appointments.txt')
-                    
-                    if not appointment_files:
-                        print("No appointment files found.")
-                        return
-                    
-                    for file in appointment_files:
-                        try:
-                            with open(file, 'r') as f:
-                                for line in f:
-                                    data = line.strip().split('|')
-                                    if len(data) >= 3:
-                                        patient_name = data[0].strip()
-                                        doctor_name = data[1].strip()
-                                        appointment_datetime = data[2].strip()
-                                        
-                                        # Parse date to get year and month
-                                        # Format: YYYY/MM/DD HH:MM or YYYY/MM/DD HH:MM (Updated)
-                                        date_part = appointment_datetime.split()[0]  # Get YYYY/MM/DD
-                                        year_month = '/'.join(date_part.split('/')[:2])  # Get YYYY/MM
-                                        
-                                        # Group by year/month
-                                        if year_month not in appointments:
-                                            appointments[year_month] = []
-                                        appointments[year_month].append({
-                                            'patient': patient_name,
-                                            'doctor': doctor_name,
-                                            'datetime': appointment_datetime
-                                        })
-                        except FileNotFoundError:
-                            continue
+                    # Read appointments from storage
+                    for appointment in get_storage().load_current_appointments():
+                        # Group by year/month
+                        year_month = (appointment.get_datetime().year, appointment.get_datetime().month)
+                        if year_month not in appointments:
+                            appointments[year_month] = []
+                        appointments[year_month].append(appointment)
                     
                     if not appointments:
                         print("No appointments found.")
@@ -875,7 +1010,7 @@ class Admin(Person):
                     
                     # Display appointments grouped by year and month
                     for year_month in sorted(appointments.keys()):
-                        year, month = year_month.split('/')
+                        year, month = year_month
                         month_names = ['', 'January', 'February', 'March', 'April', 'May', 'June',
                                     'July', 'August', 'September', 'October', 'November', 'December']
                         month_name = month_names[int(month)]
@@ -886,48 +1021,22 @@ class Admin(Person):
                         print("-" * 80)
                         
                         for appointment in appointments[year_month]:
-                            print(f'{appointment["patient"]:^30}|{appointment["doctor"]:^30}|{appointment["datetime"]:^18}')
+                            print(appointment)
                             
                 except Exception as e:
                     print(f"Error reading appointments: {e}")
             elif op == '6':
                 print("-----View All Appointments by Year and Month-----")
                 try:
-                    import glob
                     appointments = {}
                     
-                    # Read appointments from all year-specific files
-                    appointment_files = glob.glob('*_appointments.txt')
-                    
-                    if not appointment_files:
-                        print("No appointment files found.")
-                        return
-                    
-                    for file in appointment_files:
-                        try:
-                            with open(file, 'r') as f:
-                                for line in f:
-                                    data = line.strip().split('|')
-                                    if len(data) >= 3:
-                                        patient_name = data[0].strip()
-                                        doctor_name = data[1].strip()
-                                        appointment_datetime = data[2].strip()
-                                        
-                                        # Parse date to get year and month
-                                        # Format: YYYY/MM/DD HH:MM or YYYY/MM/DD HH:MM (Updated)
-                                        date_part = appointment_datetime.split()[0]  # Get YYYY/MM/DD
-                                        year_month = '/'.join(date_part.split('/')[:2])  # Get YYYY/MM
-                                        
-                                        # Group by year/month
-                                        if year_month not in appointments:
-                                            appointments[year_month] = []
-                                        appointments[year_month].append({
-                                            'patient': patient_name,
-                                            'doctor': doctor_name,
-                                            'datetime': appointment_datetime
-                                        })
-                        except FileNotFoundError:
-                            continue
+                    # Read appointments from storage
+                    for appointment in get_storage().load_current_appointments():
+                        # Group by year/month
+                        year_month = (appointment.get_datetime().year, appointment.get_datetime().month)
+                        if year_month not in appointments:
+                            appointments[year_month] = []
+                        appointments[year_month].append(appointment)
                     
                     if not appointments:
                         print("No appointments found.")
@@ -935,7 +1044,7 @@ class Admin(Person):
                     
                     # Display appointments grouped by year and month
                     for year_month in sorted(appointments.keys()):
-                        year, month = year_month.split('/')
+                        year, month = year_month
                         month_names = ['', 'January', 'February', 'March', 'April', 'May', 'June',
                                     'July', 'August', 'September', 'October', 'November', 'December']
                         month_name = month_names[int(month)]
@@ -946,10 +1055,56 @@ class Admin(Person):
                         print("-" * 80)
                         
                         for appointment in appointments[year_month]:
-                            print(f'{appointment["patient"]:^30}|{appointment["doctor"]:^30}|{appointment["datetime"]:^18}')
+                            print(appointment)
                             
                 except Exception as e:
                     print(f"Error reading appointments: {e}")
+            elif op == '7':
+                columns = patient_columns(patients, indexes)
+                age_counts = columns.age_histogram()
+                symptom_names, age_groups, cells = columns.symptoms_by_age()
+
+                if len(columns):
+                    print("\nTotal number of patients per age group:")
+                    for age_group, total in age_counts.items():
+                        print(f"  {age_group}: {total} patients")
+                    print("\nPatients per symptom and age group:")
+                    print(f'  {"Symptom":<24}' + "".join(f"{age_group:>8}" for age_group in age_groups))
+                    for symptom, row in zip(symptom_names, cells.tolist()):
+                        print(f"  {symptom:<24}" + "".join(f"{count:>8}" for count in row))
+
+                    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
+                    ax1.bar(list(age_counts), list(age_counts.values()), color='#3498db', edgecolor='black')
+                    ax1.set_xlabel('Age Group', fontsize=12, fontweight='bold')
+                    ax1.set_ylabel('Number of Patients', fontsize=12, fontweight='bold')
+                    ax1.set_title('Patients per Age Group', fontsize=14, fontweight='bold')
+                    ax1.grid(axis='y', alpha=0.3, linestyle='--')
+
+                    image = ax2.imshow(cells, aspect='auto', cmap='viridis')
+                    ax2.set_xticks(range(len(age_groups)))
+                    ax2.set_xticklabels(age_groups)
+                    ax2.set_yticks(range(len(symptom_names)))
+                    ax2.set_yticklabels(symptom_names)
+                    ax2.set_title('Symptoms by Age Group', fontsize=14, fontweight='bold')
+                    fig.colorbar(image, ax=ax2, label='Patients')
+
+                    plt.tight_layout()
+                    plt.show()
+                else:
+                    print("\nNo patients found.")
+            elif op == '8':
+                scheduler = get_scheduler()
+                conflicts = scheduler.conflicts()
+                if conflicts:
+                    minutes = int(scheduler.slot.total_seconds() // 60)
+                    print(f"\n{len(conflicts)} overlapping appointment pairs ({minutes} minute slots):")
+                    print(f'{"Doctor Name":^30}|{"Patient Name":^30}|{"Date/Time":^18}|{"Overlaps Patient":^30}|{"Date/Time":^18}')
+                    print("-" * 130)
+                    for first, second in conflicts:
+                        print(f'{first.get_doctor():^30}|{first.get_patient():^30}|{first.datetime_text():^18}|'
+                              f'{second.get_patient():^30}|{second.datetime_text():^18}')
+                else:
+                    print("\nNo double-booked appointments found.")
             elif op == '0':
                 return
             else:
@@ -0,0 +1,453 @@
+import argparse
+import datetime
+import glob
+import os
+import tempfile
+
+from Person import parse_record_id
+
+APPOINTMENT_FILE_PATTERN = "*_appointments.txt"
+APPOINTMENT_HEADER = "Patient Name|Doctor Name|Appointment DateTime|Revision|Patient ID|Doctor ID"
+APPOINTMENT_HEADER_PREFIX = "Patient Name|"
+APPOINTMENT_FORMAT = "%Y/%m/%d %H:%M"
+UPDATED_SUFFIX = " (Updated)"
+
+
+def appointment_file_for(year) -> str:
+    """Returns the name of the appointment file for a year."""
+    return f"{year}_appointments.txt"
+
+
+def archive_file_for(path: str) -> str:
+    """Returns the archive file superseded rows of a year file are moved to."""
+    root, extension = os.path.splitext(path)
+    return f"{root}_archive{extension}"
+
+
+def record_key(name: str, record_id: int = None):
+    """Returns the key appointment rows of a person are grouped by.
+
+    The persistent ID is used when known; rows written before IDs were
+    stored fall back to the full name.
+    """
+    return name if record_id is None else record_id
+
+
+def parse_appointment_datetime(text: str) -> datetime.datetime:
+    """Parses a "YYYY/MM/DD HH:MM" date/time.
+
+    Raises:
+        ValueError: If the text is not a valid date/time.
+    """
+    if len(text) == 16 and text[4] == '/' and text[7] == '/' and text[10] == ' ' and text[13] == ':':
+        return datetime.datetime(int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                                 int(text[11:13]), int(text[14:16]))
+    return datetime.datetime.strptime(text, APPOINTMENT_FORMAT)
+
+
+class Appointment:
+    """A booked appointment of a patient with a doctor."""
+
+    __slots__ = ("_patient", "_doctor", "_datetime", "_updated", "_revision", "_patient_id", "_doctor_id")
+
+    def __init__(self, patient: str, doctor: str, appointment_datetime: datetime.datetime, updated: bool = False,
+                 revision: int = None, patient_id: int = None, doctor_id: int = None):
+        """
+        Args:
+            patient (str): Full name of the patient.
+            doctor (str): Full name of the doctor.
+            appointment_datetime (datetime): Date and time of the appointment.
+            updated (bool): True if the appointment replaced an earlier one.
+            revision (int): Revision of the patient's appointment, counting from 1.
+                None for rows written before revisions were stored; the index
+                numbers those in file order.
+            patient_id (int): ID of the patient, None for rows written before IDs were stored.
+            doctor_id (int): ID of the doctor, None for rows written before IDs were stored.
+        """
+        self._patient = patient
+        self._doctor = doctor
+        self._datetime = appointment_datetime
+        self._updated = updated
+        self._revision = revision
+        self._patient_id = patient_id
+        self._doctor_id = doctor_id
+
+    @staticmethod
+    def from_file_format(line: str):
+        """Parses a line of a {year}_appointments.txt file.
+
+        Args:
+            line (str): "Patient|Doctor|YYYY/MM/DD HH:MM|Revision|Patient ID|Doctor ID", the
+                date/time optionally suffixed with " (Updated)". Older rows stop after
+                the date/time or the revision.
+
+        Returns:
+            Appointment: The parsed appointment, or None for the header and malformed lines.
+        """
+        data = line.strip().split('|')
+        if len(data) < 3:
+            return None
+        appointment_datetime = data[2].strip()
+        updated = appointment_datetime.endswith(UPDATED_SUFFIX)
+        if updated:
+            appointment_datetime = appointment_datetime[:-len(UPDATED_SUFFIX)]
+        try:
+            parsed = parse_appointment_datetime(appointment_datetime)
+        except ValueError:
+            return None
+        revision = parse_record_id(data[3]) if len(data) > 3 else None
+        patient_id = parse_record_id(data[4]) if len(data) > 4 else None
+        doctor_id = parse_record_id(data[5]) if len(data) > 5 else None
+        return Appointment(data[0].strip(), data[1].strip(), parsed, updated, revision, patient_id, doctor_id)
+
+    def to_file_format(self) -> str:
+        """Returns the line stored in the {year}_appointments.txt file."""
+        if self._revision is None and self._patient_id is None and self._doctor_id is None:
+            return f"{self._patient}|{self._doctor}|{self.datetime_text()}"
+        revision, patient_id, doctor_id = ("" if value is None else value
+                                           for value in (self._revision, self._patient_id, self._doctor_id))
+        return f"{self._patient}|{self._doctor}|{self.datetime_text()}|{revision}|{patient_id}|{doctor_id}"
+
+    def get_patient(self) -> str:
+        """Returns the full name of the patient."""
+        return self._patient
+
+    def get_doctor(self) -> str:
+        """Returns the full name of the doctor."""
+        return self._doctor
+
+    def get_patient_id(self) -> int:
+        """Returns the ID of the patient, or None if the row predates IDs."""
+        return self._patient_id
+
+    def set_patient_id(self, patient_id: int):
+        """Sets the ID of the patient."""
+        self._patient_id = patient_id
+
+    def get_doctor_id(self) -> int:
+        """Returns the ID of the doctor, or None if the row predates IDs."""
+        return self._doctor_id
+
+    def set_doctor_id(self, doctor_id: int):
+        """Sets the ID of the doctor."""
+        self._doctor_id = doctor_id
+
+    def patient_key(self):
+        """Returns the key the patient's rows are grouped by: the patient ID, or the name for older rows."""
+        return record_key(self._patient, self._patient_id)
+
+    def doctor_key(self):
+        """Returns the key the doctor's rows are grouped by: the doctor ID, or the name for older rows."""
+        return record_key(self._doctor, self._doctor_id)
+
+    def get_datetime(self) -> datetime.datetime:
+        """Returns the date and time of the appointment."""
+        return self._datetime
+
+    def is_updated(self) -> bool:
+        """Returns True if the appointment replaced an earlier one."""
+        return self._updated
+
+    def get_revision(self) -> int:
+        """Returns the revision of the patient's appointment, or None if not numbered yet."""
+        return self._revision
+
+    def set_revision(self, revision: int):
+        """Sets the revision of the patient's appointment."""
+        self._revision = revision
+
+    def datetime_text(self) -> str:
+        """Returns the date/time as shown to users, e.g. "2026/02/21 10:00 (Updated)"."""
+        return self._datetime.strftime(APPOINTMENT_FORMAT) + (UPDATED_SUFFIX if self._updated else "")
+
+    def __str__(self):
+        return f'{self._patient:^30}|{self._doctor:^30}|{self.datetime_text():^18}'
+
+
+class AppointmentIndex:
+    """In-memory index over every {year}_appointments.txt file.
+
+    Year files are read once and cached together with their modification time
+    and size; refresh() only re-reads files whose stat changed. Each change of
+    a patient's appointment is stored as a new row with the next revision
+    number, and the index keeps a materialized view of the highest revision
+    per patient, so reports only walk live appointments. Rows written before
+    revisions were stored are numbered in file order (years ascending).
+    Patients and doctors are keyed by their IDs (see record_key), so two
+    people sharing a name never share appointments. Listeners added with
+    add_listener() follow the view: appointment_changed(previous, current) is
+    called whenever a patient's current appointment is replaced (previous is
+    None for a patient's first one), and appointments_rebuilt(index) after
+    the view was rebuilt from the year files.
+    """
+
+    def __init__(self, directory="."):
+        """
+        Args:
+            directory (str): Folder holding the year files, or None for an index
+                that is only filled through add().
+        """
+        self._directory = directory
+        self._files = {}
+        self._records = []
+        self._latest = {}
+        self._current = {}
+        self._by_doctor = {}
+        self._listeners = []
+        self._rebuilding = False
+
+    def add_listener(self, listener):
+        """Registers an object told about changes to the current appointments (see the class docstring)."""
+        self._listeners.append(listener)
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _read_file(path) -> list:
+        records = []
+        try:
+            with open(path, 'r', encoding="utf-8") as f:
+                for line in f:
+                    appointment = Appointment.from_file_format(line)
+                    if appointment is not None:
+                        records.append(appointment)
+        except FileNotFoundError:
+            pass
+        return records
+
+    def refresh(self):
+        """Re-reads the year files that were added, changed or removed since the last call."""
+        if self._directory is None:
+            return
+        paths = set(glob.glob(os.path.join(self._directory, APPOINTMENT_FILE_PATTERN)))
+        changed = False
+        for path in list(self._files):
+            if path not in paths:
+                del self._files[path]
+                changed = True
+        for path in paths:
+            try:
+                signature = self._signature(path)
+            except FileNotFoundError:
+                continue
+            cached = self._files.get(path)
+            if cached is None or cached[0] != signature:
+                self._files[path] = (signature, self._read_file(path))
+                changed = True
+        if changed:
+            self._rebuild()
+
+    def _rebuild(self, records=None):
+        if records is None:
+            records = [record for path in sorted(self._files) for record in self._files[path][1]]
+        self._records = []
+        self._latest = {}
+        self._current = {}
+        self._by_doctor = {}
+        self._rebuilding = True
+        try:
+            for record in records:
+                self._index(record)
+        finally:
+            self._rebuilding = False
+        for listener in self._listeners:
+            listener.appointments_rebuilt(self)
+
+    def _index(self, record):
+        patient = record.patient_key()
+        doctor = record.doctor_key()
+        if record.get_revision() is None:
+            current = self._current.get(patient)
+            record.set_revision(1 if current is None else current.get_revision() + 1)
+        self._records.append(record)
+        current = self._current.get(patient)
+        if current is None or record.get_revision() >= current.get_revision():
+            self._current[patient] = record
+            if not self._rebuilding:
+                for listener in self._listeners:
+                    listener.appointment_changed(current, record)
+        key = (patient, doctor)
+        latest = self._latest.get(key)
+        if latest is None or record.get_revision() >= latest.get_revision():
+            self._latest[key] = record
+        self._by_doctor.setdefault(doctor, []).append(record)
+
+    def add(self, record, path=None):
+        """Adds a newly written appointment without re-reading its file.
+
+        Args:
+            record (Appointment): The appointment.
+            path (str): The year file the record was appended to, if any.
+        """
+        self.add_many([record], path)
+
+    def add_many(self, records, path=None):
+        """Adds appointments newly written together to one file without re-reading it.
+
+        Args:
+            records (list): The appointments, in the order they were written.
+            path (str): The year file the records were appended to, if any.
+        """
+        if path is not None and self._directory is not None:
+            path = os.path.join(self._directory, os.path.basename(path))
+            cached = self._files.get(path)
+            if cached is None:
+                # First appointments of a new year, let refresh() pick the file up in order
+                self.refresh()
+                return
+            cached[1].extend(records)
+            self._files[path] = (self._signature(path), cached[1])
+            if path != max(self._files):
+                # Appended to an earlier year, keep the year order intact
+                self._rebuild()
+                return
+        for record in records:
+            self._index(record)
+
+    def reload(self, records):
+        """Replaces the rows of an index that is only filled through add() (directory None).
+
+        Args:
+            records: The appointments, in booking order.
+        """
+        self._rebuild(list(records))
+
+    def next_revision(self, patient_name, patient_id=None) -> int:
+        """Returns the revision number for the next appointment change of a patient."""
+        current = self._current.get(record_key(patient_name, patient_id))
+        return 1 if current is None else current.get_revision() + 1
+
+    def all(self) -> list:
+        """Returns every appointment row, superseded revisions included, in booking order."""
+        return self._records
+
+    def current(self) -> list:
+        """Returns the current appointment of every patient."""
+        return list(self._current.values())
+
+    def current_for(self, patient_name, patient_id=None):
+        """Returns the current appointment of a patient, or None."""
+        return self._current.get(record_key(patient_name, patient_id))
+
+    def latest(self, patient_name, doctor_name, patient_id=None, doctor_id=None):
+        """Returns the most recent appointment of a patient with a doctor, or None."""
+        return self._latest.get((record_key(patient_name, patient_id), record_key(doctor_name, doctor_id)))
+
+    def for_doctor(self, doctor_name, doctor_id=None) -> list:
+        """Returns every appointment booked with a doctor."""
+        return self._by_doctor.get(record_key(doctor_name, doctor_id), [])
+
+    def compact(self, archive=False) -> tuple:
+        """Rewrites each year file keeping only the current revision of every patient.
+
+        Every file is replaced atomically. Superseded rows are dropped, or
+        appended to the year's archive file (e.g. 2026_appointments_archive.txt)
+        first when archive is True.
+
+        Args:
+            archive (bool): Keep superseded rows in the archive files.
+
+        Returns:
+            tuple: Number of rows kept and number of rows removed.
+        """
+        if self._directory is None:
+            return len(self._records), 0
+        self.refresh()
+        current = {id(record) for record in self._current.values()}
+        kept_total = removed_total = 0
+        for path in sorted(self._files):
+            records = self._files[path][1]
+            kept = [record for record in records if id(record) in current]
+            superseded = [record for record in records if id(record) not in current]
+            if superseded and archive:
+                _append_lines(archive_file_for(path), [record.to_file_format() for record in superseded])
+            write_appointment_lines(path, [record.to_file_format() for record in kept])
+            self._files[path] = (self._signature(path), kept)
+            kept_total += len(kept)
+            removed_total += len(superseded)
+        self._rebuild()
+        return kept_total, removed_total
+
+    def assign_ids(self, patient_ids: dict, doctor_ids: dict) -> int:
+        """Fills in the patient and doctor IDs of rows written before IDs were stored.
+
+        Rows are matched by full name. Every year file is rewritten atomically
+        in the current format, so rows without a revision get theirs stored too.
+
+        Args:
+            patient_ids (dict): Patient ID by full name.
+            doctor_ids (dict): Doctor ID by full name.
+
+        Returns:
+            int: Number of rows that were given an ID.
+        """
+        if self._directory is None:
+            return 0
+        self.refresh()
+        updated = 0
+        for path in sorted(self._files):
+            records = self._files[path][1]
+            for record in records:
+                changed = False
+                if record.get_patient_id() is None and record.get_patient() in patient_ids:
+                    record.set_patient_id(patient_ids[record.get_patient()])
+                    changed = True
+                if record.get_doctor_id() is None and record.get_doctor() in doctor_ids:
+                    record.set_doctor_id(doctor_ids[record.get_doctor()])
+                    changed = True
+                updated += changed
+            write_appointment_lines(path, [record.to_file_format() for record in records])
+            self._files[path] = (self._signature(path), records)
+        self._rebuild()
+        return updated
+
+
+def write_appointment_lines(path, lines):
+    """Atomically replaces a year file with the header followed by the given rows."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".appointments_", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding="utf-8") as f:
+            f.write(APPOINTMENT_HEADER + "\n")
+            f.writelines(line + "\n" for line in lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _append_lines(path, lines):
+    """Appends rows to an archive file, writing the header to a new file first."""
+    is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, 'a', encoding="utf-8") as f:
+        if is_new:
+            f.write(APPOINTMENT_HEADER + "\n")
+        f.writelines(line + "\n" for line in lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the {year}_appointments.txt files.")
+    parser.add_argument("--compact", action="store_true",
+                        help="keep only the current appointment revision of every patient")
+    parser.add_argument("--archive", action="store_true",
+                        help="move superseded rows to {year}_appointments_archive.txt instead of dropping them")
+    args = parser.parse_args()
+    if not args.compact:
+        parser.print_help()
+        return
+
+    from Storage import get_storage
+    kept, removed = get_storage().compact_appointments(archive=args.archive)
+    print(f"Kept {kept} current appointments, removed {removed} superseded rows")
+
+
+if __name__ == "__main__":
+    main()
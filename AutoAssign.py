@@ -0,0 +1,417 @@
+"""Automatic assignment of patients to the least-loaded doctor of the speciality their symptoms call for.
+
+Symptoms are mapped to specialities by the pipe-delimited table in
+symptom_specialities.txt (override the path with HMS_SPECIALITY_TABLE), one
+"Symptom|Speciality" line per symptom; without the file DEFAULT_SPECIALITIES
+is used. A patient goes to the speciality of their first symptom found in the
+table, or GENERAL_SPECIALITY when none is. batch_assign() books a whole
+waiting list into the earliest free slots instead, up to HMS_DOCTOR_CAPACITY
+patients per doctor.
+"""
+import datetime
+import heapq
+import os
+
+from Scheduler import get_scheduler
+from Storage import get_storage
+
+SPECIALITY_TABLE_FILE = os.environ.get("HMS_SPECIALITY_TABLE", "symptom_specialities.txt")
+DOCTOR_CAPACITY = int(os.environ.get("HMS_DOCTOR_CAPACITY", "0"))  # Most patients per doctor, 0 for no limit
+GENERAL_SPECIALITY = "Internal Med."
+DEFAULT_SPECIALITIES = {
+    "Fever": "Internal Med.",
+    "Cough": "Internal Med.",
+    "Fatigue": "Internal Med.",
+    "Headache": "Neurology",
+    "Dizziness": "Neurology",
+    "Nausea": "Gastroenterology",
+    "Abdominal Pain": "Gastroenterology",
+    "Back Pain": "Orthopedics",
+    "Joint Pain": "Orthopedics",
+    "Chest Pain": "Cardiology",
+    "Shortness of Breath": "Cardiology",
+    "Sore Throat": "ENT",
+    "Rash": "Dermatology",
+    "Anxiety": "Psychiatry",
+}
+
+_doctor_load = None
+
+
+def get_doctor_load():
+    """Return the doctor loads shared by the terminal and GUI front ends (created once per process)."""
+    global _doctor_load
+    if _doctor_load is None:
+        _doctor_load = DoctorLoad(get_storage())
+    return _doctor_load
+
+
+def load_speciality_table(path=SPECIALITY_TABLE_FILE) -> dict:
+    """Reads the symptom to speciality table.
+
+    Args:
+        path (str): The table file; DEFAULT_SPECIALITIES is used if it does not exist.
+
+    Returns:
+        dict: Lower-cased symptom -> speciality.
+    """
+    table = DEFAULT_SPECIALITIES
+    if os.path.exists(path):
+        table = {}
+        with open(path, "r", encoding="utf-8") as f:
+            next(f, None)  # Skip the header
+            for line in f:
+                parts = line.rstrip("\n").split("|")
+                if len(parts) >= 2 and parts[0].strip():
+                    table[parts[0].strip()] = parts[1].strip()
+    return {symptom.lower(): speciality for symptom, speciality in table.items()}
+
+
+def speciality_for(symptoms, table) -> str:
+    """Returns the speciality for a patient's symptoms (see the module docstring)."""
+    return specialities_for(symptoms, table)[0]
+
+
+def specialities_for(symptoms, table) -> list:
+    """Returns every speciality a patient's symptoms map to, in symptom order; GENERAL_SPECIALITY if none."""
+    specialities = []
+    for symptom in symptoms:
+        speciality = table.get(symptom.strip().lower())
+        if speciality and speciality not in specialities:
+            specialities.append(speciality)
+    return specialities or [GENERAL_SPECIALITY]
+
+
+class DoctorLoad:
+    """The load of every doctor, with a heap per speciality to find the least-loaded doctor.
+
+    A doctor's load is its number of patients, then its number of upcoming
+    appointments (from when the loads were built). Loads follow the attached
+    PatientIndex and the storage's AppointmentIndex as a listener; every
+    change pushes the doctor's new load onto its speciality's heap and
+    outdated entries are dropped when they reach the top.
+    """
+
+    def __init__(self, storage):
+        """
+        Args:
+            storage: The storage the appointments are kept in.
+        """
+        self._storage = storage
+        self._doctors = None
+        self._doctor_ids = None
+        self._index = None
+        storage.watch_appointments(self)
+
+    def attach(self, doctors, index, now=None):
+        """Follows the doctors and the patient index of a front end, rebuilding the loads if either changed.
+
+        Args:
+            doctors (list): The doctors.
+            index (PatientIndex): The index kept up to date with every change to the patients.
+            now (datetime): Appointments from then on are upcoming; the current time by default.
+
+        Returns:
+            DoctorLoad: self.
+        """
+        doctor_ids = tuple((doctor.record_id, doctor.get_speciality()) for doctor in doctors)
+        if index is self._index and doctors is self._doctors and doctor_ids == self._doctor_ids and now is None:
+            return self
+        if index is not self._index:
+            if self._index is not None:
+                self._index.remove_listener(self)
+            index.add_listener(self)
+        self._doctors = doctors
+        self._doctor_ids = doctor_ids
+        self._index = index
+        self._now = now or datetime.datetime.now()
+        self._keys = {}  # Appointment doctor key (ID, or name of older rows) -> position in doctors
+        self._positions = {}  # Doctor ID -> position in doctors
+        self._specialities = [doctor.get_speciality().strip().lower() for doctor in doctors]
+        self._members = {}  # Lower-cased speciality -> positions in doctors
+        for position, doctor in enumerate(doctors):
+            self._positions.setdefault(doctor.record_id, position)
+            self._keys.setdefault(doctor.record_id, position)
+            self._keys.setdefault(doctor.full_name(), position)
+            self._members.setdefault(self._specialities[position], []).append(position)
+        self._build(self._storage.load_current_appointments())
+        return self
+
+    def _build(self, appointments):
+        counts = self._index.doctor_counts()
+        self._patients = [counts.get(doctor.record_id, 0) for doctor in self._doctors]
+        self._upcoming = [0] * len(self._doctors)
+        for appointment in appointments:
+            position = self._keys.get(appointment.doctor_key())
+            if position is not None and appointment.get_datetime() >= self._now:
+                self._upcoming[position] += 1
+        self._heaps = {speciality: self._heap(positions) for speciality, positions in self._members.items()}
+
+    def _heap(self, positions) -> list:
+        heap = [self._entry(position) for position in positions]
+        heapq.heapify(heap)
+        return heap
+
+    def _entry(self, position) -> tuple:
+        return self._patients[position], self._upcoming[position], position
+
+    def _changed(self, position):
+        speciality = self._specialities[position]
+        heap = self._heaps[speciality]
+        heapq.heappush(heap, self._entry(position))
+        if len(heap) > 4 * len(self._members[speciality]) + 64:  # Mostly outdated entries
+            self._heaps[speciality] = self._heap(self._members[speciality])
+
+    # Listener callbacks
+
+    def patient_changed(self, old_keys, new_keys):
+        """Moves a patient between doctors' patient counts (PatientIndex listener)."""
+        old_doctor = old_keys["doctor"][0] if old_keys else None
+        new_doctor = new_keys["doctor"][0] if new_keys else None
+        if old_doctor == new_doctor:
+            return
+        for doctor_id, change in ((old_doctor, -1), (new_doctor, 1)):
+            position = self._positions.get(doctor_id) if doctor_id is not None else None
+            if position is not None:
+                self._patients[position] += change
+                self._changed(position)
+
+    def appointment_changed(self, previous, current):
+        """Moves an upcoming appointment between doctors (AppointmentIndex listener)."""
+        if self._doctors is None:
+            return
+        for appointment, change in ((previous, -1), (current, 1)):
+            if appointment is None or appointment.get_datetime() < self._now:
+                continue
+            position = self._keys.get(appointment.doctor_key())
+            if position is not None:
+                self._upcoming[position] += change
+                self._changed(position)
+
+    def appointments_rebuilt(self, index):
+        """Recounts the upcoming appointments after the index re-read them (AppointmentIndex listener)."""
+        if self._doctors is not None:
+            self._build(index.current())
+
+    # Queries
+
+    def load(self, doctor) -> tuple:
+        """Returns the (patients, upcoming appointments) of a doctor."""
+        position = self._positions[doctor.record_id]
+        return self._patients[position], self._upcoming[position]
+
+    def least_loaded(self, speciality: str):
+        """Returns the doctor of a speciality with the fewest patients, then upcoming appointments.
+
+        Ties go to the doctor listed first. Returns None if no doctor has the speciality.
+        """
+        heap = self._heaps.get(speciality.strip().lower())
+        while heap:
+            entry = heap[0]
+            if entry == self._entry(entry[2]):
+                return self._doctors[entry[2]]
+            heapq.heappop(heap)  # Outdated load
+        return None
+
+
+def suggest_doctor(patient, doctors, index) -> tuple:
+    """Returns the speciality a patient's symptoms call for and its least-loaded doctor (None if it has none)."""
+    speciality = speciality_for(patient.get_symptoms(), load_speciality_table())
+    return speciality, get_doctor_load().attach(doctors, index).least_loaded(speciality)
+
+
+def book(patient, doctor, appointment_date, patients, index):
+    """Links a patient to a doctor with an appointment and stores both, as the assign menu does.
+
+    Args:
+        patient (Patient): The patient.
+        doctor (Doctor): The doctor.
+        appointment_date (datetime): Date and time of the appointment.
+        patients (list): The active patients.
+        index (PatientIndex): The index kept up to date with every change to patients.
+    """
+    storage = get_storage()
+    patient.link(doctor.full_name(), appointment_date, doctor.record_id)
+    doctor.add_patient(patient)
+    doctor.add_appointment(appointment_date)
+    index.update(patient)
+    storage.add_appointment(patient.full_name(), doctor.full_name(), appointment_date,
+                            patient_id=patient.record_id, doctor_id=doctor.record_id)
+    storage.update_patient(patient, patients)
+
+
+def auto_assign(waiting, patients, doctors, index, table=None) -> tuple:
+    """Assigns patients, in order, to the least-loaded doctor of their speciality at its first free slot.
+
+    Every booking updates the loads, so the patients are spread over the
+    doctors of a speciality in one pass.
+
+    Args:
+        waiting (list): The patients to assign.
+        patients (list): The active patients.
+        doctors (list): The doctors.
+        index (PatientIndex): The index kept up to date with every change to patients.
+        table (dict): Lower-cased symptom -> speciality; read from the table file by default.
+
+    Returns:
+        tuple: (list of (patient, doctor, appointment date) booked,
+                list of (patient, speciality) left unassigned for lack of a doctor or free slot)
+    """
+    table = load_speciality_table() if table is None else table
+    loads = get_doctor_load().attach(doctors, index)
+    scheduler = get_scheduler()
+    booked, unassigned = [], []
+    for patient in waiting:
+        speciality = speciality_for(patient.get_symptoms(), table)
+        doctor = loads.least_loaded(speciality)
+        slots = scheduler.free_slots([doctor], count=1) if doctor is not None else []
+        if not slots:
+            unassigned.append((patient, speciality))
+            continue
+        appointment_date = slots[0][0]
+        book(patient, doctor, appointment_date, patients, index)
+        booked.append((patient, doctor, appointment_date))
+    return booked, unassigned
+
+
+class _SlotPool:
+    """The free slots of a set of doctors, handed out earliest first within a speciality.
+
+    Every doctor's free slots are read lazily from the Scheduler, once: a slot
+    taken for one speciality is gone when the same doctor is searched again.
+    Doctors leave the pool when they reach their capacity.
+    """
+
+    def __init__(self, doctors, index, capacity, start, end):
+        self._doctors = doctors
+        self._scheduler = get_scheduler()
+        self._start = start
+        self._end = end
+        self._loads = [index.count_by_doctor(doctor.record_id) for doctor in doctors]
+        self._capacity = capacity
+        self._heads = {}  # Position in doctors -> [next free slot, iterator of the following ones]
+        self._members = {}  # Lower-cased speciality -> positions in doctors
+        for position, doctor in enumerate(doctors):
+            self._members.setdefault(doctor.get_speciality().strip().lower(), []).append(position)
+
+    def _head(self, position):
+        head = self._heads.get(position)
+        if head is None:
+            slots = self._scheduler.iter_free_slots(self._doctors[position], self._start, self._end)
+            head = self._heads[position] = [next(slots, None), slots]
+        return head
+
+    def _open(self, position) -> bool:
+        return not self._capacity or self._loads[position] < self._capacity
+
+    def heap(self, speciality) -> list:
+        """Returns a heap of (next free slot, load, position) of the open doctors of a speciality."""
+        heap = []
+        for position in self._members.get(speciality.strip().lower(), ()):
+            head = self._head(position)
+            if head[0] is not None and self._open(position):
+                heap.append((head[0], self._loads[position], position))
+        heapq.heapify(heap)
+        return heap
+
+    def take(self, heap):
+        """Books the earliest slot in a heap from heap(); ties go to the doctor with fewer patients.
+
+        Returns:
+            tuple: (slot start, doctor), or None when the doctors in the heap have no free slot left.
+        """
+        while heap:
+            slot_start, _, position = heapq.heappop(heap)
+            head = self._head(position)
+            if head[0] != slot_start or not self._open(position):
+                continue  # Taken from another speciality's heap, or the doctor is full
+            head[0] = next(head[1], None)
+            self._loads[position] += 1
+            if head[0] is not None and self._open(position):
+                heapq.heappush(heap, (head[0], self._loads[position], position))
+            return slot_start, self._doctors[position]
+        return None
+
+
+def plan_batch(waiting, doctors, index, table=None, capacity=DOCTOR_CAPACITY, start=None, end=None) -> tuple:
+    """Chooses a doctor and slot for every waiting patient, keeping the total wait short.
+
+    Patients only go to doctors of a speciality their symptoms map to. Each
+    speciality first gets its patients, in waiting-list order, booked into
+    the earliest free slots of its doctors; as patients are interchangeable
+    for the wait, taking the earliest slots any open doctor has gives the
+    shortest total wait for that speciality. Patients left over because
+    their speciality has no doctor or no capacity are then repaired into the
+    earliest slot left with the speciality of another of their symptoms.
+
+    Args:
+        waiting (list): The patients to assign.
+        doctors (list): The doctors.
+        index (PatientIndex): The index over the active patients, for the doctors' current patient counts.
+        table (dict): Lower-cased symptom -> speciality; read from the table file by default.
+        capacity (int): Most patients a doctor may have, 0 for no limit.
+        start (datetime): Earliest appointment, now by default.
+        end (datetime): Appointments must start before it, SEARCH_DAYS after start by default.
+
+    Returns:
+        tuple: (list of (patient, doctor, appointment date) planned,
+                list of (patient, speciality) that could not be placed)
+    """
+    table = load_speciality_table() if table is None else table
+    pool = _SlotPool(doctors, index, capacity, start or datetime.datetime.now(), end)
+    groups = {}
+    for patient in waiting:
+        specialities = specialities_for(patient.get_symptoms(), table)
+        groups.setdefault(specialities[0], []).append((patient, specialities))
+
+    planned, leftover = [], []
+    for speciality, group in groups.items():
+        heap = pool.heap(speciality)
+        for patient, specialities in group:
+            booking = pool.take(heap)
+            if booking is None:
+                leftover.append((patient, specialities))
+            else:
+                planned.append((patient, booking[1], booking[0]))
+
+    unplaced = []
+    for patient, specialities in leftover:
+        booking = None
+        for speciality in specialities[1:]:
+            booking = pool.take(pool.heap(speciality))
+            if booking is not None:
+                planned.append((patient, booking[1], booking[0]))
+                break
+        if booking is None:
+            unplaced.append((patient, specialities[0]))
+    return planned, unplaced
+
+
+def batch_assign(waiting, patients, doctors, index, table=None, capacity=DOCTOR_CAPACITY) -> tuple:
+    """Assigns the waiting patients as planned by plan_batch(), storing every link and appointment at once.
+
+    The links are made in memory first; then the appointments are written
+    with one storage call and the changed patients with another.
+
+    Args:
+        waiting (list): The patients to assign.
+        patients (list): The active patients.
+        doctors (list): The doctors.
+        index (PatientIndex): The index kept up to date with every change to patients.
+        table (dict): Lower-cased symptom -> speciality; read from the table file by default.
+        capacity (int): Most patients a doctor may have, 0 for no limit.
+
+    Returns:
+        tuple: As plan_batch().
+    """
+    planned, unplaced = plan_batch(waiting, doctors, index, table, capacity)
+    for patient, doctor, appointment_date in planned:
+        patient.link(doctor.full_name(), appointment_date, doctor.record_id)
+        doctor.add_patient(patient)
+        doctor.add_appointment(appointment_date)
+        index.update(patient)
+    storage = get_storage()
+    storage.add_appointments([(patient.full_name(), doctor.full_name(), appointment_date, patient.record_id,
+                               doctor.record_id) for patient, doctor, appointment_date in planned])
+    storage.update_patients([patient for patient, _, _ in planned], patients)
+    return planned, unplaced
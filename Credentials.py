@@ -0,0 +1,295 @@
+import hashlib
+import hmac
+import os
+import tempfile
+
+CREDENTIALS_FILE = "credentials.txt"
+CREDENTIALS_HEADER = "Username|Role|ID|Password Hash"
+ADMIN_ROLE = "admin"
+DOCTOR_ROLE = "doctor"
+
+# PBKDF2 iterations for newly stored hashes; stored hashes keep the cost they were made with
+PASSWORD_ITERATIONS = int(os.environ.get("HMS_PASSWORD_ITERATIONS", "200000"))
+HASH_SCHEME = "pbkdf2_sha256"
+SALT_BYTES = 16
+COMPACT_MIN_STALE = 64  # Superseded lines tolerated before the file is rewritten
+
+_credentials = None
+
+
+class DuplicateUsernameError(ValueError):
+    """Raised when a username is already taken by another account."""
+
+
+def hash_password(password: str, iterations: int = None, salt: bytes = None) -> str:
+    """Returns a salted PBKDF2-SHA256 hash of a password.
+
+    Args:
+        password (str): The password.
+        iterations (int): PBKDF2 iterations, PASSWORD_ITERATIONS when not given.
+        salt (bytes): The salt, random when not given.
+
+    Returns:
+        str: "pbkdf2_sha256$iterations$salt$hash", salt and hash in hex.
+    """
+    iterations = PASSWORD_ITERATIONS if iterations is None else iterations
+    salt = os.urandom(SALT_BYTES) if salt is None else salt
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"{HASH_SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password: str, stored_hash: str) -> bool:
+    """Returns True if the password matches a hash made by hash_password()."""
+    try:
+        scheme, iterations, salt, digest = stored_hash.split("$")
+        if scheme != HASH_SCHEME:
+            return False
+        expected = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(expected.hex(), digest)
+
+
+def needs_rehash(stored_hash: str, iterations: int = None) -> bool:
+    """Returns True if a hash was made with a different cost than the configured one."""
+    iterations = PASSWORD_ITERATIONS if iterations is None else iterations
+    parts = stored_hash.split("$")
+    return len(parts) != 4 or parts[0] != HASH_SCHEME or parts[1] != str(iterations)
+
+
+def get_credentials():
+    """Return the credential store shared by the terminal and GUI front ends (created once per process)."""
+    global _credentials
+    if _credentials is None:
+        _credentials = CredentialStore()
+    return _credentials
+
+
+class Credential:
+    """The login of one account."""
+
+    __slots__ = ("username", "role", "record_id", "password_hash")
+
+    def __init__(self, username: str, role: str, record_id: int, password_hash: str):
+        """
+        Args:
+            username (str): The unique username.
+            role (str): ADMIN_ROLE or DOCTOR_ROLE.
+            record_id (int): ID of the doctor the login belongs to, None for the admin.
+            password_hash (str): Hash made by hash_password().
+        """
+        self.username = username
+        self.role = role
+        self.record_id = record_id
+        self.password_hash = password_hash
+
+    def to_file_format(self) -> str:
+        record_id = "" if self.record_id is None else self.record_id
+        return f"{self.username}|{self.role}|{record_id}|{self.password_hash}"
+
+
+class CredentialStore:
+    """Logins of the admin and every doctor, keyed by username.
+
+    Usernames are unique across both roles. Looking a login up is a dict
+    access followed by a single hash verification, whatever the number of
+    staff. Changes are appended to credentials.txt as the account's new
+    line (a line with an empty role removes the username), so editing one
+    login never rewrites the others; the file is rewritten without the
+    superseded lines once they outnumber the live ones.
+    """
+
+    def __init__(self, path: str = CREDENTIALS_FILE, iterations: int = None):
+        """
+        Args:
+            path (str): The credentials file.
+            iterations (int): PBKDF2 iterations for new hashes, PASSWORD_ITERATIONS when not given.
+        """
+        self._path = path
+        self._iterations = PASSWORD_ITERATIONS if iterations is None else iterations
+        self._by_username = {}
+        self._by_owner = {}
+        self._stale = 0
+        self._dummy_hash = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self._path):
+            return
+        lines = 0
+        with open(self._path, "r", encoding="utf-8") as f:
+            next(f, None)  # Skip header line
+            for line in f:
+                parts = line.rstrip("\n").split("|")
+                if len(parts) < 4 or not parts[0]:
+                    continue
+                lines += 1
+                username, role, record_id, password_hash = parts[:4]
+                self._forget(username)
+                if role:
+                    record_id = int(record_id) if record_id.isdigit() else None
+                    self._remember(Credential(username, role, record_id, password_hash))
+        self._superseded(lines - len(self._by_username))
+
+    def _remember(self, credential):
+        self._by_username[credential.username] = credential
+        self._by_owner[(credential.role, credential.record_id)] = credential
+
+    def _forget(self, username):
+        credential = self._by_username.pop(username, None)
+        if credential is not None and self._by_owner.get((credential.role, credential.record_id)) is credential:
+            del self._by_owner[(credential.role, credential.record_id)]
+
+    def _append(self, lines):
+        is_new = not os.path.exists(self._path) or os.path.getsize(self._path) == 0
+        with open(self._path, "a", encoding="utf-8") as f:
+            if is_new:
+                f.write(CREDENTIALS_HEADER + "\n")
+            f.writelines(line + "\n" for line in lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _superseded(self, count):
+        self._stale += count
+        if self._stale > max(COMPACT_MIN_STALE, len(self._by_username)):
+            self.compact()
+
+    @staticmethod
+    def _check_username(username):
+        if not username or "|" in username or username != username.strip():
+            raise ValueError(f"invalid username: {username!r}")
+
+    def __contains__(self, username) -> bool:
+        return username in self._by_username
+
+    def __len__(self) -> int:
+        return len(self._by_username)
+
+    def get(self, username):
+        """Returns the login with a username, or None."""
+        return self._by_username.get(username)
+
+    def is_available(self, username: str, role: str, record_id: int = None) -> bool:
+        """Returns True if a username is free or already belongs to the given account."""
+        credential = self._by_username.get(username)
+        return credential is None or (credential.role, credential.record_id) == (role, record_id)
+
+    def username_for(self, role: str, record_id: int = None):
+        """Returns the username of the admin (record_id None) or of a doctor, or None."""
+        credential = self._by_owner.get((role, record_id))
+        return credential.username if credential else None
+
+    def register(self, username: str, password: str, role: str, record_id: int = None) -> Credential:
+        """Adds a login.
+
+        Raises:
+            DuplicateUsernameError: If the username is already taken.
+            ValueError: If the username is empty or contains "|".
+        """
+        self._check_username(username)
+        if username in self._by_username:
+            raise DuplicateUsernameError(f"username {username!r} is already taken")
+        credential = Credential(username, role, record_id, hash_password(password, self._iterations))
+        self._append([credential.to_file_format()])
+        self._remember(credential)
+        return credential
+
+    def authenticate(self, username: str, password: str):
+        """Returns the login matching a username and password, or None.
+
+        A hash made with a different cost than the configured one is replaced
+        after a successful check.
+        """
+        credential = self._by_username.get(username)
+        if credential is None:
+            # Hash anyway so an unknown username takes as long as a wrong password
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_password("", self._iterations)
+            verify_password(password, self._dummy_hash)
+            return None
+        if not verify_password(password, credential.password_hash):
+            return None
+        if needs_rehash(credential.password_hash, self._iterations):
+            self.set_password(username, password)
+        return credential
+
+    def set_password(self, username: str, password: str):
+        """Replaces the password of a login.
+
+        Raises:
+            KeyError: If there is no login with the username.
+        """
+        credential = self._by_username[username]
+        credential.password_hash = hash_password(password, self._iterations)
+        self._append([credential.to_file_format()])
+        self._superseded(1)
+
+    def rename(self, old_username: str, new_username: str):
+        """Changes the username of a login.
+
+        Raises:
+            KeyError: If there is no login with old_username.
+            DuplicateUsernameError: If new_username is already taken.
+        """
+        if new_username == old_username:
+            return
+        self._check_username(new_username)
+        if new_username in self._by_username:
+            raise DuplicateUsernameError(f"username {new_username!r} is already taken")
+        credential = self._by_username[old_username]
+        self._forget(old_username)
+        credential.username = new_username
+        self._append([f"{old_username}|||", credential.to_file_format()])
+        self._remember(credential)
+        self._superseded(2)
+
+    def save(self, username: str, role: str, record_id: int = None, password: str = None):
+        """Stores the login of an account, adding, renaming or re-hashing only what changed.
+
+        Args:
+            username (str): The account's username.
+            role (str): ADMIN_ROLE or DOCTOR_ROLE.
+            record_id (int): ID of the doctor, None for the admin.
+            password (str): A new password, None to keep the stored one.
+
+        Returns:
+            Credential: The stored login, or None if the account has no login and no password was given.
+
+        Raises:
+            DuplicateUsernameError: If the username belongs to another account.
+        """
+        credential = self._by_owner.get((role, record_id))
+        existing = self._by_username.get(username)
+        if existing is not None and existing is not credential:
+            raise DuplicateUsernameError(f"username {username!r} is already taken")
+        if credential is None:
+            return self.register(username, password, role, record_id) if password is not None else None
+        self.rename(credential.username, username)
+        if password is not None:
+            self.set_password(username, password)
+        return credential
+
+    def remove(self, username: str):
+        """Deletes a login, if it exists."""
+        if username not in self._by_username:
+            return
+        self._forget(username)
+        self._append([f"{username}|||"])
+        self._superseded(2)
+
+    def compact(self):
+        """Atomically rewrites the file with only the current logins."""
+        directory = os.path.dirname(os.path.abspath(self._path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".credentials_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(CREDENTIALS_HEADER + "\n")
+                f.writelines(credential.to_file_format() + "\n" for credential in self._by_username.values())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self._path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._stale = 0
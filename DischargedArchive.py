@@ -0,0 +1,124 @@
+import os
+from array import array
+
+from Patient import DISCHARGED_FILE, PATIENT_HEADER_PREFIX, Patient
+
+PAGE_SIZE = 50
+MAX_CACHED_SEARCHES = 8
+_HEADER_PREFIX = PATIENT_HEADER_PREFIX.encode()
+
+
+class DischargedArchive:
+    """Pages of discharged_patient.txt served from a byte-offset index.
+
+    The offset of every record line is recorded once, so page N is read by
+    seeking to its first record instead of re-reading the file from the
+    start. The archive only grows: refresh() indexes just the bytes appended
+    since the last call, and starts over only when the file was replaced or
+    truncated. Searches keep the offsets of their matches the same way, so
+    paging through results and repeating a search never rescan the file.
+    """
+
+    def __init__(self, path: str = DISCHARGED_FILE):
+        """
+        Args:
+            path (str): The discharged patients file.
+        """
+        self._path = path
+        self._inode = None
+        self._offsets = array('q')
+        self._indexed_to = 0  # Bytes of the file covered by the index
+        self._searches = {}  # Lower-cased search text -> [matching offsets, bytes scanned]
+
+    def _clear(self):
+        self._inode = None
+        self._offsets = array('q')
+        self._indexed_to = 0
+        self._searches.clear()
+
+    def refresh(self):
+        """Indexes records appended to the file since the last call."""
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            self._clear()
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._indexed_to:
+            self._clear()
+            self._inode = stat.st_ino
+        if stat.st_size > self._indexed_to:
+            self._indexed_to = self._scan(self._indexed_to, self._offsets)
+
+    def _scan(self, start: int, offsets, text: str = None) -> int:
+        """Appends the offsets of the records after start (matching text, if given) to offsets.
+
+        A final line without its newline is still being written and is left
+        for the next scan.
+
+        Returns:
+            int: The offset the next scan starts from.
+        """
+        # An ASCII search can reject most lines on the raw bytes before decoding them
+        needle = text.encode() if text is not None and text.isascii() else None
+        with open(self._path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if line[-1:] != b"\n":
+                    break
+                if line.count(b'|') >= 6 and not line.startswith(_HEADER_PREFIX):
+                    if text is None or ((needle is None or needle in line.lower()) and self._matches(line, text)):
+                        offsets.append(offset)
+                offset += len(line)
+        return offset
+
+    @staticmethod
+    def _matches(line: bytes, text: str) -> bool:
+        data = line.decode("utf-8", "replace").split('|')
+        return text in data[0].lower() or text in data[6].lower()
+
+    def _offsets_for(self, search: str = None):
+        self.refresh()
+        text = (search or "").strip().lower()
+        if not text:
+            return self._offsets
+        cached = self._searches.pop(text, None)
+        if cached is None:
+            if len(self._searches) >= MAX_CACHED_SEARCHES:
+                del self._searches[next(iter(self._searches))]
+            cached = [array('q'), 0]
+        if cached[1] < self._indexed_to:
+            cached[1] = self._scan(cached[1], cached[0], text)
+        self._searches[text] = cached  # Most recently used last
+        return cached[0]
+
+    def count(self, search: str = None) -> int:
+        """Returns the number of discharged patients, or of those matching a search.
+
+        Args:
+            search (str): Text to look for in the patient or doctor name, case-insensitively.
+        """
+        return len(self._offsets_for(search))
+
+    def page(self, number: int, page_size: int = PAGE_SIZE, search: str = None) -> list:
+        """Returns one page of discharged patients, in the order they were discharged.
+
+        Args:
+            number (int): Zero-based page number.
+            page_size (int): Patients per page.
+            search (str): Text to look for in the patient or doctor name, case-insensitively.
+
+        Returns:
+            list: The Patient instances on the page, empty past the last page.
+        """
+        offsets = self._offsets_for(search)[number * page_size:(number + 1) * page_size]
+        patients = []
+        if not offsets:
+            return patients
+        with open(self._path, 'rb') as f:
+            for offset in offsets:
+                if f.tell() != offset:
+                    f.seek(offset)
+                line = f.readline().decode("utf-8").strip()
+                patients.append(Patient.from_file_format(line))
+        return patients
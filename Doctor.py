@@ -1,12 +1,11 @@
-import base64
-import os
-
-from Patient import Patient
+from Credentials import DOCTOR_ROLE, get_credentials
 from Person import Person
 
 class Doctor(Person):
     """A class that represents a doctor and manages doctor operations."""
 
+    __slots__ = ("__speciality", "__patients", "__appointments", "record_id")
+
     def __init__(self, first_name: str, surname: str, speciality: str, username, password):
         """
         Initialize a new Doctor instance.
@@ -19,7 +18,8 @@ class Doctor(Person):
         super().__init__(first_name, surname, username, password)
         self.__speciality = speciality
         self.__patients = []
-        self.__appointments = {}
+        self.__appointments = None  # Created by the first add_appointment()
+        self.record_id = None
 
     def get_speciality(self) -> str:
         """Returns the speciality of the doctor."""
@@ -33,53 +33,17 @@ class Doctor(Person):
         """
         self.__speciality = new_speciality
 
-    def _persist_credentials(self, old_username=None):
-        encoded_password = base64.b64encode(self.get_password().encode("utf-8")).decode("ascii")
-        file_path = "doctor.txt"
-        header = "Full Name|Speciality|Username|Password"
-        lines = []
-        updated = False
-        match_username = old_username if old_username is not None else self.get_username()
-
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    raw = line.rstrip("\n")
-                    parts = raw.split("|")
-                    if raw == header:
-                        lines.append(raw)
-                        continue
-                    if len(parts) < 4:
-                        lines.append(raw)
-                        continue
-                    if len(parts) >= 5:
-                        first_name, surname, speciality, username, _ = parts[:5]
-                        full_name = f"{first_name} {surname}".strip()
-                    else:
-                        full_name, speciality, username, _ = parts[:4]
-                    if (
-                        full_name == self.full_name()
-                        and speciality == self.__speciality
-                        and username == match_username
-                    ):
-                        lines.append(
-                            f"{full_name}|{speciality}|{self.get_username()}|{encoded_password}"
-                        )
-                        updated = True
-                    else:
-                        lines.append(raw)
-
-        if not updated:
-            lines.append(
-                f"{self.full_name()}|{self.__speciality}|"
-                f"{self.get_username()}|{encoded_password}"
-            )
-
-        if not lines or lines[0] != header:
-            lines.insert(0, header)
-
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(lines) + "\n")
+    def _persist_credentials(self):
+        """Stores the doctor's username, and password if one was set, in the credential store.
+
+        A doctor that has not been stored yet is added to the doctor records first.
+        """
+        from Storage import get_storage
+        if self.record_id is None:
+            get_storage().update_doctor(self)
+            return
+        get_credentials().save(self.get_username(), DOCTOR_ROLE, self.record_id, self.get_password())
+        self.set_password(None)
 
     def add_patient(self, patient):
         """Adds a patient to the doctor's list of patients.
@@ -89,6 +53,15 @@ class Doctor(Person):
         """
         self.__patients.append(patient)
 
+    def remove_patient(self, patient):
+        """Removes a patient from the doctor's list of patients, if present.
+
+        Args:
+            patient (Patient): The patient to be removed.
+        """
+        if patient in self.__patients:
+            self.__patients.remove(patient)
+
     def get_total_patients(self) -> int:
         """Returns the total number of patients assigned to the doctor."""
         return len(self.__patients)
@@ -99,21 +72,28 @@ class Doctor(Person):
     
     def add_appointment(self, appointment_date):
         month_year = appointment_date.strftime("%B %Y")
+        if self.__appointments is None:
+            self.__appointments = {}
         if month_year not in self.__appointments:
             self.__appointments[month_year] = 1
         else:
             self.__appointments[month_year] += 1
 
     def get_appointments(self):
-        return self.__appointments
+        return self.__appointments if self.__appointments is not None else {}
 
     def view(self, a_list):
         """View a list of patients."""
         for index, item in enumerate(a_list):
             print(f'{index+1:^5}|{item}')
 
-    def add_patient_symptoms(self):
-        """Add symptoms for a patient assigned to this doctor."""
+    def add_patient_symptoms(self, indexes=None):
+        """Add symptoms for a patient assigned to this doctor.
+
+        Args:
+            indexes (PatientIndex): Lookups over the active patients, kept up to date
+                with the new symptoms.
+        """
         patients = self.get_patients()
         if not patients:
             print("No patients assigned yet.")
@@ -134,19 +114,10 @@ class Doctor(Person):
             patients[index].add_symptoms(symptoms_list)
             print("Symptoms updated.")
 
-            all_patients = Patient.read_patient_records("patients_file.txt")
-            updated = False
-            for patient in all_patients:
-                if patient.full_name() == patients[index].full_name():
-                    patient.set_symptoms(patients[index].get_symptoms())
-                    updated = True
-                    break
-
-            if updated:
-                with open("patients_file.txt", "w") as f:
-                    f.write("Full Name|Age|Mobile|Postcode|Address|Symptoms|Doctor\n")
-                for patient in all_patients:
-                    Patient.append_patient_record("patients_file.txt", patient)
+            from Storage import get_storage
+            get_storage().update_patient(patients[index])
+            if indexes is not None:
+                indexes.update(patients[index])
         except ValueError:
             print("Invalid input.")
 
@@ -165,14 +136,16 @@ class Doctor(Person):
                 if not new_username:
                     print("Username cannot be empty.")
                     continue
-                old_username = self.get_username()
+                if not get_credentials().is_available(new_username, DOCTOR_ROLE, self.record_id):
+                    print("Username is already taken.")
+                    continue
                 self.set_username(new_username)
-                self._persist_credentials(old_username=old_username)
+                self._persist_credentials()
                 print("Username updated.")
 
             elif op == '2':
                 current_password = input("Enter current password: ")
-                if current_password != self.get_password():
+                if get_credentials().authenticate(self.get_username(), current_password) is None:
                     print("Current password is incorrect.")
                     continue
                 new_password = input("Enter new password: ")
@@ -0,0 +1,196 @@
+import json
+import os
+import tempfile
+import threading
+
+JOURNAL_SUFFIX = ".journal"
+# Compact the journal into a fresh snapshot once it grows past this many bytes
+JOURNAL_COMPACT_BYTES = int(os.environ.get("HMS_JOURNAL_COMPACT_BYTES", 1024 * 1024))
+
+
+class PatientJournal:
+    """Append-only log of patient changes recorded on top of a snapshot file.
+
+    Each entry is one JSON line holding an operation ("add", "update" or
+    "remove") together with the record line before and/or after the change.
+    Records are matched by their stored line, so identical rows are
+    interchangeable and no extra identifier is needed.
+
+    The first line of the journal names the snapshot it applies to (inode,
+    size and modification time). Once the snapshot is rewritten the journal no
+    longer matches and is ignored, so a crash between writing a new snapshot
+    and resetting the journal can never apply the same change twice.
+    """
+
+    def __init__(self, snapshot_file: str, compact_bytes: int = JOURNAL_COMPACT_BYTES):
+        """
+        Args:
+            snapshot_file (str): The records file the journal applies to.
+            compact_bytes (int): Journal size that triggers compaction.
+        """
+        self.snapshot_file = snapshot_file
+        self.path = snapshot_file + JOURNAL_SUFFIX
+        self.compact_bytes = compact_bytes
+        self.lock = threading.RLock()
+
+    def _snapshot_signature(self) -> str:
+        try:
+            stat = os.stat(self.snapshot_file)
+        except FileNotFoundError:
+            return ""
+        return f"{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def exists(self) -> bool:
+        """Returns True if the journal file exists."""
+        return os.path.exists(self.path)
+
+    def size(self) -> int:
+        """Returns the size of the journal in bytes."""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def needs_compaction(self) -> bool:
+        """Returns True once the journal has grown past the compaction threshold."""
+        return self.size() >= self.compact_bytes
+
+    def _is_current(self) -> bool:
+        try:
+            with open(self.path, 'r', encoding="utf-8") as f:
+                header = json.loads(f.readline())
+        except (FileNotFoundError, ValueError):
+            return False
+        return header.get("base") == self._snapshot_signature()
+
+    def entries(self) -> list:
+        """Returns the journal entries that apply to the current snapshot.
+
+        A torn final line left by a crash mid-append is skipped.
+        """
+        entries = []
+        with self.lock:
+            try:
+                with open(self.path, 'r', encoding="utf-8") as f:
+                    try:
+                        header = json.loads(f.readline())
+                    except ValueError:
+                        return entries
+                    if header.get("base") != self._snapshot_signature():
+                        return entries
+                    for line in f:
+                        try:
+                            entries.append(json.loads(line))
+                        except ValueError:
+                            continue
+            except FileNotFoundError:
+                pass
+        return entries
+
+    def append(self, op: str, before: str = None, after: str = None):
+        """Appends a single change to the journal.
+
+        Args:
+            op (str): "add", "update" or "remove".
+            before (str): The stored record line before the change.
+            after (str): The record line after the change.
+        """
+        self.append_many([(op, before, after)])
+
+    def append_many(self, changes):
+        """Appends several changes to the journal in one write.
+
+        Args:
+            changes: (op, before, after) tuples, as taken by append().
+        """
+        entries = "".join(json.dumps({"op": op, "before": before, "after": after}) + "\n"
+                          for op, before, after in changes)
+        if not entries:
+            return
+        with self.lock:
+            if not self._is_current():
+                self.reset()
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+            with open(self.path, 'a', encoding="utf-8") as f:
+                if torn:
+                    # Terminate a partial entry left by a crash so it stays on its own line
+                    f.write("\n")
+                f.write(entries)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def reset(self):
+        """Starts an empty journal for the current snapshot."""
+        with self.lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".journal_", suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding="utf-8") as f:
+                f.write(json.dumps({"base": self._snapshot_signature()}) + "\n")
+            os.replace(temp_path, self.path)
+
+    @staticmethod
+    def replay(lines: list, entries: list) -> list:
+        """Applies journal entries to snapshot record lines.
+
+        Args:
+            lines (list): Record lines from the snapshot, without newlines.
+            entries (list): Entries returned by entries().
+
+        Returns:
+            list: The record lines after all changes.
+        """
+        if not entries:
+            return lines
+        return list(PatientJournal.iter_replay(lines, entries))
+
+    @staticmethod
+    def iter_replay(lines, entries: list):
+        """Yields snapshot record lines with journal entries applied, reading the snapshot once.
+
+        The entries are resolved first into the records they replace or add,
+        so only the journal (which compaction keeps small) is held in memory.
+        Changed records keep their place and added records follow the snapshot.
+
+        Args:
+            lines: Iterable of record lines from the snapshot, without newlines.
+            entries (list): Entries returned by entries().
+
+        Yields:
+            str: The record lines after all changes.
+        """
+        # Each slot holds the current value of one changed or added record (None once removed)
+        slots = {}  # Record line -> slots currently holding it
+        replacements = {}  # Snapshot line -> slots replacing its occurrences
+        added = []
+        for entry in entries:
+            op = entry.get("op")
+            if op == "add":
+                slot = [entry["after"]]
+                added.append(slot)
+            else:
+                candidates = slots.get(entry.get("before"))
+                if candidates:
+                    slot = candidates.pop()
+                else:
+                    slot = [entry.get("before")]
+                    replacements.setdefault(entry.get("before"), []).append(slot)
+                slot[0] = entry["after"] if op == "update" else None
+            if slot[0] is not None:
+                slots.setdefault(slot[0], []).append(slot)
+
+        if not replacements:
+            yield from lines
+        else:
+            for line in lines:
+                pending = replacements.get(line)
+                if pending:
+                    value = pending.pop()[0]
+                    if value is not None:
+                        yield value
+                else:
+                    yield line
+        for slot in added:
+            if slot[0] is not None:
+                yield slot[0]
@@ -1,51 +1,43 @@
 # Importing the required modules
-import base64
 import os
 
 from Admin import Admin
+from Credentials import ADMIN_ROLE, get_credentials
 from Doctor import Doctor
 from Patient import Patient
+from PatientIndex import PatientIndex
 from Person import Person
+from Registry import Registry
+from Reports import get_report_aggregates
+from Storage import decode_password, get_storage
 
 ADMIN_FILE = "admin.txt"# default password is 123
-DOCTOR_FILE = "doctor.txt"
-DOCTOR_HEADER = "Full Name|Speciality|Username|Password"
-
-
-def encode_password(password: str) -> str:
-    return base64.b64encode(password.encode("utf-8")).decode("ascii")
-
-
-def decode_password(encoded_password: str) -> str:
-    try:
-        return base64.b64decode(encoded_password.encode("ascii")).decode("utf-8")
-    except (ValueError, UnicodeDecodeError):
-        return ""
 
 
 def load_admin() -> Admin:
-    default_admin = Admin("admin", "123", "B1 1AB")
-
-    if not os.path.exists(ADMIN_FILE) or os.path.getsize(ADMIN_FILE) == 0:
-        with open(ADMIN_FILE, "w", encoding="utf-8") as f:
-            f.write(
-                f"{default_admin.get_username()}|{encode_password(default_admin.get_password())}|B1 1AB\n"
-            )
-        return default_admin
-
-    with open(ADMIN_FILE, "r", encoding="utf-8") as f:
-        line = f.readline().strip()
-        if not line:
-            return default_admin
-        parts = line.split("|")
-        if len(parts) < 2:
-            return default_admin
-        username = parts[0].strip()
-        password = decode_password(parts[1].strip())
-        address = parts[2].strip() if len(parts) > 2 and parts[2].strip() else "B1 1AB"
-        if not username or not password:
-            return default_admin
-        return Admin(username, password, address)
+    """Returns the admin, moving its login into the credential store on first start.
+
+    admin.txt files written before the credential store hold the base64
+    password; it is hashed into the store and the column is emptied.
+    """
+    username, password, address = "admin", "123", "B1 1AB"
+    if os.path.exists(ADMIN_FILE) and os.path.getsize(ADMIN_FILE) > 0:
+        with open(ADMIN_FILE, "r", encoding="utf-8") as f:
+            parts = f.readline().strip().split("|")
+        if len(parts) >= 2 and parts[0].strip():
+            username = parts[0].strip()
+            password = decode_password(parts[1].strip()) if parts[1].strip() else None
+            if len(parts) > 2 and parts[2].strip():
+                address = parts[2].strip()
+
+    stored_username = get_credentials().username_for(ADMIN_ROLE)
+    if stored_username is not None:
+        return Admin(stored_username, None, address)
+    if not password:
+        username, password = "admin", "123"
+    admin = Admin(username, password, address)
+    admin._persist_credentials()
+    return admin
 
 
 def load_doctors() -> list:
@@ -55,43 +47,12 @@ def load_doctors() -> list:
         Doctor("Jon", "Carlos", "Cardiology", "jon", "123"),
     ]
 
-    if not os.path.exists(DOCTOR_FILE) or os.path.getsize(DOCTOR_FILE) == 0:
-        with open(DOCTOR_FILE, "w", encoding="utf-8") as f:
-            f.write(f"{DOCTOR_HEADER}\n")
-            for doctor in default_doctors:
-                f.write(
-                    f"{doctor.full_name()}|{doctor.get_speciality()}|"
-                    f"{doctor.get_username()}|{encode_password(doctor.get_password())}\n"
-                )
+    storage = get_storage()
+    if not storage.has_doctors():
+        storage.save_doctors(default_doctors)
         return default_doctors
 
-    doctors = []
-    with open(DOCTOR_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            if line == DOCTOR_HEADER:
-                continue
-            parts = [part.strip() for part in line.split("|")]
-            if len(parts) < 4:
-                continue
-            if len(parts) >= 5:
-                first_name, surname, speciality, username, encoded_password = parts[:5]
-                password = decode_password(encoded_password)
-            else:
-                full_name, speciality, username, encoded_password = parts[:4]
-                password = decode_password(encoded_password)
-                name_parts = full_name.split()
-                if not name_parts:
-                    continue
-                first_name = name_parts[0]
-                surname = " ".join(name_parts[1:]) if len(name_parts) > 1 else ""
-
-            if not all([first_name, speciality, username, password]):
-                continue
-            doctors.append(Doctor(first_name, surname, speciality, username, password))
-
+    doctors = storage.load_doctors()
     return doctors if doctors else default_doctors
 
 def main():
@@ -109,27 +70,13 @@ def main():
         Patient('Nabin', 'Oli', 30, '07123456789', 'C1 ABC', 'Kathmandu', 'Chest Pain, Shortness of Breath'),
         Patient('Nabraj', 'Oli', 25, '07123456789', 'C1 ABC', 'Kathmandu', 'Back Pain')
     ]
-    f = open("patients_file.txt", "r")
-    check = f.read()
-    f.close()
-    if check:
-        patients = Patient.read_patient_records("patients_file.txt")
-    else:
-        patients = []
+    storage = get_storage()
+    patients = storage.load_patients()
     
-    # Load discharged patients
-    discharged_patients = Patient.read_discharged_patients()
-    
-    for patient in patients:
-        if patient.get_doctor()!="None":
-            doctor_name = patient.get_doctor()
-            for doctor in doctors:
-                if doctor.full_name() == doctor_name:
-                    doctor.add_patient(patient)
-                else:
-                    pass
-        else:
-            pass
+    registry = Registry(doctors, patients)
+    registry.link_patients()
+    patient_index = PatientIndex(patients)
+    get_report_aggregates().attach(doctors, patients, patient_index)
 
     # Keep trying to login until the login details are correct
     logged_in_user = None
@@ -140,19 +87,15 @@ def main():
             username = input('Enter the username: ')
             password = input('Enter the password: ')
             
-            # Check admin login
-            if admin.get_username() == username and admin.get_password() == password:
+            login = get_credentials().authenticate(username, password)
+            if login is not None and login.role == ADMIN_ROLE:
                 logged_in_user = admin
                 user_type = 'admin'
                 break
-            
-            # Check doctor logins
-            for doctor in doctors:
-                if doctor.get_username() == username and doctor.get_password() == password:
-                    logged_in_user = doctor
-                    user_type = 'doctor'
-                    break
-            
+
+            if login is not None:
+                logged_in_user = registry.doctor(login.record_id)
+                user_type = 'doctor'
             if logged_in_user:
                 break
             
@@ -180,9 +123,9 @@ def main():
                     admin.doctor_management(doctors)
 
                 elif op == '2':
-                    admin.patient_management(patients, doctors, discharged_patients)
+                    admin.patient_management(patients, doctors, indexes=patient_index)
                 elif op == '3':
-                    admin.get_management_report(doctors, patients)
+                    admin.get_management_report(doctors, patients, indexes=patient_index)
                 elif op == '4':
                     if admin.settings():
                         running = False
@@ -235,7 +178,7 @@ def main():
                     else:
                         print("No patients assigned yet.")
                 elif op == '3':
-                    logged_in_user.add_patient_symptoms()
+                    logged_in_user.add_patient_symptoms(patient_index)
                 elif op == '4':
                     # Logout
                     if logged_in_user.settings():
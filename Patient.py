@@ -1,14 +1,82 @@
 import os
+import tempfile
+from sys import intern
 
-from Person import Person
+from Journal import JOURNAL_SUFFIX, PatientJournal
+from Person import Person, parse_record_id
 
+PATIENTS_FILE = "patients_file.txt"
+PATIENTS_HEADER = "Full Name|Age|Mobile|Postcode|Address|Symptoms|Doctor|ID|Doctor ID"
 DISCHARGED_FILE = "discharged_patient.txt"
-DISCHARGED_HEADER = "Full Name|Age|Mobile|Postcode|Address|Symptoms|Doctor"
+DISCHARGED_HEADER = "Full Name|Age|Mobile|Postcode|Address|Symptoms|Doctor|ID|Doctor ID"
+PATIENT_HEADER_PREFIX = "Full Name|"
+WRITE_BUFFER_SIZE = 1024 * 1024
+PROGRESS_INTERVAL = 4096  # Records between progress callbacks
+
+
+def _name_parts(name: str) -> list:
+    parts = name.strip().split(" ")
+    return [parts[0], parts[1] if len(parts) > 1 else ""]
+
+
+# Fields that iter_patient_records() and iter_discharged_patients() can project and filter on,
+# each parsed from the split columns of a record line
+RECORD_FIELDS = {
+    "name": lambda data: data[0].strip(),
+    "first_name": lambda data: _name_parts(data[0])[0],
+    "surname": lambda data: _name_parts(data[0])[1],
+    "age": lambda data: int(data[1].strip()),
+    "mobile": lambda data: data[2].strip(),
+    "postcode": lambda data: data[3].strip(),
+    "address": lambda data: data[4].strip(),
+    "symptoms": lambda data: data[5].strip().split(', '),
+    "doctor": lambda data: data[6].strip(),
+    "id": lambda data: parse_record_id(data[7]) if len(data) > 7 else None,
+    "doctor_id": lambda data: parse_record_id(data[8]) if len(data) > 8 else None,
+}
+
+
+def record_conditions(where) -> list:
+    """Returns (field, test) pairs for a where mapping of iter_patient_records().
+
+    Args:
+        where (dict): Field name -> value the field must equal, or a callable
+            taking the field value and returning True to keep the record.
+
+    Raises:
+        ValueError: If a field is not in RECORD_FIELDS.
+    """
+    conditions = []
+    for field, condition in (where or {}).items():
+        check_record_fields([field])
+        if not callable(condition):
+            condition = (lambda expected: lambda value: value == expected)(condition)
+        conditions.append((field, condition))
+    return conditions
+
+
+def check_record_fields(fields):
+    """Raises ValueError if any of the field names is not in RECORD_FIELDS."""
+    unknown = [field for field in fields if field not in RECORD_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown patient record fields: {', '.join(unknown)}")
+
+def _intern_symptoms(symptoms: list) -> list:
+    """Interns symptom names in place, so patients with the same symptom share one string."""
+    symptoms[:] = [intern(symptom) for symptom in symptoms]
+    return symptoms
 
 class Patient(Person):
-    """Patient class"""
+    """Patient class
 
-    def __init__(self, first_name, surname, age, mobile, postcode, address, symptoms, doctor='None'):
+    Instances use __slots__ and share interned symptom and doctor names, as
+    every patient of the hospital is held in memory at once.
+    """
+
+    __slots__ = ("__age", "__mobile", "__postcode", "__address", "__symptoms", "__doctor", "__appointments",
+                 "doctor_id", "record_id", "saved_record", "appointment_date", "status")
+
+    def __init__(self, first_name, surname, age, mobile, postcode, address, symptoms, doctor='None', doctor_id=None):
         """
         Args:
             first_name (string): First name
@@ -18,37 +86,62 @@ class Patient(Person):
             postcode (string): Postcode
             address (string): Address 
             doctor (string): Doctor's full name (default is 'None')
+            doctor_id (int): ID of the doctor (default is None)
         """
         
-        self.__first_name = first_name
-        self.__surname = surname
+        self._first_name = first_name
+        self._surname = surname
         self.__age = age
         self.__mobile = mobile
         self.__postcode = postcode
         self.__address = address
-        self.__symptoms = symptoms if isinstance(symptoms, list) else symptoms.split(', ')
-        self.__doctor = doctor
-        self.appointments = []
+        self.__symptoms = _intern_symptoms(symptoms if isinstance(symptoms, list) else symptoms.split(', '))
+        self.__doctor = intern(doctor)
+        self.doctor_id = doctor_id
+        self.__appointments = None
+        self.record_id = None  # Persistent patient ID, kept when the patient is discharged
+        self.saved_record = None  # Stored line of this record, used to match journal entries
+        self.appointment_date = None
+        self.status = None
+
+    @property
+    def appointments(self) -> list:
+        """Appointment times added with add_appointment(); the list is only created once one is added."""
+        if self.__appointments is None:
+            self.__appointments = []
+        return self.__appointments
+
+    def get_age(self):
+        """Returns the age of the patient."""
+        return self.__age
+
+    def set_age(self, new_age):
+        """Sets the age of the patient."""
+        self.__age = new_age
+
+    def get_mobile(self):
+        """Returns the mobile number of the patient."""
+        return self.__mobile
 
-    def get_first_name(self):
-        """Returns the first name of the person."""
-        return self.__first_name
+    def set_mobile(self, new_mobile):
+        """Sets the mobile number of the patient."""
+        self.__mobile = new_mobile
 
-    def set_first_name(self, new_first_name):
-        """Sets the first name of the person."""
-        self.__first_name = new_first_name
+    def get_postcode(self):
+        """Returns the postcode of the patient."""
+        return self.__postcode
 
-    def get_surname(self):
-        """Returns the surname of the person."""
-        return self.__surname
+    def set_postcode(self, new_postcode):
+        """Sets the postcode of the patient."""
+        self.__postcode = new_postcode
 
-    def set_surname(self, new_surname):
-        """Sets the surname of the person."""
-        self.__surname = new_surname
+    def get_address(self):
+        """Returns the address of the patient."""
+        return self.__address
 
-    def full_name(self):
-        """Returns the full name of the person."""
-        return f"{self.__first_name} {self.__surname}"
+    def set_address(self, new_address):
+        """Sets the address of the patient."""
+        self.__address = new_address
     
     def get_doctor(self):
         """Returns the doctor's full name linked to the patient."""
@@ -61,8 +154,16 @@ class Patient(Person):
     #         doctor (string): The doctor's full name
     #     """
     #     self.__doctor = doctor
-    def link(self, doctor, appointment_date):
-        self.__doctor = doctor
+    def link(self, doctor, appointment_date, doctor_id=None):
+        """Links the patient to a doctor.
+
+        Args:
+            doctor (string): The doctor's full name
+            appointment_date (datetime): Date and time of the appointment
+            doctor_id (int): The doctor's ID
+        """
+        self.__doctor = intern(doctor)
+        self.doctor_id = doctor_id
         self.appointment_date = appointment_date
 
     def print_symptoms(self):
@@ -71,7 +172,7 @@ class Patient(Person):
 
     def set_symptoms(self, symptoms):
         """Sets the symptoms of the patient."""
-        self.__symptoms = symptoms
+        self.__symptoms = _intern_symptoms(symptoms)
 
     def add_symptoms(self, new_symptoms):
         """Adds new symptoms to the existing symptoms.
@@ -80,9 +181,9 @@ class Patient(Person):
             new_symptoms (string): New symptoms to be added
         """
         if isinstance(new_symptoms, list):
-            self.__symptoms.extend(new_symptoms)
+            self.__symptoms.extend(intern(symptom) for symptom in new_symptoms)
         else:
-            self.__symptoms.append(new_symptoms)
+            self.__symptoms.append(intern(new_symptoms))
 
     def get_symptoms(self):
         """Returns the symptoms of the patient."""
@@ -93,11 +194,151 @@ class Patient(Person):
         self.status = "Approved"
 
     @staticmethod
-    def read_patient_records(patients_file: str) -> list:
+    def from_file_format(line: str):
+        """Create a Patient from a stored record line.
+
+        Args:
+            line (str): A pipe-delimited patient record.
+
+        Returns:
+            Patient: The parsed patient.
+        """
+        data = line.split('|')
+        firstname = data[0].strip().split(" ")
+        firstname = firstname[0]
+        surname = data[0].strip().split(" ")
+        surname = surname[1] if len(surname) > 1 else ""
+        patient = Patient(
+            firstname.strip(),  # first_name
+            surname.strip(),  # surname
+            int(data[1].strip()),  # age
+            data[2].strip(),  # mobile
+            data[3].strip(),  # postcode
+            data[4].strip(),  # address
+            data[5].strip().split(', '),  # symptoms
+            data[6].strip(),  # doctor
+            parse_record_id(data[8]) if len(data) > 8 else None)  # doctor_id
+        patient.record_id = parse_record_id(data[7]) if len(data) > 7 else None
+        patient.saved_record = line
+        return patient
+
+    @staticmethod
+    def iter_record_lines(patients_file: str, progress=None, journal=None):
+        """Yield the patient record lines of a file with its journal replayed on top.
+
+        The file is read once, a line at a time; only the journal entries are
+        held in memory.
+
+        Args:
+            patients_file (str): The file containing patient records.
+            progress: Optional callable taking ("read", bytes_read, total_bytes),
+                called periodically while the file is read.
+            journal (PatientJournal): The file's journal, whose lock is held
+                while the file is opened and the journal read.
+
+        Yields:
+            str: Record lines without the header or trailing newlines.
+
+        Raises:
+            FileNotFoundError: If neither the file nor its journal exists.
+        """
+        journal = journal if journal is not None else PatientJournal(patients_file)
+        with journal.lock:
+            # An open handle keeps reading the snapshot the journal entries apply to
+            fd = open(patients_file, 'r') if os.path.exists(patients_file) else None
+            if fd is None and not os.path.exists(patients_file + JOURNAL_SUFFIX):
+                raise FileNotFoundError(patients_file)
+            entries = journal.entries()
+        yield from PatientJournal.iter_replay(Patient._iter_snapshot_lines(fd, progress), entries)
+
+    @staticmethod
+    def _iter_snapshot_lines(fd, progress):
+        if fd is None:
+            return
+        with fd:
+            total = os.fstat(fd.fileno()).st_size
+            header = next(fd, "")  # Skip header line
+            bytes_read = len(header)
+            count = 0
+            for line in fd:
+                bytes_read += len(line)
+                line = line.rstrip("\n")
+                if line.strip():
+                    yield line
+                    count += 1
+                    if progress is not None and count % PROGRESS_INTERVAL == 0:
+                        progress("read", bytes_read, total)
+            if progress is not None:
+                progress("read", total, total)
+
+    @staticmethod
+    def read_record_lines(patients_file: str, progress=None) -> list:
+        """Read the patient record lines of a file with its journal replayed on top.
+
+        Args:
+            patients_file (str): The file containing patient records.
+            progress: Optional callable, see iter_record_lines().
+
+        Returns:
+            list: Record lines without the header or trailing newlines.
+        """
+        return list(Patient.iter_record_lines(patients_file, progress))
+
+    @staticmethod
+    def _select(lines, fields=None, where=None):
+        """Yields Patients, or tuples of the projected fields, for the record lines that match where."""
+        if fields is not None:
+            check_record_fields(fields)
+            projection = [RECORD_FIELDS[field] for field in fields]
+        conditions = [(RECORD_FIELDS[field], test) for field, test in record_conditions(where)]
+        for line in lines:
+            if conditions or fields is not None:
+                data = line.split('|')
+                if not all(test(value(data)) for value, test in conditions):
+                    continue
+            if fields is None:
+                yield Patient.from_file_format(line)
+            else:
+                yield tuple(value(data) for value in projection)
+
+    @staticmethod
+    def iter_patient_records(patients_file: str, fields=None, where=None, progress=None, journal=None):
+        """Yield patient records from a file lazily, one record at a time.
+
+        Changes recorded in the file's journal since the file was last written
+        are replayed on top of it.
+
+        Args:
+            patients_file (str): The file containing patient records.
+            fields: Optional names from RECORD_FIELDS; each record is then
+                yielded as a tuple of those fields instead of a Patient.
+            where (dict): Optional field name -> value or predicate; only
+                matching records are yielded. Only the fields named here are
+                parsed before a record is rejected.
+            progress: Optional callable taking ("read", bytes_read, total_bytes).
+            journal (PatientJournal): The file's journal, see iter_record_lines().
+
+        Yields:
+            Patient, or tuple when fields is given.
+
+        Raises:
+            FileNotFoundError: If neither the file nor its journal exists.
+            ValueError: If a field name is unknown.
+        """
+        return Patient._select(Patient.iter_record_lines(patients_file, progress, journal), fields, where)
+
+    @staticmethod
+    def read_patient_records(patients_file: str, progress=None) -> list:
         """Read patient records from a file.
+
+        Changes recorded in the file's journal since the file was last written
+        are replayed on top of it.
         
         Args:
             patients_file (str): The file containing patient records.
+            progress: Optional callable taking (stage, done, total), called with
+                ("read", bytes_read, total_bytes) while the file is read and
+                parsed, then once with ("parse", records, records).
 
         Returns:
             list: List of Patient instances.
@@ -105,24 +346,9 @@ class Patient(Person):
         patient_list = []
 
         try:
-            with open(patients_file, 'r') as fd:
-                next(fd)  # Skip header line
-                for line in fd:
-                    data = line.split('|')
-                    firstname = data[0].strip().split(" ")
-                    firstname = firstname[0]
-                    surname = data[0].strip().split(" ")
-                    surname = surname[1]
-                    patient = Patient(
-                        firstname.strip(),  # first_name
-                        surname.strip(),  # surname
-                        int(data[1].strip()),  # age
-                        data[2].strip(),  # mobile
-                        data[3].strip(),  # postcode
-                        data[4].strip(),  # address
-                        data[5].strip().split(', '),  # symptoms
-                        data[6].strip())
-                    patient_list.append(patient)
+            patient_list = list(Patient.iter_patient_records(patients_file, progress=progress))
+            if progress is not None:
+                progress("parse", len(patient_list), len(patient_list))
         except FileNotFoundError:
             print("File does not exist")
         return patient_list
@@ -141,6 +367,43 @@ class Patient(Person):
         except IOError as e:
             print(f"An error occurred while appending to the file: {e}")
 
+    @staticmethod
+    def write_patient_records(patients_file: str, patients):
+        """Write all patient records to the file in a single pass.
+
+        Rows are streamed through one buffered handle into a temporary file
+        next to patients_file, which then atomically replaces it, so a failed
+        write never leaves a truncated patients file behind.
+
+        Args:
+            patients_file (str): The file to write patient records to.
+            patients: The Patient instances to write.
+        """
+        Patient.write_record_lines(patients_file, (patient.to_file_format() for patient in patients))
+
+    @staticmethod
+    def write_record_lines(patients_file: str, lines, header: str = PATIENTS_HEADER):
+        """Atomically replace the file with the header followed by the given record lines.
+
+        Args:
+            patients_file (str): The file to write patient records to.
+            lines: Record lines without trailing newlines.
+            header (str): The header line written first.
+        """
+        directory = os.path.dirname(os.path.abspath(patients_file))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".patients_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', buffering=WRITE_BUFFER_SIZE) as file:
+                file.write(header + "\n")
+                file.writelines(line + "\n" for line in lines)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, patients_file)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
     @staticmethod
     def append_discharged_patient(patient):
         """Append a discharged patient record to discharged_patient.txt file.
@@ -148,21 +411,57 @@ class Patient(Person):
         Args:
             patient: The Patient instance to append to discharged patients file.
         """
+        Patient.append_discharged_patients([patient])
+
+    @staticmethod
+    def append_discharged_patients(patients):
+        """Append discharged patient records to discharged_patient.txt file in one write.
+        
+        Args:
+            patients: The Patient instances to append to discharged patients file.
+        """
         try:
             if not os.path.exists(DISCHARGED_FILE) or os.path.getsize(DISCHARGED_FILE) == 0:
                 with open(DISCHARGED_FILE, "w", encoding="utf-8") as file:
                     file.write(DISCHARGED_HEADER + "\n")
             else:
                 with open(DISCHARGED_FILE, "r", encoding="utf-8") as file:
-                    existing = file.read().splitlines()
-                if existing and existing[0].strip() != DISCHARGED_HEADER:
+                    first_line = file.readline()
+                    # The rest of the archive is only read to fix an old header
+                    existing = None if first_line.strip() == DISCHARGED_HEADER else file.read().splitlines()
+                if existing is not None:
+                    existing.insert(0, first_line.rstrip("\n"))
+                    if existing[0].startswith(PATIENT_HEADER_PREFIX):
+                        # Header written before records carried IDs
+                        existing = existing[1:]
                     with open(DISCHARGED_FILE, "w", encoding="utf-8") as file:
                         file.write(DISCHARGED_HEADER + "\n" + "\n".join(existing) + "\n")
 
             with open(DISCHARGED_FILE, "a", encoding="utf-8") as file:
-                file.write(patient.to_file_format() + "\n")
+                file.write("".join(patient.to_file_format() + "\n" for patient in patients))
         except IOError as e:
-            print(f"An error occurred while saving discharged patient: {e}")
+            print(f"An error occurred while saving discharged patients: {e}")
+
+    @staticmethod
+    def iter_discharged_patients(fields=None, where=None, discharged_file: str = DISCHARGED_FILE):
+        """Yield discharged patient records lazily, one record at a time.
+
+        Args:
+            fields: Optional names from RECORD_FIELDS, see iter_patient_records().
+            where (dict): Optional field name -> value or predicate, see iter_patient_records().
+            discharged_file (str): The discharged patients file.
+
+        Yields:
+            Patient, or tuple when fields is given. Nothing if the file does not exist.
+        """
+        if not os.path.exists(discharged_file):
+            return
+        with open(discharged_file, 'r') as fd:
+            lines = (line.strip() for line in fd)
+            yield from Patient._select(
+                (line for line in lines
+                 if line and not line.startswith(PATIENT_HEADER_PREFIX) and line.count('|') >= 6),
+                fields, where)
 
     @staticmethod
     def read_discharged_patients() -> list:
@@ -171,38 +470,17 @@ class Patient(Person):
         Returns:
             list: List of discharged Patient instances.
         """
-        patient_list = []
-
-        try:
-            with open(DISCHARGED_FILE, 'r') as fd:
-                for line in fd:
-                    line = line.strip()
-                    if not line or line == DISCHARGED_HEADER:
-                        continue
-                    data = line.split('|')
-                    if len(data) < 7:
-                        continue
-                    firstname = data[0].strip().split(" ")
-                    firstname = firstname[0]
-                    surname = data[0].strip().split(" ")
-                    surname = surname[1] if len(surname) > 1 else ""
-                    patient = Patient(
-                        firstname.strip(),
-                        surname.strip(),
-                        int(data[1].strip()),
-                        data[2].strip(),
-                        data[3].strip(),
-                        data[4].strip(),
-                        data[5].strip().split(', '),
-                        data[6].strip())
-                    patient_list.append(patient)
-        except FileNotFoundError:
+        if not os.path.exists(DISCHARGED_FILE):
             print("No discharged patients file found")
-        return patient_list
+            return []
+        return list(Patient.iter_discharged_patients())
 
     def to_file_format(self):
         """Returns a clean file format for storage (no centered spacing)."""
-        return f"{self.full_name()}|{self.__age}|{self.__mobile}|{self.__postcode}|{self.__address}|{', '.join(self.__symptoms)}|{self.get_doctor()}"
+        record_id = "" if self.record_id is None else self.record_id
+        doctor_id = "" if self.doctor_id is None else self.doctor_id
+        return (f"{self.full_name()}|{self.__age}|{self.__mobile}|{self.__postcode}|{self.__address}|"
+                f"{', '.join(self.__symptoms)}|{self.get_doctor()}|{record_id}|{doctor_id}")
             
     def __str__(self):
         """Returns a string representation of the patient."""
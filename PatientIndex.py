@@ -0,0 +1,154 @@
+class PatientIndex:
+    """Secondary indexes over the active patients.
+
+    Patients are bucketed by doctor ID, surname, postcode, mobile number and
+    symptom, so per-doctor views and family grouping look their patients up
+    instead of scanning every patient. The index is kept up to date
+    incrementally: call add() when a patient is admitted, update() after a
+    patient is edited or linked to a doctor and remove() when it is
+    discharged. Lookups return patients in the order they were indexed.
+    version counts those calls, so snapshots built from the patients can tell
+    when they are out of date, and listeners added with add_listener() are
+    told the keys a patient moved between.
+    """
+
+    FIELDS = ("doctor", "surname", "postcode", "mobile", "symptom")
+
+    def __init__(self, patients=()):
+        """
+        Args:
+            patients: The patients to index.
+        """
+        self._buckets = {field: {} for field in self.FIELDS}
+        self._keys = {}  # id(patient) -> keys the patient is currently indexed under
+        self.version = 0
+        self._listeners = []
+        for patient in patients:
+            self.add(patient)
+
+    def add_listener(self, listener):
+        """Registers an object whose patient_changed(old_keys, new_keys) is called after every change.
+
+        The keys are dicts of field -> tuple of keys, as stored for the
+        patient; old_keys is None for an admitted patient and new_keys is None
+        for a discharged one.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stops notifying a listener added with add_listener()."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _changed(self, old_keys, new_keys):
+        self.version += 1
+        for listener in self._listeners:
+            listener.patient_changed(old_keys, new_keys)
+
+    @staticmethod
+    def _keys_of(patient) -> dict:
+        return {
+            "doctor": (patient.doctor_id,),
+            "surname": (patient.get_surname(),),
+            "postcode": (patient.get_postcode(),),
+            "mobile": (patient.get_mobile(),),
+            "symptom": tuple(dict.fromkeys(patient.get_symptoms())),
+        }
+
+    def _insert(self, field, keys, patient):
+        buckets = self._buckets[field]
+        for key in keys:
+            buckets.setdefault(key, {})[id(patient)] = patient
+
+    def _discard(self, field, keys, patient):
+        buckets = self._buckets[field]
+        for key in keys:
+            bucket = buckets.get(key)
+            if bucket is None:
+                continue
+            bucket.pop(id(patient), None)
+            if not bucket:
+                del buckets[key]
+
+    def add(self, patient):
+        """Indexes a newly admitted patient."""
+        if id(patient) in self._keys:
+            self.update(patient)
+            return
+        keys = self._keys_of(patient)
+        for field in self.FIELDS:
+            self._insert(field, keys[field], patient)
+        self._keys[id(patient)] = keys
+        self._changed(None, keys)
+
+    def update(self, patient):
+        """Re-indexes a patient after its details, symptoms or doctor changed.
+
+        Only the fields whose value changed are moved, so the patient keeps its
+        place in every other bucket.
+        """
+        old_keys = self._keys.get(id(patient))
+        if old_keys is None:
+            self.add(patient)
+            return
+        keys = self._keys_of(patient)
+        for field in self.FIELDS:
+            if keys[field] != old_keys[field]:
+                self._discard(field, [key for key in old_keys[field] if key not in keys[field]], patient)
+                self._insert(field, [key for key in keys[field] if key not in old_keys[field]], patient)
+        self._keys[id(patient)] = keys
+        self._changed(old_keys, keys)
+
+    def remove(self, patient):
+        """Drops a discharged patient from the index."""
+        keys = self._keys.pop(id(patient), None)
+        if keys is None:
+            return
+        for field in self.FIELDS:
+            self._discard(field, keys[field], patient)
+        self._changed(keys, None)
+
+    def __contains__(self, patient):
+        return id(patient) in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _lookup(self, field, key) -> list:
+        return list(self._buckets[field].get(key, {}).values())
+
+    def by_doctor(self, doctor_id) -> list:
+        """Returns the patients assigned to a doctor; None gives the unassigned patients."""
+        return self._lookup("doctor", doctor_id)
+
+    def by_surname(self, surname) -> list:
+        """Returns the patients with a surname."""
+        return self._lookup("surname", surname)
+
+    def by_postcode(self, postcode) -> list:
+        """Returns the patients living at a postcode."""
+        return self._lookup("postcode", postcode)
+
+    def by_mobile(self, mobile) -> list:
+        """Returns the patients with a mobile number."""
+        return self._lookup("mobile", mobile)
+
+    def by_symptom(self, symptom) -> list:
+        """Returns the patients reporting a symptom."""
+        return self._lookup("symptom", symptom)
+
+    def count_by_doctor(self, doctor_id) -> int:
+        """Returns the number of patients assigned to a doctor."""
+        return len(self._buckets["doctor"].get(doctor_id, ()))
+
+    def families(self) -> dict:
+        """Returns the patients grouped by surname."""
+        return {surname: list(bucket.values()) for surname, bucket in self._buckets["surname"].items()}
+
+    def doctor_counts(self) -> dict:
+        """Returns the number of patients of each doctor ID, None for the unassigned patients."""
+        return {doctor_id: len(bucket) for doctor_id, bucket in self._buckets["doctor"].items()}
+
+    def symptom_counts(self) -> dict:
+        """Returns the number of patients reporting each symptom."""
+        return {symptom: len(bucket) for symptom, bucket in self._buckets["symptom"].items()}
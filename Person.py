@@ -1,6 +1,14 @@
+def parse_record_id(text: str):
+    """Returns the integer ID stored in a record column, or None if the column is empty."""
+    text = text.strip()
+    return int(text) if text.isdigit() else None
+
+
 class Person:
     """A class representing a generic person."""
-    
+
+    __slots__ = ("_first_name", "_surname", "__username", "__password")
+
     def __init__(self, first_name, surname, username, password):
     # def __init__(self, first_name, surname):
         """
@@ -0,0 +1,65 @@
+class Registry:
+    """Doctors and patients keyed by their persistent IDs.
+
+    Patients reference their doctor by doctor_id, so finding a patient's
+    doctor or a doctor's patients is a dictionary lookup rather than a scan
+    comparing full names, which two doctors may share.
+    """
+
+    def __init__(self, doctors=(), patients=()):
+        """
+        Args:
+            doctors: The doctors to register.
+            patients: The patients to register.
+        """
+        self._doctors = {}
+        self._patients = {}
+        for doctor in doctors:
+            self.add_doctor(doctor)
+        for patient in patients:
+            self.add_patient(patient)
+
+    def add_doctor(self, doctor):
+        """Registers a doctor under its record_id."""
+        self._doctors[doctor.record_id] = doctor
+
+    def remove_doctor(self, doctor):
+        """Unregisters a doctor."""
+        self._doctors.pop(doctor.record_id, None)
+
+    def doctor(self, doctor_id):
+        """Returns the doctor with the given ID, or None."""
+        return self._doctors.get(doctor_id)
+
+    def doctors(self) -> list:
+        """Returns every registered doctor."""
+        return list(self._doctors.values())
+
+    def add_patient(self, patient):
+        """Registers a patient under its record_id."""
+        self._patients[patient.record_id] = patient
+
+    def remove_patient(self, patient):
+        """Unregisters a patient."""
+        self._patients.pop(patient.record_id, None)
+
+    def patient(self, patient_id):
+        """Returns the patient with the given ID, or None."""
+        return self._patients.get(patient_id)
+
+    def patients(self) -> list:
+        """Returns every registered patient."""
+        return list(self._patients.values())
+
+    def doctor_for(self, patient):
+        """Returns the doctor a patient is assigned to, or None."""
+        if patient.doctor_id is None:
+            return None
+        return self._doctors.get(patient.doctor_id)
+
+    def link_patients(self):
+        """Adds every registered patient to the patient list of its doctor."""
+        for patient in self._patients.values():
+            doctor = self.doctor_for(patient)
+            if doctor is not None:
+                doctor.add_patient(patient)
@@ -0,0 +1,604 @@
+"""Figures of the management reports, built away from the GUI thread.
+
+Every builder gathers the data of one report and draws it on a matplotlib
+Figure that is not registered with pyplot, so it can run on a worker thread
+and be embedded in a window (FigureCanvasQTAgg) or written to a file
+afterwards. Builders report their progress through a step(value, status)
+callback, with value from 0 to 100; the callback raises ReportCancelled once
+the report is no longer wanted, which ends the build at the next step.
+
+Run as a script, it writes every report (or a chosen subset) to PNG, SVG,
+CSV or HTML files with the Agg renderer, building the reports in parallel
+worker processes:
+
+    python ReportFigures.py --out reports/ [--reports doctors,patients_per_doctor] [--formats png,svg,csv]
+"""
+import os
+
+import numpy as np
+from matplotlib import colormaps, rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+
+from Reports import doctor_labels, patient_columns
+
+MONTH_NAMES = ['', 'January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+# Steps between two progress reports of the long drawing and formatting loops
+STEP_EVERY = 50
+# Charts with more bars than this leave out the value labels: they would overlap, and
+# drawing thousands of them made the chart take seconds to paint whenever it is resized
+MAX_VALUE_LABELS = 300
+# Doctors named in the legend of the appointments chart at most; a longer legend
+# covers the chart and is unreadable
+MAX_LEGEND_ENTRIES = 40
+
+
+class ReportCancelled(Exception):
+    """Raised by a step callback when the report being built was cancelled."""
+
+
+class NoReportData(Exception):
+    """Raised by a builder when there is nothing to report; the message says what is missing."""
+
+
+class Report:
+    """A finished report: a chart with its text summary, or an HTML document."""
+
+    def __init__(self, title: str, figure=None, summary: str = "", html: str = None, columns=(), rows=()):
+        """
+        Args:
+            title (str): Window title of the report.
+            figure (Figure): The chart, drawn once so it can be shown without laying it out again.
+            summary (str): Plain text shown next to the chart.
+            html (str): The document of a report made of tables instead of a chart.
+            columns (tuple): Header of the report's table, as written to CSV.
+            rows (list): The table's rows, one tuple per row.
+        """
+        self.title = title
+        self.figure = figure
+        self.summary = summary
+        self.html = html
+        self.columns = columns
+        self.rows = rows
+
+
+def _no_progress(value, status):
+    pass
+
+
+def _new_figure(figsize) -> Figure:
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)  # Measures the text for tight_layout() without a window
+    return figure
+
+
+def _doctor_colors(count: int):
+    """Returns the colours pyplot would give count bar series in turn, as an RGBA array."""
+    cycle = rcParams['axes.prop_cycle'].by_key()['color']
+    return to_rgba_array([cycle[i % len(cycle)] for i in range(count)])
+
+
+def _finish(figure: Figure, step) -> Figure:
+    step(90, "Laying out the chart...")
+    figure.tight_layout()
+    step(95, "Rendering the chart...")
+    figure.canvas.draw()
+    return figure
+
+
+def total_doctors_report(doctors, aggregates, step=_no_progress) -> Report:
+    """Builds the number of doctors, in total and per speciality.
+
+    Args:
+        doctors (list): The doctors.
+        aggregates (ReportAggregates): The report counters, attached to the doctors.
+        step: Progress callback, step(value, status).
+
+    Returns:
+        Report: The chart and summary.
+    """
+    step(10, "Counting doctors by speciality...")
+    total_doctors = len(doctors)
+    speciality_counts = aggregates.doctors_per_speciality()
+
+    step(40, "Drawing the chart...")
+    figure = _new_figure((14, 6))
+    ax1, ax2 = figure.subplots(1, 2)
+
+    # Bar chart for total doctors
+    ax1.bar(['Total Doctors'], [total_doctors], color='#3498db', width=0.5)
+    ax1.set_ylabel('Count', fontsize=12)
+    ax1.set_title('Total Number of Doctors', fontsize=14, fontweight='bold')
+    ax1.set_ylim(0, total_doctors + 2)
+    ax1.text(0, total_doctors + 0.1, str(total_doctors), ha='center', va='bottom', fontsize=12, fontweight='bold')
+
+    # Pie chart for specialties
+    if speciality_counts:
+        colors = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12', '#9b59b6', '#1abc9c']
+        ax2.pie(speciality_counts.values(), labels=speciality_counts.keys(), autopct='%1.1f%%',
+                startangle=90, colors=colors[:len(speciality_counts)])
+        ax2.set_title('Doctors by Speciality', fontsize=14, fontweight='bold')
+
+    summary = f"Total number of doctors: {total_doctors}\n\nDoctors per Speciality:\n\n"
+    for speciality, count in speciality_counts.items():
+        summary += f"{speciality}: {count} doctors\n"
+    return Report("Total Doctors Report", _finish(figure, step), summary,
+                  columns=("Speciality", "Doctors"), rows=list(speciality_counts.items()))
+
+
+def patients_per_doctor_report(doctors, aggregates, step=_no_progress) -> Report:
+    """Builds the number of patients of every doctor.
+
+    Args:
+        doctors (list): The doctors.
+        aggregates (ReportAggregates): The report counters, attached to the doctors.
+        step: Progress callback, step(value, status).
+
+    Returns:
+        Report: The chart and summary.
+
+    Raises:
+        NoReportData: There are no doctors.
+    """
+    step(10, "Counting patients per doctor...")
+    if not doctors:
+        raise NoReportData("No doctors found.")
+    labels = doctor_labels(doctors)
+    doctor_names = [labels[doctor.record_id] for doctor in doctors]
+    total_patients_list = aggregates.patients_per_doctor(doctors)
+
+    step(30, "Drawing the chart...")
+    figure = _new_figure((12, 6))
+    ax = figure.add_subplot(111)
+    colors = colormaps['viridis'](range(len(doctor_names)))
+    # Bars by position, not by name: doctors who share a name would share a bar
+    bars = ax.bar(range(len(doctor_names)), total_patients_list, color=colors, edgecolor='black', linewidth=1.2)
+
+    # Add value labels on top of bars
+    if len(bars) <= MAX_VALUE_LABELS:
+        for bar in bars:
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width() / 2., height,
+                    f'{int(height)}', ha='center', va='bottom', fontsize=10, fontweight='bold')
+
+    ax.set_xlabel('Doctors', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Number of Patients', fontsize=12, fontweight='bold')
+    ax.set_title('Total Patients per Doctor', fontsize=14, fontweight='bold')
+    ax.set_xticks(range(len(doctor_names)), doctor_names, rotation=45, ha='right')
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+
+    summary = "Patients per Doctor:\n\n"
+    for name, count in zip(doctor_names, total_patients_list):
+        summary += f"{name}: {count} patients\n"
+    rows = [(doctor.record_id, doctor.full_name(), count) for doctor, count in zip(doctors, total_patients_list)]
+    return Report("Patients per Doctor Report", _finish(figure, step), summary,
+                  columns=("Doctor ID", "Doctor", "Patients"), rows=rows)
+
+
+def appointments_per_month_report(doctors, aggregates, step=_no_progress) -> Report:
+    """Builds the number of current appointments per month, grouped by doctor.
+
+    Args:
+        doctors (list): The doctors, naming the counters kept per doctor ID.
+        aggregates (ReportAggregates): The report counters.
+        step: Progress callback, step(value, status).
+
+    Returns:
+        Report: The chart and summary.
+
+    Raises:
+        NoReportData: There are no appointments.
+    """
+    step(5, "Counting appointments per month...")
+    appointments_data = aggregates.appointments_per_doctor_month(doctors)
+    if not appointments_data:
+        raise NoReportData("No appointments found.")
+
+    # Get all unique months
+    all_months = sorted(set(month for months in appointments_data.values() for month in months.keys()))
+    month_positions = {month: position for position, month in enumerate(all_months)}
+
+    # One row of counts per doctor, one column per month
+    counts = np.zeros((len(appointments_data), len(all_months)), dtype=np.int64)
+    for i, months in enumerate(appointments_data.values()):
+        if i % STEP_EVERY == 0:
+            step(10 + 40 * i // len(appointments_data),
+                 f"Counting doctors... {i:,} of {len(appointments_data):,}")
+        for month, count in months.items():
+            counts[i, month_positions[month]] = count
+
+    step(50, "Drawing the chart...")
+    figure = _new_figure((14, 8))
+    ax = figure.add_subplot(111)
+
+    # Grouped bars, drawn as a single collection: one bar artist per doctor and month
+    # took seconds to paint for a few hundred doctors over several years
+    doctor_count, month_count = counts.shape
+    width = 0.8 / doctor_count
+    offsets = width * np.arange(doctor_count) - (width * (doctor_count - 1) / 2)
+    lefts = (np.arange(month_count)[np.newaxis, :] + offsets[:, np.newaxis] - width / 2).ravel()
+    heights = counts.ravel()
+    bottoms = np.zeros_like(lefts)
+    ax.add_collection(PolyCollection(
+        np.stack([np.column_stack([lefts, bottoms]), np.column_stack([lefts, heights]),
+                  np.column_stack([lefts + width, heights]), np.column_stack([lefts + width, bottoms])], axis=1),
+        facecolors=np.repeat(_doctor_colors(doctor_count), month_count, axis=0)))
+    ax.set_xlim(-0.5, month_count - 0.5)
+    ax.set_ylim(0, max(int(counts.max()), 1) * 1.05)
+
+    # Add value labels
+    if counts.size <= MAX_VALUE_LABELS:
+        for left, height in zip(lefts, heights):
+            if height > 0:
+                ax.text(left + width / 2., height, f'{int(height)}', ha='center', va='bottom', fontsize=8)
+
+    # Format x-axis labels
+    month_labels = [f"{MONTH_NAMES[int(month)][:3]} {year}" for year, month in all_months]
+
+    ax.set_xlabel('Month', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Number of Appointments', fontsize=12, fontweight='bold')
+    ax.set_title('Total Appointments per Month per Doctor', fontsize=14, fontweight='bold')
+    ax.set_xticks(range(month_count))
+    ax.set_xticklabels(month_labels, rotation=45, ha='right')
+    if doctor_count <= MAX_LEGEND_ENTRIES:
+        step(85, "Adding the legend...")
+        # A fixed place beside the chart: loc="best" tries every bar of the collection, for
+        # seconds on each repaint and savefig()
+        ax.legend(handles=[Patch(facecolor=color, label=doctor_name)
+                           for doctor_name, color in zip(appointments_data, _doctor_colors(doctor_count))],
+                  loc="upper left", bbox_to_anchor=(1.01, 1), fontsize=8)
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+
+    summary = "Appointments per Month:\n\n"
+    for (year, month), count in aggregates.appointments_per_month().items():
+        summary += f"{MONTH_NAMES[month]} {year}: {count} appointments\n"
+    summary += "\nAppointments per Doctor:\n\n"
+    for doctor_name, total in zip(appointments_data, counts.sum(axis=1)):
+        summary += f"{doctor_name}: {total} appointments\n"
+    rows = [(doctor_name, f"{year}-{month:02d}", count)
+            for doctor_name, months in appointments_data.items() for (year, month), count in sorted(months.items())]
+    return Report("Appointments Report", _finish(figure, step), summary,
+                  columns=("Doctor", "Month", "Appointments"), rows=rows)
+
+
+def patients_by_symptom_report(aggregates, step=_no_progress) -> Report:
+    """Builds the number of patients reporting each symptom.
+
+    Args:
+        aggregates (ReportAggregates): The report counters.
+        step: Progress callback, step(value, status).
+
+    Returns:
+        Report: The chart and summary.
+
+    Raises:
+        NoReportData: No patient reports a symptom.
+    """
+    step(10, "Counting patients per symptom...")
+    symptom_counts = aggregates.patients_per_symptom()
+    if not symptom_counts:
+        raise NoReportData("No symptoms data available.")
+    symptom_names = list(symptom_counts.keys())
+    pt_wt_symp = list(symptom_counts.values())
+
+    step(30, "Drawing the chart...")
+    figure = _new_figure((16, 6))
+    ax1, ax2 = figure.subplots(1, 2)
+
+    # Horizontal bar chart
+    colors = colormaps['plasma'](range(len(symptom_names)))
+    bars = ax1.barh(symptom_names, pt_wt_symp, color=colors, edgecolor='black', linewidth=1.2)
+    ax1.set_xlabel('Number of Patients', fontsize=12, fontweight='bold')
+    ax1.set_ylabel('Symptoms', fontsize=12, fontweight='bold')
+    ax1.set_title('Patients by Symptom Type', fontsize=14, fontweight='bold')
+    ax1.grid(axis='x', alpha=0.3, linestyle='--')
+
+    # Add value labels
+    for bar, count in zip(bars, pt_wt_symp):
+        ax1.text(count + 0.1, bar.get_y() + bar.get_height() / 2,
+                 str(count), va='center', fontsize=10, fontweight='bold')
+
+    step(60, "Drawing the distribution...")
+    colors_pie = colormaps['Set3'](range(len(symptom_names)))
+    wedges, texts, autotexts = ax2.pie(pt_wt_symp, labels=symptom_names, autopct='%1.1f%%',
+                                       startangle=90, colors=colors_pie)
+    ax2.set_title('Distribution of Symptoms', fontsize=14, fontweight='bold')
+
+    # Make percentage text bold
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+
+    summary = "Patients per Symptom:\n\n"
+    for symptom, count in symptom_counts.items():
+        summary += f"{symptom}: {count} patients\n"
+    return Report("Patients by Symptom Report", _finish(figure, step), summary,
+                  columns=("Symptom", "Patients"), rows=list(symptom_counts.items()))
+
+
+def patients_by_age_report(patients, index=None, step=_no_progress) -> Report:
+    """Builds the number of patients per age group, with their symptoms.
+
+    Args:
+        patients (list): The active patients.
+        index (PatientIndex): The index kept up to date with patients, if any.
+        step: Progress callback, step(value, status).
+
+    Returns:
+        Report: The chart and summary.
+
+    Raises:
+        NoReportData: There are no patients.
+    """
+    step(5, "Reading the patients...")
+    columns = patient_columns(patients, index)
+    if not len(columns):
+        raise NoReportData("No patients found.")
+    step(40, "Counting patients per age group...")
+    age_counts = columns.age_histogram()
+    symptom_names, age_groups, cells = columns.symptoms_by_age()
+
+    step(60, "Drawing the chart...")
+    figure = _new_figure((16, 6))
+    ax1, ax2 = figure.subplots(1, 2)
+
+    # Bar chart of the age groups
+    ax1.bar(list(age_counts), list(age_counts.values()), color='#3498db', edgecolor='black')
+    ax1.set_xlabel('Age Group', fontsize=12, fontweight='bold')
+    ax1.set_ylabel('Number of Patients', fontsize=12, fontweight='bold')
+    ax1.set_title('Patients per Age Group', fontsize=14, fontweight='bold')
+    ax1.grid(axis='y', alpha=0.3, linestyle='--')
+
+    # Heat map of symptoms against age groups
+    image = ax2.imshow(cells, aspect='auto', cmap='viridis')
+    ax2.set_xticks(range(len(age_groups)))
+    ax2.set_xticklabels(age_groups)
+    ax2.set_yticks(range(len(symptom_names)))
+    ax2.set_yticklabels(symptom_names)
+    ax2.set_title('Symptoms by Age Group', fontsize=14, fontweight='bold')
+    figure.colorbar(image, ax=ax2, label='Patients')
+
+    summary = "Patients per Age Group:\n\n"
+    for age_group, count in age_counts.items():
+        summary += f"{age_group}: {count} patients\n"
+    # One row per age group: its patients, then how many of them report each symptom
+    rows = [(age_group, age_counts[age_group], *symptom_counts)
+            for age_group, symptom_counts in zip(age_groups, cells.T.tolist())]
+    return Report("Patients by Age Group Report", _finish(figure, step), summary,
+                  columns=("Age Group", "Patients", *symptom_names), rows=rows)
+
+
+def all_appointments_report(storage, step=_no_progress) -> Report:
+    """Builds the table of every current appointment, grouped by year and month.
+
+    Args:
+        storage: The storage the appointments are kept in.
+        step: Progress callback, step(value, status).
+
+    Returns:
+        Report: The HTML document.
+
+    Raises:
+        NoReportData: There are no appointments.
+    """
+    step(5, "Reading appointments...")
+    appointments = {}
+    for appointment in storage.load_current_appointments():
+        # Group by year/month
+        year_month = (appointment.get_datetime().year, appointment.get_datetime().month)
+        if year_month not in appointments:
+            appointments[year_month] = []
+        appointments[year_month].append(appointment)
+    if not appointments:
+        raise NoReportData("No appointments found.")
+
+    parts = ["<h2>All Appointments</h2>"]
+    rows = []
+    months = sorted(appointments.keys())
+    for i, year_month in enumerate(months):
+        year, month = year_month
+        step(30 + 65 * i // len(months), f"Listing {MONTH_NAMES[int(month)]} {year}...")
+
+        parts.append(f"<h3>{MONTH_NAMES[int(month)]} {year}</h3>")
+        parts.append("<table border='1' cellpadding='5' cellspacing='0' width='100%'>")
+        parts.append("<tr><th>Patient Name</th><th>Doctor Name</th><th>Appointment Date/Time</th></tr>")
+
+        for appointment in appointments[year_month]:
+            parts.append(f"<tr><td>{appointment.get_patient()}</td><td>{appointment.get_doctor()}</td>"
+                         f"<td>{appointment.datetime_text()}</td></tr>")
+            rows.append((appointment.get_patient(), appointment.get_doctor(), appointment.datetime_text()))
+
+        parts.append("</table><br>")
+    return Report("All Appointments", html="".join(parts),
+                  columns=("Patient Name", "Doctor Name", "Appointment Date/Time"), rows=rows)
+
+
+def appointment_conflicts_report(scheduler, step=_no_progress) -> Report:
+    """Builds the table of double-booked appointments: current appointments of a doctor whose slots overlap.
+
+    Args:
+        scheduler (Scheduler): The doctors' schedules.
+        step: Progress callback, step(value, status).
+
+    Returns:
+        Report: The HTML document.
+
+    Raises:
+        NoReportData: No appointments overlap.
+    """
+    step(5, "Reading the schedules...")
+    conflicts = scheduler.conflicts()
+    if not conflicts:
+        raise NoReportData("No double-booked appointments found.")
+
+    minutes = int(scheduler.slot.total_seconds() // 60)
+    parts = ["<h2>Appointment Conflicts</h2>",
+             f"<p>{len(conflicts)} pairs of appointments overlap ({minutes} minute slots).</p>",
+             "<table border='1' cellpadding='5' cellspacing='0' width='100%'>",
+             "<tr><th>Doctor Name</th><th>Patient Name</th><th>Appointment Date/Time</th>"
+             "<th>Overlaps Patient</th><th>Appointment Date/Time</th></tr>"]
+    rows = []
+    for i, (first, second) in enumerate(conflicts):
+        if i % STEP_EVERY == 0:
+            step(30 + 65 * i // len(conflicts), "Listing the conflicts...")
+        row = (first.get_doctor(), first.get_patient(), first.datetime_text(),
+               second.get_patient(), second.datetime_text())
+        parts.append("<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>")
+        rows.append(row)
+    parts.append("</table>")
+    return Report("Appointment Conflicts", html="".join(parts),
+                  columns=("Doctor Name", "Patient Name", "Appointment Date/Time",
+                           "Overlaps Patient", "Overlaps Date/Time"), rows=rows)
+
+
+# Reports of the batch run: file name -> (builder, names of the inputs it takes)
+BATCH_REPORTS = {
+    "doctors": (total_doctors_report, ("doctors", "aggregates")),
+    "patients_per_doctor": (patients_per_doctor_report, ("doctors", "aggregates")),
+    "appointments_per_month": (appointments_per_month_report, ("doctors", "aggregates")),
+    "patients_per_symptom": (patients_by_symptom_report, ("aggregates",)),
+    "patients_per_age_group": (patients_by_age_report, ("patients", "index")),
+    "all_appointments": (all_appointments_report, ("storage",)),
+    "appointment_conflicts": (appointment_conflicts_report, ("scheduler",)),
+}
+FORMATS = ("png", "svg", "csv", "html")
+
+_inputs = {}  # Filled by the batch run before its worker processes are forked
+
+
+def write_report(report: Report, path: str, formats) -> list:
+    """Writes a report to files named path plus the extension of each format.
+
+    Charts are written as png or svg, the document of a table report as html,
+    and the table of any report as csv. Formats a report has nothing for are
+    skipped.
+
+    Args:
+        report (Report): The finished report.
+        path (str): Path of the files without extension.
+        formats: Some of FORMATS.
+
+    Returns:
+        list: The paths written.
+    """
+    import csv
+
+    written = []
+    for file_format in formats:
+        target = f"{path}.{file_format}"
+        if file_format in ("png", "svg") and report.figure is not None:
+            report.figure.savefig(target, format=file_format)
+        elif file_format == "html" and report.html is not None:
+            with open(target, "w", encoding="utf-8") as f:
+                f.write(report.html)
+        elif file_format == "csv" and report.columns:
+            with open(target, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(report.columns)
+                writer.writerows(report.rows)
+        else:
+            continue
+        written.append(target)
+    return written
+
+
+def _build_and_write(name: str, directory: str, formats) -> tuple:
+    """Builds one batch report from the inputs of the run and writes it (runs in a worker process)."""
+    import time
+
+    start = time.perf_counter()
+    builder, input_names = BATCH_REPORTS[name]
+    try:
+        report = builder(*(_inputs[input_name] for input_name in input_names))
+    except NoReportData as e:
+        return name, [], str(e), time.perf_counter() - start
+    return name, write_report(report, os.path.join(directory, name), formats), None, time.perf_counter() - start
+
+
+def _load_inputs(names):
+    """Loads what the named reports need into _inputs, so the worker processes inherit it.
+
+    The patients are only loaded when a report draws on them or the saved
+    report counters no longer match the data and have to be rebuilt.
+    """
+    from Main import load_doctors
+    from PatientIndex import PatientIndex
+    from Registry import Registry
+    from Reports import get_report_aggregates
+    from Storage import get_storage
+
+    needed = {input_name for name in names for input_name in BATCH_REPORTS[name][1]}
+    storage = get_storage()
+    doctors = load_doctors()
+    _inputs.update(storage=storage, doctors=doctors)
+    aggregates = get_report_aggregates()
+    if "patients" in needed or ("aggregates" in needed and not aggregates.load_saved(doctors)):
+        patients = storage.load_patients()
+        Registry(doctors, patients).link_patients()
+        index = PatientIndex(patients)
+        aggregates.attach(doctors, patients, index)
+        _inputs.update(patients=patients, index=index)
+    if "aggregates" in needed:
+        aggregates.doctors_per_speciality()  # Rebuilds and saves stale counters once, before forking
+        _inputs["aggregates"] = aggregates
+    if "patients" in needed:
+        patient_columns(_inputs["patients"], _inputs["index"])  # Built once, shared with the workers
+    if "storage" in needed:
+        storage.load_current_appointments()  # Reads the appointment files once, before forking
+    if "scheduler" in needed:
+        from Scheduler import get_scheduler
+
+        _inputs["scheduler"] = get_scheduler()
+        _inputs["scheduler"].for_doctor("")  # Builds the schedules once, before forking
+
+
+def main():
+    import argparse
+    import multiprocessing
+    import time
+
+    parser = argparse.ArgumentParser(
+        description="Write the management reports to files without a display, for example from cron.")
+    parser.add_argument("--out", required=True, help="directory the report files are written to")
+    parser.add_argument("--reports", default=",".join(BATCH_REPORTS),
+                        help=f"comma-separated reports to write (default all: {','.join(BATCH_REPORTS)})")
+    parser.add_argument("--formats", default="png,csv",
+                        help=f"comma-separated file formats among {','.join(FORMATS)} (default png,csv)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="reports built at the same time, in separate processes (default: CPU count)")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.reports.split(",") if name.strip()]
+    formats = [file_format.strip().lower() for file_format in args.formats.split(",") if file_format.strip()]
+    unknown = [name for name in names if name not in BATCH_REPORTS] + [f for f in formats if f not in FORMATS]
+    if unknown:
+        parser.error(f"unknown report or format: {', '.join(unknown)}")
+    os.makedirs(args.out, exist_ok=True)
+
+    start = time.perf_counter()
+    _load_inputs(names)
+    print(f"Loaded the data in {time.perf_counter() - start:.1f}s")
+
+    workers = min(args.workers, len(names))
+    jobs = [(name, args.out, formats) for name in names]
+    # Forked workers share the loaded data; where processes can only be spawned the
+    # reports are built one after another instead of loading the data in every worker
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            results = pool.starmap(_build_and_write, jobs)
+    else:
+        results = [_build_and_write(*job) for job in jobs]
+
+    for name, paths, empty, elapsed in results:
+        outcome = f"skipped ({empty})" if empty else ", ".join(os.path.basename(path) for path in paths)
+        print(f"{name:<24} {elapsed:6.1f}s  {outcome}")
+    print(f"Wrote {sum(len(paths) for _, paths, _, _ in results)} files to {args.out} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""Management report figures: incrementally kept counters and a columnar snapshot of the patients.
+
+The counters (ReportAggregates) back the reports that only need totals. The
+snapshot (PatientColumns) is built the first time a report needs it and kept
+until the patients change. NumPy (which matplotlib already depends on) is
+imported on first use, so importing this module keeps it out of start-up.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+
+from Storage import get_storage
+
+AGE_BANDS = (0, 18, 30, 45, 60, 75)  # Lower edge of each age group; the last one is open-ended
+AGGREGATES_FILE = "report_aggregates.json"
+AGGREGATES_FORMAT = 2  # Bump when the meaning or layout of the saved counters changes
+
+_snapshot = None
+_aggregates = None
+
+
+def get_report_aggregates():
+    """Return the report aggregates shared by the terminal and GUI front ends (created once per process)."""
+    global _aggregates
+    if _aggregates is None:
+        _aggregates = ReportAggregates(get_storage())
+    return _aggregates
+
+
+def age_band_labels(bands=AGE_BANDS) -> list:
+    """Returns the display labels of age groups, such as "18-29" and "75+"."""
+    labels = [f"{low}-{high - 1}" for low, high in zip(bands, bands[1:])]
+    return labels + [f"{bands[-1]}+"]
+
+
+def patient_columns(patients, index=None):
+    """Returns a columnar snapshot of the patients, reusing the last one while nothing changed.
+
+    The snapshot is only reused when it was built from the same list and
+    PatientIndex and the index has not seen an add, update or remove since;
+    without an index a new snapshot is built on every call.
+
+    Args:
+        patients (list): The active patients.
+        index (PatientIndex): The index kept up to date with every change to patients.
+
+    Returns:
+        PatientColumns: The snapshot.
+    """
+    global _snapshot
+    if index is not None and _snapshot is not None:
+        source_patients, source_index, version = _snapshot.source
+        if source_patients is patients and source_index is index and version == index.version:
+            return _snapshot
+    columns = PatientColumns.from_patients(patients)
+    if index is not None:
+        columns.source = (patients, index, index.version)
+        _snapshot = columns
+    return columns
+
+
+class PatientColumns:
+    """The report-relevant fields of every patient, stored as NumPy arrays.
+
+    Row i describes the i-th patient. Symptoms are stored CSR-style: the
+    codes of patient i are symptom_codes[symptom_offsets[i]:symptom_offsets[i + 1]],
+    and each code is a position in symptom_names. Counts are computed with
+    bincount over these codes instead of calling getters on every patient.
+    """
+
+    def __init__(self, ages, symptom_offsets, symptom_codes, symptom_names):
+        """
+        Args:
+            ages (ndarray): Age of each patient.
+            symptom_offsets (ndarray): Start of each patient's symptoms in symptom_codes, plus the end.
+            symptom_codes (ndarray): Symptom codes of all patients, one patient after the other.
+            symptom_names (list): Symptom name of each code.
+        """
+        self.ages = ages
+        self.symptom_offsets = symptom_offsets
+        self.symptom_codes = symptom_codes
+        self.symptom_names = symptom_names
+        self.source = None  # (patients, index, index version) the snapshot was built from
+        self._rows = None
+
+    @classmethod
+    def from_patients(cls, patients):
+        """Builds the snapshot in one pass over the patients.
+
+        Args:
+            patients (list): The active patients.
+
+        Returns:
+            PatientColumns: The snapshot.
+        """
+        import numpy as np
+
+        symptom_codes_by_name = {}
+        symptom_counts = []
+        symptom_codes = []
+        add_count = symptom_counts.append
+        add_code = symptom_codes.append
+        for patient in patients:
+            symptoms = patient.get_symptoms()
+            add_count(len(symptoms))
+            for symptom in symptoms:
+                code = symptom_codes_by_name.get(symptom)
+                if code is None:
+                    code = symptom_codes_by_name[symptom] = len(symptom_codes_by_name)
+                add_code(code)
+
+        count = len(patients)
+        symptom_counts = np.array(symptom_counts, dtype=np.int64)
+        symptom_codes = np.array(symptom_codes, dtype=np.int64)
+        # Merge names that only differ in surrounding spaces and drop empty ones
+        symptom_names = list(dict.fromkeys(name.strip() for name in symptom_codes_by_name if name.strip()))
+        positions = {name: position for position, name in enumerate(symptom_names)}
+        recode = np.array([positions.get(name.strip(), -1) for name in symptom_codes_by_name], dtype=np.int64)
+        symptom_codes = recode[symptom_codes] if len(symptom_codes) else symptom_codes
+        if (symptom_codes < 0).any():
+            kept = symptom_codes >= 0
+            symptom_counts = np.bincount(np.repeat(np.arange(count), symptom_counts)[kept], minlength=count)
+            symptom_codes = symptom_codes[kept]
+        symptom_offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(symptom_counts, out=symptom_offsets[1:])
+        return cls(np.fromiter((patient.get_age() for patient in patients), dtype=np.int32, count=count),
+                   symptom_offsets,
+                   symptom_codes,
+                   symptom_names)
+
+    def __len__(self):
+        return len(self.ages)
+
+    def _symptom_rows(self):
+        """Returns the patient row of every entry of symptom_codes."""
+        import numpy as np
+        if self._rows is None:
+            self._rows = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.symptom_offsets))
+        return self._rows
+
+    def _age_groups(self, bands):
+        """Returns the age group of every patient, looked up by age."""
+        import numpy as np
+        ages = np.clip(self.ages, 0, None)
+        groups = np.searchsorted(np.asarray(bands[1:]), np.arange(int(ages.max(initial=0)) + 1), side="right")
+        return groups[ages]
+
+    def age_histogram(self, bands=AGE_BANDS) -> dict:
+        """Returns the number of patients in each age group.
+
+        Args:
+            bands (tuple): Lower edge of each age group, in increasing order.
+
+        Returns:
+            dict: Age group label -> number of patients, youngest first.
+        """
+        import numpy as np
+        counts = np.bincount(self._age_groups(bands), minlength=len(bands))
+        return dict(zip(age_band_labels(bands), counts.tolist()))
+
+    def symptoms_by_age(self, bands=AGE_BANDS) -> tuple:
+        """Cross-tabulates symptoms against age groups.
+
+        Args:
+            bands (tuple): Lower edge of each age group, in increasing order.
+
+        Returns:
+            tuple: The symptom names, the age group labels and a matrix with one
+                row per symptom and one column per age group.
+        """
+        import numpy as np
+        groups = self._age_groups(bands)[self._symptom_rows()]
+        cells = np.bincount(self.symptom_codes * len(bands) + groups,
+                            minlength=len(self.symptom_names) * len(bands))
+        return list(self.symptom_names), age_band_labels(bands), cells.reshape(len(self.symptom_names), len(bands))
+
+
+class ReportAggregates:
+    """Counters behind the management reports, kept up to date as records change.
+
+    Holds the number of doctors per speciality, patients per doctor and per
+    symptom, and current appointments per doctor and month, so opening a
+    report costs the size of its result instead of a pass over every patient
+    and appointment file. Patient and appointment changes arrive through
+    listeners on the PatientIndex and the storage's AppointmentIndex; doctor
+    changes through add_doctor(), remove_doctor() and change_speciality().
+
+    The counters are saved to report_aggregates.json together with a stamp of
+    the data files (Storage.data_stamp()) and the file format. When the
+    stamp no longer matches, for example after a crash or an edit made
+    outside the application, they are rebuilt from the records the first
+    time a report needs them.
+    """
+
+    def __init__(self, storage, path: str = AGGREGATES_FILE):
+        """
+        Args:
+            storage: The storage the records are kept in.
+            path (str): The file the counters are saved to.
+        """
+        self._storage = storage
+        self._path = path
+        self._doctors = None
+        self._index = None
+        self._counters = None  # None while the counters have to be rebuilt
+        self._dirty = False
+        storage.watch_appointments(self)
+        atexit.register(self.save)
+
+    def attach(self, doctors, patients, index):
+        """Follows the doctors and the patient index of a front end, loading the saved counters if still valid.
+
+        Args:
+            doctors (list): The doctors.
+            patients (list): The active patients, as indexed by index.
+            index (PatientIndex): The index kept up to date with every change to patients.
+
+        Returns:
+            ReportAggregates: self.
+        """
+        if index is self._index:
+            self._doctors = doctors
+            return self
+        if self._index is not None:
+            self._index.remove_listener(self)
+            self._counters = None  # Changes made through the other index were not seen
+        self._doctors = doctors
+        self._index = index
+        index.add_listener(self)
+        if self._counters is None:
+            self._counters = self._load()
+        return self
+
+    def load_saved(self, doctors) -> bool:
+        """Uses the saved counters without following a patient index, for one-off readers such as batch runs.
+
+        Args:
+            doctors (list): The doctors.
+
+        Returns:
+            bool: False when there are no saved counters matching the data; attach() the patients then.
+        """
+        self._doctors = doctors
+        if self._counters is None:
+            self._counters = self._load()
+        return self._counters is not None
+
+    def _load(self):
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if saved.get("format") != AGGREGATES_FORMAT or saved.get("stamp") != self._storage.data_stamp():
+            return None
+        return {
+            "specialities": saved["specialities"],
+            "doctors": {_id_from_key(key): count for key, count in saved["doctors"].items()},
+            "symptoms": saved["symptoms"],
+            "appointments": {_id_from_key(key): {tuple(map(int, month.split("-"))): count
+                                                 for month, count in months.items()}
+                             for key, months in saved["appointments"].items()},
+        }
+
+    def _rebuild(self):
+        counters = {"specialities": {}, "doctors": self._index.doctor_counts(), "symptoms": {}, "appointments": {}}
+        for doctor in self._doctors:
+            _bump(counters["specialities"], doctor.get_speciality(), 1)
+        for symptom, count in self._index.symptom_counts().items():
+            if symptom.strip():
+                _bump(counters["symptoms"], symptom.strip(), count)
+        self._counters = counters
+        self._count_appointments(self._storage.load_current_appointments())
+        self._dirty = True
+        self.save()
+
+    def _count_appointments(self, appointments):
+        counts = {}
+        for appointment in appointments:
+            _bump(counts.setdefault(appointment.get_doctor_id(), {}), _month_of(appointment), 1)
+        self._counters["appointments"] = counts
+
+    def _current(self) -> dict:
+        if self._counters is None:
+            if self._index is None:
+                raise RuntimeError("attach() the report aggregates to the doctors and patients first")
+            self._rebuild()
+        return self._counters
+
+    def save(self):
+        """Writes the counters and the current data stamp, if they changed since the last save."""
+        if self._counters is None or not self._dirty:
+            return
+        counters = self._counters
+        saved = {
+            "format": AGGREGATES_FORMAT,
+            "stamp": self._storage.data_stamp(),
+            "specialities": counters["specialities"],
+            "doctors": {_key_from_id(doctor_id): count for doctor_id, count in counters["doctors"].items()},
+            "symptoms": counters["symptoms"],
+            "appointments": {_key_from_id(doctor_id): {f"{year}-{month:02d}": count
+                                                       for (year, month), count in months.items()}
+                             for doctor_id, months in counters["appointments"].items()},
+        }
+        directory = os.path.dirname(os.path.abspath(self._path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".aggregates_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(saved, f)
+            os.replace(temp_path, self._path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._dirty = False
+
+    # Listener callbacks
+
+    def patient_changed(self, old_keys, new_keys):
+        """Moves a patient's counts from its old doctor and symptoms to the new ones (PatientIndex listener)."""
+        if self._counters is None:
+            return
+        for keys, step in ((old_keys, -1), (new_keys, 1)):
+            if keys is None:
+                continue
+            _bump(self._counters["doctors"], keys["doctor"][0], step)
+            for symptom in keys["symptom"]:
+                if symptom.strip():
+                    _bump(self._counters["symptoms"], symptom.strip(), step)
+        self._dirty = True
+
+    def appointment_changed(self, previous, current):
+        """Moves a patient's appointment count to its new doctor and month (AppointmentIndex listener)."""
+        if self._counters is None:
+            return
+        appointments = self._counters["appointments"]
+        if previous is not None:
+            months = appointments.get(previous.get_doctor_id(), {})
+            _bump(months, _month_of(previous), -1)
+            if not months:
+                appointments.pop(previous.get_doctor_id(), None)
+        _bump(appointments.setdefault(current.get_doctor_id(), {}), _month_of(current), 1)
+        self._dirty = True
+
+    def appointments_rebuilt(self, index):
+        """Recounts the appointments after the index re-read them (AppointmentIndex listener)."""
+        if self._counters is None:
+            return
+        self._count_appointments(index.current())
+        self._dirty = True
+
+    # Doctor changes
+
+    def add_doctor(self, doctor):
+        """Counts a newly registered doctor."""
+        if self._counters is not None:
+            _bump(self._counters["specialities"], doctor.get_speciality(), 1)
+            self._dirty = True
+
+    def remove_doctor(self, doctor):
+        """Stops counting a deleted doctor."""
+        if self._counters is not None:
+            _bump(self._counters["specialities"], doctor.get_speciality(), -1)
+            self._dirty = True
+
+    def change_speciality(self, old_speciality: str, new_speciality: str):
+        """Moves a doctor to another speciality."""
+        if self._counters is not None and old_speciality != new_speciality:
+            _bump(self._counters["specialities"], old_speciality, -1)
+            _bump(self._counters["specialities"], new_speciality, 1)
+            self._dirty = True
+
+    # Reports
+
+    def doctors_per_speciality(self) -> dict:
+        """Returns the number of doctors of each speciality."""
+        return dict(self._current()["specialities"])
+
+    def patients_per_doctor(self, doctors) -> list:
+        """Returns the number of patients of each doctor, in the order of doctors."""
+        counts = self._current()["doctors"]
+        return [counts.get(doctor.record_id, 0) if doctor.record_id is not None else 0 for doctor in doctors]
+
+    def patients_per_symptom(self) -> dict:
+        """Returns the number of patients reporting each symptom, most common first."""
+        return dict(sorted(self._current()["symptoms"].items(), key=lambda item: item[1], reverse=True))
+
+    def appointments_per_doctor_month(self, doctors) -> dict:
+        """Returns doctor name -> {(year, month): number of current appointments}, in the order of doctors.
+
+        The counters are kept per doctor ID; doctors sharing a name are told
+        apart by their ID, and appointments of doctors no longer in doctors
+        come last.
+        """
+        counts = self._current()["appointments"]
+        labels = doctor_labels(doctors)
+        ordered = [doctor.record_id for doctor in doctors if doctor.record_id in counts]
+        ordered += [doctor_id for doctor_id in counts if doctor_id not in labels]
+        return {labels.get(doctor_id) or _unknown_doctor(doctor_id): dict(counts[doctor_id]) for doctor_id in ordered}
+
+    def appointments_per_month(self) -> dict:
+        """Returns (year, month) -> number of current appointments, in date order."""
+        totals = {}
+        for months in self._current()["appointments"].values():
+            for month, count in months.items():
+                _bump(totals, month, count)
+        return dict(sorted(totals.items()))
+
+
+def doctor_labels(doctors) -> dict:
+    """Returns doctor ID -> the name reports show, with the ID added where doctors share a name."""
+    shared = {}
+    for doctor in doctors:
+        _bump(shared, doctor.full_name(), 1)
+    return {doctor.record_id: doctor.full_name() if shared[doctor.full_name()] == 1
+            else f"{doctor.full_name()} (ID {doctor.record_id})" for doctor in doctors}
+
+
+def _unknown_doctor(doctor_id) -> str:
+    return "Unknown doctor" if doctor_id is None else f"Doctor ID {doctor_id}"
+
+
+def _bump(counts: dict, key, step: int):
+    """Adds step to counts[key], dropping the key once it reaches zero."""
+    count = counts.get(key, 0) + step
+    if count:
+        counts[key] = count
+    else:
+        counts.pop(key, None)
+
+
+def _month_of(appointment) -> tuple:
+    moment = appointment.get_datetime()
+    return moment.year, moment.month
+
+
+def _key_from_id(doctor_id) -> str:
+    return "" if doctor_id is None else str(doctor_id)
+
+
+def _id_from_key(key: str):
+    return int(key) if key else None
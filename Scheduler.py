@@ -0,0 +1,252 @@
+"""Per-doctor appointment schedules, used to catch double bookings and find free slots.
+
+Every appointment takes one slot of HMS_SLOT_MINUTES minutes (30 by default)
+from its start time. A doctor's current appointments are kept sorted by
+start time, so checking a new booking against them is a binary search.
+Free slots are searched within working hours, HMS_WORKING_HOURS
+("09:00-17:00" by default) from Monday to Friday.
+"""
+import bisect
+import datetime
+import heapq
+import itertools
+import os
+
+from Appointment import record_key
+from Storage import get_storage
+
+SLOT_MINUTES = int(os.environ.get("HMS_SLOT_MINUTES", "30"))
+WORKING_HOURS = os.environ.get("HMS_WORKING_HOURS", "09:00-17:00")
+WORKING_DAYS = (0, 1, 2, 3, 4)  # Monday to Friday, as datetime.weekday()
+SEARCH_DAYS = 365  # How far ahead free slots are looked for by default
+SUGGESTED_SLOTS = 5  # Free slots offered when booking an appointment
+
+_scheduler = None
+
+
+def get_scheduler():
+    """Return the appointment schedules shared by the terminal and GUI front ends (created once per process)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler(get_storage())
+    return _scheduler
+
+
+class DoctorSchedule:
+    """The current appointments of one doctor, sorted by start time."""
+
+    __slots__ = ("_starts", "_bookings")
+
+    def __init__(self, appointments=()):
+        """
+        Args:
+            appointments: The doctor's current appointments, in any order.
+        """
+        bookings = sorted(appointments, key=lambda appointment: appointment.get_datetime())
+        self._starts = [appointment.get_datetime() for appointment in bookings]
+        self._bookings = bookings
+
+    def __len__(self):
+        return len(self._bookings)
+
+    def add(self, appointment):
+        """Adds an appointment in start time order."""
+        position = bisect.bisect_right(self._starts, appointment.get_datetime())
+        self._starts.insert(position, appointment.get_datetime())
+        self._bookings.insert(position, appointment)
+
+    def remove(self, appointment) -> bool:
+        """Removes an appointment; returns False if it was not in the schedule."""
+        position = bisect.bisect_left(self._starts, appointment.get_datetime())
+        while position < len(self._starts) and self._starts[position] == appointment.get_datetime():
+            if self._bookings[position] is appointment:
+                del self._starts[position]
+                del self._bookings[position]
+                return True
+            position += 1
+        return False
+
+    def overlapping(self, start: datetime.datetime, slot: datetime.timedelta) -> list:
+        """Returns the appointments whose slot overlaps the slot starting at start, earliest first."""
+        low = bisect.bisect_right(self._starts, start - slot)
+        high = bisect.bisect_left(self._starts, start + slot)
+        return self._bookings[low:high]
+
+    def between(self, start: datetime.datetime, end: datetime.datetime) -> list:
+        """Returns the appointments starting at or after start and before end, earliest first."""
+        return self._bookings[bisect.bisect_left(self._starts, start):bisect.bisect_left(self._starts, end)]
+
+    def free(self, candidates, slot: datetime.timedelta):
+        """Yields the candidate start times whose slot overlaps no appointment.
+
+        Args:
+            candidates: Start times in increasing order.
+            slot (timedelta): Length of every appointment.
+        """
+        position = None
+        for start in candidates:
+            if position is None:
+                position = bisect.bisect_right(self._starts, start - slot)
+            while position < len(self._starts) and self._starts[position] <= start - slot:
+                position += 1
+            if position == len(self._starts) or self._starts[position] >= start + slot:
+                yield start
+
+    def conflicts(self, slot: datetime.timedelta) -> list:
+        """Returns every pair of appointments whose slots overlap, in start time order."""
+        pairs = []
+        for i, start in enumerate(self._starts):
+            j = i + 1
+            while j < len(self._starts) and self._starts[j] - start < slot:
+                pairs.append((self._bookings[i], self._bookings[j]))
+                j += 1
+        return pairs
+
+
+class Scheduler:
+    """The schedule of every doctor, kept up to date with the current appointments.
+
+    Only the current appointment of each patient holds a slot: changing an
+    appointment frees the old one. The schedules are built from the storage
+    the first time they are needed and then follow the storage's
+    AppointmentIndex as a listener, the way ReportAggregates does.
+    """
+
+    def __init__(self, storage, slot_minutes: int = SLOT_MINUTES, working_hours: str = WORKING_HOURS):
+        """
+        Args:
+            storage: The storage the appointments are kept in.
+            slot_minutes (int): Length of every appointment.
+            working_hours (str): Opening and closing time, "HH:MM-HH:MM".
+
+        Raises:
+            ValueError: The working hours are not two HH:MM times.
+        """
+        self._storage = storage
+        self.slot = datetime.timedelta(minutes=slot_minutes)
+        opens, closes = working_hours.split("-")
+        self.opens = datetime.datetime.strptime(opens.strip(), "%H:%M").time()
+        self.closes = datetime.datetime.strptime(closes.strip(), "%H:%M").time()
+        self._schedules = None  # Doctor key -> DoctorSchedule, None until first needed
+        storage.watch_appointments(self)
+
+    def _build(self, appointments):
+        by_doctor = {}
+        for appointment in appointments:
+            by_doctor.setdefault(appointment.doctor_key(), []).append(appointment)
+        self._schedules = {doctor: DoctorSchedule(bookings) for doctor, bookings in by_doctor.items()}
+
+    def _current(self) -> dict:
+        if self._schedules is None:
+            appointments = self._storage.load_current_appointments()
+            if self._schedules is None:  # Reading the appointments may have rebuilt them already
+                self._build(appointments)
+        return self._schedules
+
+    # Listener callbacks
+
+    def appointment_changed(self, previous, current):
+        """Frees the slot of a patient's previous appointment and books the new one (AppointmentIndex listener)."""
+        if self._schedules is None:
+            return
+        if previous is not None:
+            schedule = self._schedules.get(previous.doctor_key())
+            if schedule is not None:
+                schedule.remove(previous)
+        self._schedules.setdefault(current.doctor_key(), DoctorSchedule()).add(current)
+
+    def appointments_rebuilt(self, index):
+        """Rebuilds the schedules after the index re-read the appointments (AppointmentIndex listener)."""
+        if self._schedules is not None:
+            self._build(index.current())
+
+    # Queries
+
+    def for_doctor(self, doctor_name: str, doctor_id: int = None) -> DoctorSchedule:
+        """Returns the schedule of a doctor (empty if the doctor has no appointments)."""
+        return self._current().get(record_key(doctor_name, doctor_id)) or DoctorSchedule()
+
+    def conflict(self, doctor_name: str, start: datetime.datetime, doctor_id: int = None,
+                 patient_name: str = None, patient_id: int = None):
+        """Returns an appointment of the doctor that a booking at start would overlap.
+
+        Args:
+            doctor_name (str): Full name of the doctor.
+            start (datetime): Start of the new appointment.
+            doctor_id (int): ID of the doctor.
+            patient_name (str): Full name of the patient being booked, whose own
+                current appointment is about to be replaced and is not a conflict.
+            patient_id (int): ID of that patient.
+
+        Returns:
+            Appointment: The earliest overlapping appointment, or None if the slot is free.
+        """
+        patient = record_key(patient_name, patient_id) if patient_name is not None else None
+        for appointment in self.for_doctor(doctor_name, doctor_id).overlapping(start, self.slot):
+            if patient is None or appointment.patient_key() != patient:
+                return appointment
+        return None
+
+    def conflicts(self) -> list:
+        """Returns every pair of current appointments of a doctor whose slots overlap, earliest first."""
+        pairs = [pair for schedule in self._current().values() for pair in schedule.conflicts(self.slot)]
+        pairs.sort(key=lambda pair: (pair[0].get_datetime(), pair[0].get_doctor()))
+        return pairs
+
+    def _working_slots(self, start: datetime.datetime, end: datetime.datetime):
+        """Yields the slot start times within working hours from start up to end, counted from opening time."""
+        day = start.date()
+        while datetime.datetime.combine(day, datetime.time()) < end:
+            if day.weekday() in WORKING_DAYS:
+                slot_start = datetime.datetime.combine(day, self.opens)
+                closes = datetime.datetime.combine(day, self.closes)
+                while slot_start + self.slot <= closes and slot_start < end:
+                    if slot_start >= start:
+                        yield slot_start
+                    slot_start += self.slot
+            day += datetime.timedelta(days=1)
+
+    def free_slots(self, doctors, start: datetime.datetime = None, end: datetime.datetime = None,
+                   count: int = SUGGESTED_SLOTS) -> list:
+        """Returns the earliest free slots of any of the doctors.
+
+        Args:
+            doctors: The doctors to look at, e.g. one doctor or every doctor of a speciality.
+            start (datetime): Earliest start, now by default.
+            end (datetime): Slots must start before it, SEARCH_DAYS after start by default.
+            count (int): Number of slots wanted.
+
+        Returns:
+            list: Up to count (start time, doctor) pairs, earliest first.
+        """
+        start = start or datetime.datetime.now()
+        end = end or start + datetime.timedelta(days=SEARCH_DAYS)
+
+        def doctor_slots(order, doctor):
+            return ((slot_start, order, doctor) for slot_start in self.iter_free_slots(doctor, start, end))
+
+        merged = heapq.merge(*(doctor_slots(order, doctor) for order, doctor in enumerate(doctors)))
+        return [(slot_start, doctor) for slot_start, _, doctor in itertools.islice(merged, count)]
+
+    def iter_free_slots(self, doctor, start: datetime.datetime = None, end: datetime.datetime = None):
+        """Yields the free slots of a doctor within working hours, earliest first.
+
+        The doctor's bookings are read as the iteration goes, so consume it
+        before booking any of the slots.
+
+        Args:
+            doctor (Doctor): The doctor.
+            start (datetime): Earliest start, now by default.
+            end (datetime): Slots must start before it, SEARCH_DAYS after start by default.
+        """
+        start = start or datetime.datetime.now()
+        end = end or start + datetime.timedelta(days=SEARCH_DAYS)
+        schedule = self.for_doctor(doctor.full_name(), doctor.record_id)
+        return schedule.free(self._working_slots(start, end), self.slot)
+
+    def free_slots_for_speciality(self, doctors, speciality: str, start: datetime.datetime = None,
+                                  end: datetime.datetime = None, count: int = SUGGESTED_SLOTS) -> list:
+        """Returns the earliest free slots of the doctors of a speciality (see free_slots)."""
+        speciality = speciality.strip().lower()
+        return self.free_slots([doctor for doctor in doctors if doctor.get_speciality().strip().lower() == speciality],
+                               start, end, count)
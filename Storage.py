@@ -0,0 +1,1105 @@
+import base64
+import glob
+import os
+import sqlite3
+import threading
+
+from Appointment import (APPOINTMENT_FILE_PATTERN, APPOINTMENT_FORMAT, APPOINTMENT_HEADER, APPOINTMENT_HEADER_PREFIX,
+                         Appointment, AppointmentIndex, appointment_file_for, parse_appointment_datetime,
+                         record_key)
+from Credentials import DOCTOR_ROLE, get_credentials
+from DischargedArchive import PAGE_SIZE, DischargedArchive
+from Doctor import Doctor
+from Journal import PatientJournal
+from Patient import (DISCHARGED_FILE, DISCHARGED_HEADER, PATIENTS_FILE, PATIENTS_HEADER, PROGRESS_INTERVAL,
+                     Patient, check_record_fields, record_conditions)
+from Person import parse_record_id
+
+# Backend selection: "file" keeps the pipe-delimited text files, "sqlite" uses hospital.db
+STORAGE_BACKEND = os.environ.get("HMS_STORAGE", "file")
+SQLITE_FILE = os.environ.get("HMS_SQLITE_FILE", "hospital.db")
+
+DOCTOR_FILE = "doctor.txt"
+DOCTOR_HEADER = "Full Name|Speciality|ID"
+DOCTOR_HEADER_PREFIX = "Full Name|"
+# doctor.txt header used while logins were stored alongside the doctors
+LOGIN_DOCTOR_HEADER = "Full Name|Speciality|Username|Password|ID"
+
+_storage = None
+
+
+def encode_password(password: str) -> str:
+    return base64.b64encode(password.encode("utf-8")).decode("ascii")
+
+
+def decode_password(encoded_password: str) -> str:
+    try:
+        return base64.b64decode(encoded_password.encode("ascii")).decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        return ""
+
+
+def _save_doctor_login(doctor):
+    """Stores a doctor's username, and password if one was set, in the credential store.
+
+    The plain password is cleared once it has been hashed.
+    """
+    if doctor.get_username() is None:
+        return
+    get_credentials().save(doctor.get_username(), DOCTOR_ROLE, doctor.record_id, doctor.get_password())
+    doctor.set_password(None)
+
+
+def _has_header(path: str, header: str) -> bool:
+    """Returns True if the file starts with the given header line."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.readline().rstrip("\n") == header
+
+
+def _files_stamp(backend: str, paths) -> str:
+    """Returns a signature of files (inode, size and modification time) prefixed with the backend name."""
+    parts = [backend]
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            parts.append(f"{path}:-")
+            continue
+        parts.append(f"{path}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+
+def _new_appointments(bookings, index) -> list:
+    """Makes the appointments of new bookings, each the next revision of its patient.
+
+    Args:
+        bookings: (patient_name, doctor_name, appointment_date, patient_id, doctor_id) tuples.
+        index (AppointmentIndex): The appointments stored so far.
+    """
+    appointments = []
+    revisions = {}  # Patient key -> next revision, for a patient booked twice in one batch
+    for patient_name, doctor_name, appointment_date, patient_id, doctor_id in bookings:
+        key = record_key(patient_name, patient_id)
+        revision = revisions.get(key) or index.next_revision(patient_name, patient_id)
+        revisions[key] = revision + 1
+        appointments.append(Appointment(patient_name, doctor_name, appointment_date, False, revision, patient_id,
+                                        doctor_id))
+    return appointments
+
+
+def get_storage():
+    """Return the storage backend selected by HMS_STORAGE (created once per process)."""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "sqlite":
+            _storage = SqliteStorage(SQLITE_FILE)
+        else:
+            _storage = FlatFileStorage()
+    return _storage
+
+
+class FlatFileStorage:
+    """Stores records in the original pipe-delimited text files.
+
+    Patient changes are appended to a journal next to patients_file.txt rather
+    than rewriting it; the journal is folded into a fresh snapshot on a
+    background thread once it passes JOURNAL_COMPACT_BYTES.
+
+    Doctors and patients carry persistent integer IDs (record_id), and
+    patients and appointments store the ID of their doctor. Files written
+    before IDs were stored are migrated the first time they are read.
+    """
+
+    def __init__(self):
+        self._journal = PatientJournal(PATIENTS_FILE)
+        self._compactor = None
+        self._appointments = AppointmentIndex()
+        self._discharged = DischargedArchive(DISCHARGED_FILE)
+        self._ids_checked = False
+        self._last_patient_id = None
+
+    def load_patients(self, progress=None) -> list:
+        """Returns the active patients.
+
+        Args:
+            progress: Optional callable taking (stage, done, total), see
+                Patient.read_patient_records.
+        """
+        self._ensure_ids()
+        if not os.path.exists(PATIENTS_FILE) and not self._journal.exists():
+            return []
+        with self._journal.lock:
+            return Patient.read_patient_records(PATIENTS_FILE, progress)
+
+    def iter_patients(self, fields=None, where=None):
+        """Yields the active patients lazily, reading patients_file.txt once.
+
+        Args:
+            fields: Optional field names; see Patient.iter_patient_records.
+            where (dict): Optional field name -> value or predicate; see Patient.iter_patient_records.
+        """
+        self._ensure_ids()
+        if not os.path.exists(PATIENTS_FILE) and not self._journal.exists():
+            return iter(())
+        return Patient.iter_patient_records(PATIENTS_FILE, fields, where, journal=self._journal)
+
+    def save_patients(self, patients):
+        """Rewrites patients_file.txt with the given patients."""
+        self._ensure_ids()
+        for patient in patients:
+            if patient.record_id is None:
+                patient.record_id = self._next_patient_id()
+        with self._journal.lock:
+            Patient.write_patient_records(PATIENTS_FILE, patients)
+            self._journal.reset()
+        for patient in patients:
+            patient.saved_record = patient.to_file_format()
+
+    def add_patient(self, patient):
+        """Records a newly admitted patient, giving it the next patient ID."""
+        self._ensure_ids()
+        if patient.record_id is None:
+            patient.record_id = self._next_patient_id()
+        record = patient.to_file_format()
+        self._journal.append("add", after=record)
+        patient.saved_record = record
+        self._compact_if_needed()
+
+    def update_patient(self, patient, patients=None):
+        """Persists changes made to a single patient.
+
+        Args:
+            patient (Patient): The patient that changed.
+            patients (list): Unused, accepted for compatibility with callers that pass all patients.
+        """
+        if patient.saved_record is None:
+            self.add_patient(patient)
+            return
+        record = patient.to_file_format()
+        if record == patient.saved_record:
+            return
+        self._journal.append("update", before=patient.saved_record, after=record)
+        patient.saved_record = record
+        self._compact_if_needed()
+
+    def update_patients(self, changed, patients=None):
+        """Persists changes made to several patients with a single journal write.
+
+        Args:
+            changed (list): The patients that changed; new patients are added.
+            patients (list): Unused, accepted for compatibility with callers that pass all patients.
+        """
+        self._ensure_ids()
+        changes = []
+        records = []
+        for patient in changed:
+            if patient.saved_record is None:
+                if patient.record_id is None:
+                    patient.record_id = self._next_patient_id()
+                record = patient.to_file_format()
+                changes.append(("add", None, record))
+            else:
+                record = patient.to_file_format()
+                if record == patient.saved_record:
+                    continue
+                changes.append(("update", patient.saved_record, record))
+            records.append((patient, record))
+        self._journal.append_many(changes)
+        for patient, record in records:
+            patient.saved_record = record
+        self._compact_if_needed()
+
+    def discharge_patient(self, patient, patients=None):
+        """Moves a patient to the discharged archive.
+
+        Args:
+            patient (Patient): The patient being discharged.
+            patients (list): Unused, accepted for compatibility with callers that pass the remaining patients.
+        """
+        self.discharge_patients([patient], patients)
+
+    def discharge_patients(self, discharged, patients=None):
+        """Moves several patients to the discharged archive with one write to each file.
+
+        Args:
+            discharged (list): The patients being discharged.
+            patients (list): Unused, accepted for compatibility with callers that pass the remaining patients.
+        """
+        if not discharged:
+            return
+        Patient.append_discharged_patients(discharged)
+        self._journal.append_many([("remove", patient.saved_record, None)
+                                   for patient in discharged if patient.saved_record is not None])
+        for patient in discharged:
+            patient.saved_record = None
+        self._compact_if_needed()
+
+    def compact(self):
+        """Folds the journal into a fresh patients_file.txt snapshot."""
+        with self._journal.lock:
+            lines = Patient.read_record_lines(PATIENTS_FILE)
+            Patient.write_record_lines(PATIENTS_FILE, lines)
+            self._journal.reset()
+
+    def _compact_if_needed(self):
+        if not self._journal.needs_compaction():
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name="journal-compaction", daemon=True)
+        self._compactor.start()
+
+    def load_discharged(self) -> list:
+        """Returns the discharged patients."""
+        self._ensure_ids()
+        return Patient.read_discharged_patients()
+
+    def iter_discharged(self, fields=None, where=None):
+        """Yields the discharged patients lazily; fields and where as for iter_patients()."""
+        self._ensure_ids()
+        return Patient.iter_discharged_patients(fields, where)
+
+    def discharged_count(self, search=None) -> int:
+        """Returns the number of discharged patients, or of those whose name or doctor contains search."""
+        self._ensure_ids()
+        return self._discharged.count(search)
+
+    def discharged_page(self, page, page_size=PAGE_SIZE, search=None) -> list:
+        """Returns one page of discharged patients, read by seeking to it in discharged_patient.txt.
+
+        Args:
+            page (int): Zero-based page number.
+            page_size (int): Patients per page.
+            search (str): Only patients whose name or doctor contains this text, case-insensitively.
+        """
+        self._ensure_ids()
+        return self._discharged.page(page, page_size, search)
+
+    def has_doctors(self) -> bool:
+        """Returns True once the doctor file has been created."""
+        return os.path.exists(DOCTOR_FILE) and os.path.getsize(DOCTOR_FILE) > 0
+
+    def load_doctors(self) -> list:
+        """Returns the registered doctors."""
+        self._ensure_ids()
+        return self._read_doctor_file()
+
+    def _read_doctor_file(self) -> list:
+        doctors = []
+        if not self.has_doctors():
+            return doctors
+
+        credentials = get_credentials()
+        with open(DOCTOR_FILE, "r", encoding="utf-8") as f:
+            header = f.readline().rstrip("\n")
+            f.seek(0)
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith(DOCTOR_HEADER_PREFIX):
+                    continue
+                parts = [part.strip() for part in line.split("|")]
+                if header == DOCTOR_HEADER:
+                    if len(parts) < 3:
+                        continue
+                    full_name, speciality = parts[:2]
+                    record_id = parse_record_id(parts[2])
+                    username = credentials.username_for(DOCTOR_ROLE, record_id)
+                    password = None
+                elif len(parts) < 4:
+                    continue
+                elif len(parts) >= 5 and header != LOGIN_DOCTOR_HEADER:
+                    # Legacy rows with the first name and surname in separate columns
+                    first_name, surname, speciality, username, encoded_password = parts[:5]
+                    password = decode_password(encoded_password)
+                    record_id = None
+                    full_name = None
+                else:
+                    full_name, speciality, username, encoded_password = parts[:4]
+                    password = decode_password(encoded_password)
+                    record_id = parse_record_id(parts[4]) if len(parts) >= 5 else None
+                if header != DOCTOR_HEADER and not (username and password):
+                    continue
+
+                if full_name is not None:
+                    name_parts = full_name.split()
+                    if not name_parts:
+                        continue
+                    first_name = name_parts[0]
+                    surname = " ".join(name_parts[1:]) if len(name_parts) > 1 else ""
+
+                if not all([first_name, speciality]):
+                    continue
+                doctor = Doctor(first_name, surname, speciality, username, password)
+                doctor.record_id = record_id
+                doctors.append(doctor)
+        return doctors
+
+    def save_doctors(self, doctors):
+        """Rewrites doctor.txt with the given doctors, giving new doctors the next free IDs.
+
+        New usernames and passwords are stored in the credential store, not in doctor.txt.
+        """
+        last_id = max((doctor.record_id or 0 for doctor in doctors), default=0)
+        for doctor in doctors:
+            if doctor.record_id is None:
+                last_id += 1
+                doctor.record_id = last_id
+            _save_doctor_login(doctor)
+        with open(DOCTOR_FILE, "w", encoding="utf-8") as f:
+            f.write(DOCTOR_HEADER + "\n")
+            for doctor in doctors:
+                f.write(self._doctor_line(doctor) + "\n")
+
+    def update_doctor(self, doctor, old_username=None):
+        """Updates the stored record of a doctor, adding it if it does not exist yet.
+
+        Args:
+            doctor (Doctor): The doctor to store.
+            old_username (str): Unused, records are matched by their ID.
+        """
+        self._ensure_ids()
+        lines = []
+        updated = False
+        last_id = 0
+
+        if os.path.exists(DOCTOR_FILE):
+            with open(DOCTOR_FILE, "r", encoding="utf-8") as f:
+                for line in f:
+                    raw = line.rstrip("\n")
+                    parts = raw.split("|")
+                    if raw.startswith(DOCTOR_HEADER_PREFIX):
+                        continue
+                    if len(parts) < 3:
+                        lines.append(raw)
+                        continue
+                    record_id = parse_record_id(parts[2])
+                    last_id = max(last_id, record_id or 0)
+                    if not updated and doctor.record_id is not None and record_id == doctor.record_id:
+                        lines.append(self._doctor_line(doctor))
+                        updated = True
+                    else:
+                        lines.append(raw)
+
+        if not updated:
+            if doctor.record_id is None:
+                doctor.record_id = last_id + 1
+            lines.append(self._doctor_line(doctor))
+
+        _save_doctor_login(doctor)
+        with open(DOCTOR_FILE, "w", encoding="utf-8") as f:
+            f.write(DOCTOR_HEADER + "\n" + "\n".join(lines) + "\n")
+
+    def delete_doctor(self, doctor, doctors):
+        """Removes a doctor.
+
+        Args:
+            doctor (Doctor): The doctor being removed.
+            doctors (list): The remaining doctors.
+        """
+        self.save_doctors(doctors)
+        credentials = get_credentials()
+        credentials.remove(credentials.username_for(DOCTOR_ROLE, doctor.record_id))
+
+    def add_appointment(self, patient_name, doctor_name, appointment_date, updated=False, patient_id=None,
+                        doctor_id=None):
+        """Appends an appointment to the {year}_appointments.txt file as the patient's next revision."""
+        revision = self.appointment_index().next_revision(patient_name, patient_id)
+        appointment = Appointment(patient_name, doctor_name, appointment_date, updated, revision, patient_id,
+                                  doctor_id)
+        appointment_file = appointment_file_for(appointment_date.year)
+        self._ensure_appointment_header(appointment_file)
+        with open(appointment_file, 'a', encoding="utf-8") as f:
+            f.write(appointment.to_file_format() + "\n")
+        self._appointments.add(appointment, appointment_file)
+
+    def add_appointments(self, bookings):
+        """Appends new bookings, each as its patient's next revision, with one write per year file.
+
+        Args:
+            bookings: (patient_name, doctor_name, appointment_date, patient_id, doctor_id) tuples.
+        """
+        by_file = {}
+        for appointment in _new_appointments(bookings, self.appointment_index()):
+            by_file.setdefault(appointment_file_for(appointment.get_datetime().year), []).append(appointment)
+        for appointment_file, appointments in sorted(by_file.items()):
+            self._ensure_appointment_header(appointment_file)
+            with open(appointment_file, 'a', encoding="utf-8") as f:
+                f.write("".join(appointment.to_file_format() + "\n" for appointment in appointments))
+            # Indexed file by file, so a new year file is read by refresh() before the next one is written
+            self._appointments.add_many(appointments, appointment_file)
+
+    def appointment_index(self) -> AppointmentIndex:
+        """Returns the appointment index, re-reading only year files changed on disk."""
+        self._ensure_ids()
+        self._appointments.refresh()
+        return self._appointments
+
+    def watch_appointments(self, listener):
+        """Registers a listener on the appointment index without loading it (see AppointmentIndex.add_listener)."""
+        self._appointments.add_listener(listener)
+
+    def data_stamp(self) -> str:
+        """Returns a signature of the patient, doctor and appointment files that changes whenever one is written."""
+        paths = [PATIENTS_FILE, self._journal.path, DOCTOR_FILE] + sorted(glob.glob(APPOINTMENT_FILE_PATTERN))
+        return _files_stamp("file", paths)
+
+    def load_appointments(self) -> list:
+        """Returns all appointment rows, superseded revisions included."""
+        return self.appointment_index().all()
+
+    def load_current_appointments(self) -> list:
+        """Returns the current appointment revision of every patient."""
+        return self.appointment_index().current()
+
+    def compact_appointments(self, archive=False) -> tuple:
+        """Rewrites the year files keeping only current appointment revisions.
+
+        Args:
+            archive (bool): Move superseded rows to the archive files instead of dropping them.
+
+        Returns:
+            tuple: Number of rows kept and number of rows removed.
+        """
+        return self._appointments.compact(archive=archive)
+
+    def _ensure_appointment_header(self, appointment_file: str):
+        if not os.path.exists(appointment_file) or os.path.getsize(appointment_file) == 0:
+            with open(appointment_file, "w", encoding="utf-8") as f:
+                f.write(APPOINTMENT_HEADER + "\n")
+            return
+
+        with open(appointment_file, "r", encoding="utf-8") as f:
+            first_line = f.readline()
+
+        if first_line.strip() != APPOINTMENT_HEADER:
+            with open(appointment_file, "r", encoding="utf-8") as f:
+                existing = f.read().splitlines()
+            if existing and existing[0].startswith(APPOINTMENT_HEADER_PREFIX):
+                # Header written before revisions were stored
+                existing = existing[1:]
+            with open(appointment_file, "w", encoding="utf-8") as f:
+                f.write(APPOINTMENT_HEADER + "\n" + "\n".join(existing) + "\n")
+
+    def _next_patient_id(self) -> int:
+        """Returns a patient ID not used by any active or discharged patient."""
+        if self._last_patient_id is None:
+            with self._journal.lock:
+                lines = Patient.read_record_lines(PATIENTS_FILE) if os.path.exists(PATIENTS_FILE) else []
+            if os.path.exists(DISCHARGED_FILE):
+                with open(DISCHARGED_FILE, "r", encoding="utf-8") as f:
+                    lines.extend(f.read().splitlines()[1:])
+            self._last_patient_id = max((parse_record_id(line.split("|")[7]) or 0
+                                         for line in lines if line.count("|") >= 8), default=0)
+        self._last_patient_id += 1
+        return self._last_patient_id
+
+    def _ensure_ids(self):
+        """Gives records written before IDs were stored their IDs, once per process.
+
+        Doctors are numbered in file order, then active and discharged
+        patients. Patients and appointments find their doctor, and
+        appointments their patient, by full name; where two doctors share a
+        name the first one in doctor.txt is used. Every migrated file is
+        rewritten atomically in the current format.
+        """
+        if self._ids_checked:
+            return
+        self._ids_checked = True
+        if self.has_doctors() and not _has_header(DOCTOR_FILE, DOCTOR_HEADER):
+            self._move_doctor_logins()
+        legacy_patients = os.path.exists(PATIENTS_FILE) and not _has_header(PATIENTS_FILE, PATIENTS_HEADER)
+        legacy_discharged = os.path.exists(DISCHARGED_FILE) and not _has_header(DISCHARGED_FILE, DISCHARGED_HEADER)
+        legacy_appointments = any(not _has_header(path, APPOINTMENT_HEADER)
+                                  for path in glob.glob(APPOINTMENT_FILE_PATTERN))
+        if not (legacy_patients or legacy_discharged or legacy_appointments):
+            return
+
+        doctor_ids = {}
+        for doctor in self._read_doctor_file():
+            doctor_ids.setdefault(doctor.full_name(), doctor.record_id)
+        with self._journal.lock:
+            patients = Patient.read_patient_records(PATIENTS_FILE) if os.path.exists(PATIENTS_FILE) else []
+            discharged = Patient.read_discharged_patients() if os.path.exists(DISCHARGED_FILE) else []
+            last_id = max((patient.record_id or 0 for patient in patients + discharged), default=0)
+            for patient in patients + discharged:
+                if patient.record_id is None:
+                    last_id += 1
+                    patient.record_id = last_id
+                if patient.doctor_id is None:
+                    patient.doctor_id = doctor_ids.get(patient.get_doctor())
+            if legacy_patients:
+                Patient.write_patient_records(PATIENTS_FILE, patients)
+                self._journal.reset()
+            if legacy_discharged:
+                Patient.write_record_lines(DISCHARGED_FILE, (patient.to_file_format() for patient in discharged),
+                                           header=DISCHARGED_HEADER)
+        self._last_patient_id = last_id
+
+        patient_ids = {}
+        for patient in patients + discharged:
+            patient_ids.setdefault(patient.full_name(), patient.record_id)
+        if legacy_appointments:
+            self._appointments.assign_ids(patient_ids, doctor_ids)
+
+    def _move_doctor_logins(self):
+        """Moves the usernames and passwords of a doctor.txt written before the credential store.
+
+        Where a username is already taken (by the admin or an earlier doctor)
+        the doctor is kept without a login.
+        """
+        doctors = self._read_doctor_file()
+        credentials = get_credentials()
+        last_id = max((doctor.record_id or 0 for doctor in doctors), default=0)
+        for doctor in doctors:
+            if doctor.record_id is None:
+                last_id += 1
+                doctor.record_id = last_id
+            login = credentials.get(doctor.get_username())
+            if login is not None and (login.role, login.record_id) != (DOCTOR_ROLE, doctor.record_id):
+                doctor.set_username(None)
+                doctor.set_password(None)
+        self.save_doctors(doctors)
+
+    @staticmethod
+    def _doctor_line(doctor):
+        record_id = "" if doctor.record_id is None else doctor.record_id
+        return f"{doctor.full_name()}|{doctor.get_speciality()}|{record_id}"
+
+
+class SqliteStorage:
+    """Stores records in a SQLite database so single-record edits touch a single row.
+
+    The database is created on first use and seeded from the flat files, so
+    switching HMS_STORAGE to "sqlite" keeps the existing data. Row ids are
+    the persistent patient and doctor IDs; a discharged patient keeps its id
+    in the discharges table.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS patients (
+            id INTEGER PRIMARY KEY,
+            first_name TEXT NOT NULL,
+            surname TEXT NOT NULL,
+            age INTEGER NOT NULL,
+            mobile TEXT,
+            postcode TEXT,
+            address TEXT,
+            symptoms TEXT,
+            doctor TEXT NOT NULL DEFAULT 'None',
+            doctor_id INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_patients_doctor ON patients (doctor);
+        CREATE INDEX IF NOT EXISTS idx_patients_surname ON patients (surname);
+
+        CREATE TABLE IF NOT EXISTS doctors (
+            id INTEGER PRIMARY KEY,
+            first_name TEXT NOT NULL,
+            surname TEXT NOT NULL,
+            speciality TEXT NOT NULL,
+            username TEXT NOT NULL,
+            password TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_doctors_username ON doctors (username);
+
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INTEGER PRIMARY KEY,
+            patient TEXT NOT NULL,
+            doctor TEXT NOT NULL,
+            appointment_datetime TEXT NOT NULL,
+            updated INTEGER NOT NULL DEFAULT 0,
+            revision INTEGER NOT NULL DEFAULT 1,
+            patient_id INTEGER,
+            doctor_id INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_appointments_doctor ON appointments (doctor);
+        CREATE INDEX IF NOT EXISTS idx_appointments_patient ON appointments (patient, doctor);
+
+        CREATE TABLE IF NOT EXISTS appointments_archive (
+            id INTEGER PRIMARY KEY,
+            patient TEXT NOT NULL,
+            doctor TEXT NOT NULL,
+            appointment_datetime TEXT NOT NULL,
+            updated INTEGER NOT NULL DEFAULT 0,
+            revision INTEGER NOT NULL DEFAULT 1,
+            patient_id INTEGER,
+            doctor_id INTEGER
+        );
+
+        CREATE TABLE IF NOT EXISTS discharges (
+            id INTEGER PRIMARY KEY,
+            first_name TEXT NOT NULL,
+            surname TEXT NOT NULL,
+            age INTEGER NOT NULL,
+            mobile TEXT,
+            postcode TEXT,
+            address TEXT,
+            symptoms TEXT,
+            doctor TEXT NOT NULL DEFAULT 'None',
+            doctor_id INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_discharges_surname ON discharges (surname);
+
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            counter INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO data_version (id, counter) VALUES (1, 0);
+    """
+    # Counts every row change of the tables the reports read, for data_stamp(); the file
+    # sizes and times of a WAL database also change when it is checkpointed or closed
+    VERSION_TRIGGERS = "".join(
+        f"CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version AFTER {event} ON {table} "
+        f"BEGIN UPDATE data_version SET counter = counter + 1; END;\n"
+        for table in ("patients", "doctors", "appointments") for event in ("INSERT", "UPDATE", "DELETE"))
+    PATIENT_COLUMNS = ("id", "first_name", "surname", "age", "mobile", "postcode", "address", "symptoms", "doctor",
+                       "doctor_id")
+    # Column expression of every field in Patient.RECORD_FIELDS
+    FIELD_COLUMNS = {"name": "first_name || ' ' || surname", "first_name": "first_name", "surname": "surname",
+                     "age": "age", "mobile": "mobile", "postcode": "postcode", "address": "address",
+                     "symptoms": "symptoms", "doctor": "doctor", "id": "id", "doctor_id": "doctor_id"}
+
+    def __init__(self, db_file: str = SQLITE_FILE):
+        """
+        Args:
+            db_file (str): Path of the SQLite database file.
+        """
+        is_new = not os.path.exists(db_file) or os.path.getsize(db_file) == 0
+        self._db_file = db_file
+        # The GUI loads data on a worker thread before handing the storage to the GUI thread
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA + self.VERSION_TRIGGERS)
+        self._add_revision_column()
+        self._add_id_columns()
+        if is_new:
+            self._migrate_from_flat_files()
+        self._move_doctor_logins()
+        self._appointments = AppointmentIndex(directory=None)
+        for record in self._select_appointments():
+            self._appointments.add(record)
+
+    def _add_column(self, table, column, definition) -> bool:
+        """Adds a column missing from a table created by an older schema.
+
+        Returns:
+            bool: True if the column was added.
+        """
+        columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+        if column in columns:
+            return False
+        self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+
+    def _add_revision_column(self):
+        """Upgrades a database created before appointments carried revisions."""
+        with self._conn:
+            if not self._add_column("appointments", "revision", "INTEGER NOT NULL DEFAULT 1"):
+                return
+            # Number the existing rows of each patient in insertion order
+            self._conn.execute(
+                "UPDATE appointments SET revision = "
+                "(SELECT COUNT(*) FROM appointments AS earlier "
+                "WHERE earlier.patient = appointments.patient AND earlier.id <= appointments.id)")
+
+    def _add_id_columns(self):
+        """Upgrades a database created before patients and appointments stored IDs.
+
+        Discharged patients are renumbered after the active ones so a patient
+        ID is unique across both tables. The new columns are filled by full
+        name; where two doctors or patients share a name the lowest id is used.
+        """
+        with self._conn:
+            if self._add_column("discharges", "doctor_id", "INTEGER"):
+                offset = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM patients").fetchone()[0]
+                # Two steps so no intermediate id collides with an existing row
+                self._conn.execute("UPDATE discharges SET id = -id")
+                self._conn.execute("UPDATE discharges SET id = ? - id", (offset,))
+            added = [self._add_column("patients", "doctor_id", "INTEGER")]
+            for table in ("appointments", "appointments_archive"):
+                added.append(self._add_column(table, "patient_id", "INTEGER"))
+                added.append(self._add_column(table, "doctor_id", "INTEGER"))
+            if any(added):
+                self._conn.execute("CREATE TEMP TABLE doctor_names (name TEXT PRIMARY KEY, id INTEGER)")
+                self._conn.execute("INSERT OR IGNORE INTO doctor_names "
+                                   "SELECT first_name || ' ' || surname, id FROM doctors ORDER BY id")
+                self._conn.execute("CREATE TEMP TABLE patient_names (name TEXT PRIMARY KEY, id INTEGER)")
+                self._conn.execute("INSERT OR IGNORE INTO patient_names SELECT first_name || ' ' || surname, id "
+                                   "FROM (SELECT id, first_name, surname FROM patients UNION ALL "
+                                   "SELECT id, first_name, surname FROM discharges) ORDER BY id")
+                for table in ("patients", "discharges"):
+                    self._conn.execute(f"UPDATE {table} SET doctor_id = "
+                                       f"(SELECT id FROM doctor_names WHERE name = {table}.doctor)")
+                for table in ("appointments", "appointments_archive"):
+                    self._conn.execute(f"UPDATE {table} SET "
+                                       f"patient_id = (SELECT id FROM patient_names WHERE name = {table}.patient), "
+                                       f"doctor_id = (SELECT id FROM doctor_names WHERE name = {table}.doctor)")
+                self._conn.execute("DROP TABLE doctor_names")
+                self._conn.execute("DROP TABLE patient_names")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_patients_doctor_id ON patients (doctor_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_patient_id ON appointments (patient_id)")
+
+    def _move_doctor_logins(self):
+        """Moves doctor logins stored in the doctors table before the credential store existed.
+
+        The username and password columns are left empty afterwards. Where a
+        username is already taken the doctor is kept without a login.
+        """
+        rows = self._conn.execute(
+            "SELECT id, username, password FROM doctors WHERE password != '' ORDER BY id").fetchall()
+        if not rows:
+            return
+        credentials = get_credentials()
+        for record_id, username, encoded_password in rows:
+            password = decode_password(encoded_password)
+            login = credentials.get(username)
+            if login is not None and (login.role, login.record_id) != (DOCTOR_ROLE, record_id):
+                continue
+            if username and password:
+                credentials.save(username, DOCTOR_ROLE, record_id, password)
+        with self._conn:
+            self._conn.execute("UPDATE doctors SET username = '', password = ''")
+
+    def _migrate_from_flat_files(self):
+        """Imports the pipe-delimited files into a freshly created database."""
+        flat = FlatFileStorage()
+        with self._conn:
+            for patient in flat.load_patients():
+                self._insert_patient("patients", patient)
+            for patient in flat.load_discharged():
+                self._insert_patient("discharges", patient)
+            for doctor in flat.load_doctors():
+                self._insert_doctor(doctor)
+            for appointment in flat.load_appointments():
+                self._insert_appointment(appointment)
+
+    @staticmethod
+    def _patient_row(patient):
+        return (patient.get_first_name(), patient.get_surname(), patient._Patient__age,
+                patient._Patient__mobile, patient._Patient__postcode, patient._Patient__address,
+                ", ".join(patient.get_symptoms()), patient.get_doctor(), patient.doctor_id)
+
+    @staticmethod
+    def _row_patient(row):
+        patient = Patient(row[1], row[2], row[3], row[4], row[5], row[6],
+                          row[7].split(', ') if row[7] else [], row[8], row[9])
+        patient.record_id = row[0]
+        return patient
+
+    def _next_patient_id(self) -> int:
+        """Returns a patient ID not used by any active or discharged patient."""
+        return self._conn.execute(
+            "SELECT MAX(COALESCE((SELECT MAX(id) FROM patients), 0), "
+            "COALESCE((SELECT MAX(id) FROM discharges), 0)) + 1").fetchone()[0]
+
+    def _insert_patient(self, table, patient):
+        if patient.record_id is None:
+            patient.record_id = self._next_patient_id()
+        self._conn.execute(
+            f"INSERT INTO {table} (id, first_name, surname, age, mobile, postcode, address, symptoms, doctor, "
+            "doctor_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (patient.record_id,) + self._patient_row(patient))
+
+    def _insert_doctor(self, doctor):
+        # Logins live in the credential store; the columns are kept for older databases
+        cursor = self._conn.execute(
+            "INSERT INTO doctors (id, first_name, surname, speciality, username, password) "
+            "VALUES (?, ?, ?, ?, '', '')",
+            (doctor.record_id, doctor.get_first_name(), doctor.get_surname(), doctor.get_speciality()))
+        doctor.record_id = cursor.lastrowid
+        _save_doctor_login(doctor)
+
+    def _insert_appointment(self, appointment):
+        self._conn.execute(
+            "INSERT INTO appointments (patient, doctor, appointment_datetime, updated, revision, patient_id, "
+            "doctor_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (appointment.get_patient(), appointment.get_doctor(),
+             appointment.get_datetime().strftime(APPOINTMENT_FORMAT), int(appointment.is_updated()),
+             appointment.get_revision(), appointment.get_patient_id(), appointment.get_doctor_id()))
+
+    def load_patients(self, progress=None) -> list:
+        """Returns the active patients.
+
+        Args:
+            progress: Optional callable taking ("parse", records_loaded, total_records).
+        """
+        total = self._conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0] if progress else 0
+        rows = self._conn.execute(
+            "SELECT id, first_name, surname, age, mobile, postcode, address, symptoms, doctor, doctor_id "
+            "FROM patients ORDER BY id")
+        patients = []
+        for row in rows:
+            patients.append(self._row_patient(row))
+            if progress is not None and len(patients) % PROGRESS_INTERVAL == 0:
+                progress("parse", len(patients), total)
+        if progress is not None:
+            progress("parse", len(patients), total)
+        return patients
+
+    def iter_patients(self, fields=None, where=None):
+        """Yields the active patients lazily from a cursor.
+
+        Args:
+            fields: Optional field names; see Patient.iter_patient_records.
+            where (dict): Optional field name -> value or predicate; see Patient.iter_patient_records.
+        """
+        return self._iter_patient_rows("patients", fields, where)
+
+    def _iter_patient_rows(self, table, fields, where):
+        conditions = record_conditions(where)
+        if fields is not None:
+            check_record_fields(fields)
+        # Only the projected fields and those named in where are selected
+        columns = list(self.PATIENT_COLUMNS) if fields is None else [self.FIELD_COLUMNS[field] for field in fields]
+        width = len(columns)
+        columns += [self.FIELD_COLUMNS[field] for field, _ in conditions]
+        rows = self._conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+        for row in rows:
+            if not all(test(self._field_value(field, value))
+                       for (field, test), value in zip(conditions, row[width:])):
+                continue
+            if fields is None:
+                yield self._row_patient(row)
+            else:
+                yield tuple(self._field_value(field, value) for field, value in zip(fields, row))
+
+    @staticmethod
+    def _field_value(field, value):
+        if field == "symptoms":
+            return value.split(', ') if value else []
+        return value
+
+    def save_patients(self, patients):
+        """Replaces the stored patients with the given patients."""
+        with self._conn:
+            self._conn.execute("DELETE FROM patients")
+            for patient in patients:
+                self._insert_patient("patients", patient)
+
+    def add_patient(self, patient):
+        """Inserts a newly admitted patient, giving it the next patient ID."""
+        with self._conn:
+            self._insert_patient("patients", patient)
+
+    def update_patient(self, patient, patients=None):
+        """Persists changes made to a single patient with a single-row UPDATE.
+
+        Args:
+            patient (Patient): The patient that changed.
+            patients (list): Unused, accepted for compatibility with FlatFileStorage.
+        """
+        if getattr(patient, "record_id", None) is None:
+            self.add_patient(patient)
+            return
+        with self._conn:
+            self._conn.execute(
+                "UPDATE patients SET first_name = ?, surname = ?, age = ?, mobile = ?, postcode = ?, "
+                "address = ?, symptoms = ?, doctor = ?, doctor_id = ? WHERE id = ?",
+                self._patient_row(patient) + (patient.record_id,))
+
+    def update_patients(self, changed, patients=None):
+        """Persists changes made to several patients in one transaction.
+
+        Args:
+            changed (list): The patients that changed; new patients are inserted.
+            patients (list): Unused, accepted for compatibility with FlatFileStorage.
+        """
+        with self._conn:
+            rows = []
+            for patient in changed:
+                if getattr(patient, "record_id", None) is None:
+                    self._insert_patient("patients", patient)
+                else:
+                    rows.append(self._patient_row(patient) + (patient.record_id,))
+            self._conn.executemany(
+                "UPDATE patients SET first_name = ?, surname = ?, age = ?, mobile = ?, postcode = ?, "
+                "address = ?, symptoms = ?, doctor = ?, doctor_id = ? WHERE id = ?", rows)
+
+    def discharge_patient(self, patient, patients=None):
+        """Moves a patient to the discharged archive.
+
+        Args:
+            patient (Patient): The patient being discharged.
+            patients (list): Unused, accepted for compatibility with FlatFileStorage.
+        """
+        self.discharge_patients([patient], patients)
+
+    def discharge_patients(self, discharged, patients=None):
+        """Moves several patients to the discharged archive in one transaction.
+
+        Args:
+            discharged (list): The patients being discharged.
+            patients (list): Unused, accepted for compatibility with FlatFileStorage.
+        """
+        with self._conn:
+            self._conn.executemany("DELETE FROM patients WHERE id = ?",
+                                   [(patient.record_id,) for patient in discharged if patient.record_id is not None])
+            for patient in discharged:
+                self._insert_patient("discharges", patient)
+
+    def load_discharged(self) -> list:
+        """Returns the discharged patients."""
+        return list(self.iter_discharged())
+
+    def iter_discharged(self, fields=None, where=None):
+        """Yields the discharged patients lazily; fields and where as for iter_patients()."""
+        return self._iter_patient_rows("discharges", fields, where)
+
+    @staticmethod
+    def _discharged_filter(search):
+        text = (search or "").strip().lower()
+        if not text:
+            return "", ()
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return (" WHERE lower(first_name || ' ' || surname) LIKE ? ESCAPE '\\' "
+                "OR lower(doctor) LIKE ? ESCAPE '\\'"), (pattern, pattern)
+
+    def discharged_count(self, search=None) -> int:
+        """Returns the number of discharged patients, or of those whose name or doctor contains search."""
+        condition, params = self._discharged_filter(search)
+        return self._conn.execute(f"SELECT COUNT(*) FROM discharges{condition}", params).fetchone()[0]
+
+    def discharged_page(self, page, page_size=PAGE_SIZE, search=None) -> list:
+        """Returns one page of discharged patients, in patient ID order like load_discharged().
+
+        Args:
+            page (int): Zero-based page number.
+            page_size (int): Patients per page.
+            search (str): Only patients whose name or doctor contains this text, case-insensitively.
+        """
+        condition, params = self._discharged_filter(search)
+        rows = self._conn.execute(
+            f"SELECT {', '.join(self.PATIENT_COLUMNS)} FROM discharges{condition} ORDER BY id LIMIT ? OFFSET ?",
+            params + (page_size, page * page_size))
+        return [self._row_patient(row) for row in rows]
+
+    def has_doctors(self) -> bool:
+        """Returns True once any doctor has been stored."""
+        return self._conn.execute("SELECT 1 FROM doctors LIMIT 1").fetchone() is not None
+
+    def load_doctors(self) -> list:
+        """Returns the registered doctors."""
+        doctors = []
+        credentials = get_credentials()
+        rows = self._conn.execute("SELECT id, first_name, surname, speciality FROM doctors ORDER BY id")
+        for row in rows:
+            doctor = Doctor(row[1], row[2], row[3], credentials.username_for(DOCTOR_ROLE, row[0]), None)
+            doctor.record_id = row[0]
+            doctors.append(doctor)
+        return doctors
+
+    def save_doctors(self, doctors):
+        """Replaces the stored doctors with the given doctors."""
+        with self._conn:
+            self._conn.execute("DELETE FROM doctors")
+            for doctor in doctors:
+                self._insert_doctor(doctor)
+
+    def update_doctor(self, doctor, old_username=None):
+        """Updates the stored record of a doctor, adding it if it does not exist yet.
+
+        Args:
+            doctor (Doctor): The doctor to store.
+            old_username (str): Unused, rows are matched by their id.
+        """
+        if getattr(doctor, "record_id", None) is None:
+            with self._conn:
+                self._insert_doctor(doctor)
+            return
+        _save_doctor_login(doctor)
+        with self._conn:
+            self._conn.execute(
+                "UPDATE doctors SET first_name = ?, surname = ?, speciality = ? WHERE id = ?",
+                (doctor.get_first_name(), doctor.get_surname(), doctor.get_speciality(), doctor.record_id))
+
+    def delete_doctor(self, doctor, doctors=None):
+        """Removes a doctor.
+
+        Args:
+            doctor (Doctor): The doctor being removed.
+            doctors (list): Unused, accepted for compatibility with FlatFileStorage.
+        """
+        if getattr(doctor, "record_id", None) is None:
+            return
+        with self._conn:
+            self._conn.execute("DELETE FROM doctors WHERE id = ?", (doctor.record_id,))
+        credentials = get_credentials()
+        credentials.remove(credentials.username_for(DOCTOR_ROLE, doctor.record_id))
+        doctor.record_id = None
+
+    def add_appointment(self, patient_name, doctor_name, appointment_date, updated=False, patient_id=None,
+                        doctor_id=None):
+        """Inserts an appointment as the patient's next revision."""
+        revision = self._appointments.next_revision(patient_name, patient_id)
+        appointment = Appointment(patient_name, doctor_name, appointment_date, updated, revision, patient_id,
+                                  doctor_id)
+        with self._conn:
+            self._insert_appointment(appointment)
+        self._appointments.add(appointment)
+
+    def add_appointments(self, bookings):
+        """Inserts new bookings, each as its patient's next revision, in one transaction.
+
+        Args:
+            bookings: (patient_name, doctor_name, appointment_date, patient_id, doctor_id) tuples.
+        """
+        appointments = _new_appointments(bookings, self._appointments)
+        with self._conn:
+            for appointment in appointments:
+                self._insert_appointment(appointment)
+        self._appointments.add_many(appointments)
+
+    def _select_appointments(self) -> list:
+        rows = self._conn.execute(
+            "SELECT patient, doctor, appointment_datetime, updated, revision, patient_id, doctor_id "
+            "FROM appointments ORDER BY id")
+        return [Appointment(patient_name, doctor_name, parse_appointment_datetime(appointment_datetime),
+                            bool(updated), revision, patient_id, doctor_id)
+                for patient_name, doctor_name, appointment_datetime, updated, revision, patient_id, doctor_id in rows]
+
+    def appointment_index(self) -> AppointmentIndex:
+        """Returns the appointment index, kept up to date as appointments are inserted."""
+        return self._appointments
+
+    def watch_appointments(self, listener):
+        """Registers a listener on the appointment index (see AppointmentIndex.add_listener)."""
+        self._appointments.add_listener(listener)
+
+    def data_stamp(self) -> str:
+        """Returns a signature of the database that changes whenever a patient, doctor or appointment row does."""
+        counter = self._conn.execute("SELECT counter FROM data_version").fetchone()[0]
+        return f"sqlite|{os.path.abspath(self._db_file)}|{counter}"
+
+    def load_appointments(self) -> list:
+        """Returns all appointment rows, superseded revisions included."""
+        return self._appointments.all()
+
+    def load_current_appointments(self) -> list:
+        """Returns the current appointment revision of every patient."""
+        return self._appointments.current()
+
+    def compact_appointments(self, archive=False) -> tuple:
+        """Deletes superseded appointment revisions.
+
+        Args:
+            archive (bool): Copy superseded rows to the appointments_archive table first.
+
+        Returns:
+            tuple: Number of rows kept and number of rows removed.
+        """
+        superseded = ("SELECT id FROM appointments AS a WHERE EXISTS ("
+                      "SELECT 1 FROM appointments AS b "
+                      "WHERE COALESCE(b.patient_id, b.patient) = COALESCE(a.patient_id, a.patient) AND "
+                      "(b.revision > a.revision OR (b.revision = a.revision AND b.id > a.id)))")
+        with self._conn:
+            if archive:
+                self._conn.execute(
+                    "INSERT INTO appointments_archive (patient, doctor, appointment_datetime, updated, revision, "
+                    "patient_id, doctor_id) SELECT patient, doctor, appointment_datetime, updated, revision, "
+                    f"patient_id, doctor_id FROM appointments "
+                    f"WHERE id IN ({superseded}) ORDER BY id")
+            removed = self._conn.execute(f"DELETE FROM appointments WHERE id IN ({superseded})").rowcount
+        self._appointments.reload(self._select_appointments())
+        return len(self._appointments.all()), removed
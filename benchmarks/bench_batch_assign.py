@@ -0,0 +1,86 @@
+"""Time the batch assignment of the waiting list to the earliest free slots.
+
+Run from the repository root:
+
+    python benchmarks/bench_batch_assign.py [--patients 100000] [--doctors 500] [--backend sqlite]
+
+A dataset is generated in a temporary directory (about a tenth of the
+patients are waiting for a doctor, so 10000 waiting patients by default).
+Planning the assignment and storing it are timed separately, and the
+average wait, the share of patients booked with a doctor of their own
+speciality and the patients left waiting are printed.
+"""
+import argparse
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_dataset import generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=100000, help="active patients (default 100000)")
+    parser.add_argument("--doctors", type=int, default=500, help="number of doctors (default 500)")
+    parser.add_argument("--capacity", type=int, default=0,
+                        help="most patients per doctor, 0 for no limit (default 0)")
+    parser.add_argument("--backend", choices=("file", "sqlite"), default="file", help="storage backend (default file)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default 1)")
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="hms-bench-")
+    try:
+        generate(work_dir, args.patients, args.doctors, 0, 10, 0.2, 2017, args.seed)
+        shutil.copy(os.path.join(root, "symptom_specialities.txt"), work_dir)
+        os.chdir(work_dir)
+        os.environ["HMS_STORAGE"] = args.backend
+
+        from AutoAssign import batch_assign, load_speciality_table, plan_batch, specialities_for
+        from Main import load_doctors
+        from PatientIndex import PatientIndex
+        from Scheduler import get_scheduler
+        from Storage import get_storage
+
+        start = time.perf_counter()
+        storage = get_storage()
+        doctors = load_doctors()
+        patients = storage.load_patients()
+        index = PatientIndex(patients)
+        get_scheduler().conflicts()  # Builds the schedules, as the first booking dialog would
+        load_time = time.perf_counter() - start
+        waiting = [patient for patient in patients if patient.get_doctor() == "None"]
+        table = load_speciality_table()
+
+        start = time.perf_counter()
+        plan_batch(waiting, doctors, index, table, args.capacity)
+        plan_time = time.perf_counter() - start
+
+        now = datetime.datetime.now()
+        start = time.perf_counter()
+        booked, unassigned = batch_assign(waiting, patients, doctors, index, table, args.capacity)
+        assign_time = time.perf_counter() - start
+
+        wait = sum((appointment_date - now for _, _, appointment_date in booked), datetime.timedelta())
+        matched = sum(doctor.get_speciality() == specialities_for(patient.get_symptoms(), table)[0]
+                      for patient, doctor, _ in booked)
+        print(f"{len(waiting)} waiting patients, {len(doctors)} doctors, {args.backend} storage")
+        print(f"load and build schedules  {load_time:8.2f}s")
+        print(f"plan                      {plan_time:8.2f}s")
+        print(f"plan, link and store      {assign_time:8.2f}s")
+        if booked:
+            print(f"average wait              {wait.total_seconds() / 86400 / len(booked):8.1f} days")
+            print(f"first-choice speciality   {matched / len(booked):8.1%}")
+        print(f"booked {len(booked)}, still waiting {len(unassigned)}")
+    finally:
+        os.chdir(root)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
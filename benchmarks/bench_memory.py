@@ -0,0 +1,108 @@
+"""Measure the memory held by Patient objects, compared with an earlier commit.
+
+Run from the repository root, on a dataset made by generate_dataset.py:
+
+    python benchmarks/generate_dataset.py --out /tmp/hms-100k --patients 100000 --doctors 500
+    python benchmarks/bench_memory.py --data /tmp/hms-100k [--baseline HEAD~1] [--output memory.json]
+
+Every record of patients_file.txt is parsed with Patient.from_file_format()
+(the path every load takes) in a fresh interpreter, once with the Patient
+class of the working tree and once with the one of the baseline commit, and
+the Python allocations made while building them are taken from tracemalloc.
+The record lines are read before tracing starts, so the stored line each
+patient keeps for the journal is not counted. Results are printed as JSON,
+in bytes per patient.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules Patient.py depends on, checked out from the baseline commit
+BASELINE_MODULES = ("Patient.py", "Person.py", "Journal.py")
+
+
+def measure(source: str, patients_file: str) -> dict:
+    """Builds every patient of a file with the Patient class found in source and traces the allocations.
+
+    Args:
+        source (str): Directory holding Patient.py and its imports.
+        patients_file (str): The patients file to parse.
+
+    Returns:
+        dict: Patient count, traced bytes (current and peak) and bytes per patient.
+    """
+    import gc
+    import tracemalloc
+
+    sys.path.insert(0, source)
+    from Patient import Patient
+
+    with open(patients_file, "r", encoding="utf-8") as f:
+        next(f, None)  # Skip header line
+        lines = [line.strip() for line in f if line.strip()]
+    gc.collect()
+    tracemalloc.start()
+    patients = [Patient.from_file_format(line) for line in lines]
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "patients": len(patients),
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "bytes_per_patient": round(current / len(patients), 1) if patients else 0,
+    }
+
+
+def _checkout(revision: str, directory: str):
+    for module in BASELINE_MODULES:
+        content = subprocess.run(["git", "show", f"{revision}:{module}"], cwd=ROOT, capture_output=True,
+                                 check=True).stdout
+        with open(os.path.join(directory, module), "wb") as f:
+            f.write(content)
+
+
+def _run(source: str, patients_file: str) -> dict:
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", source,
+                             "--data", os.path.dirname(patients_file)],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", required=True, help="dataset directory made by generate_dataset.py")
+    parser.add_argument("--baseline", default="HEAD~1",
+                        help="commit whose Patient class is measured for comparison (default HEAD~1)")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--measure", metavar="SOURCE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    patients_file = os.path.join(args.data, "patients_file.txt")
+    if args.measure:
+        print(json.dumps(measure(args.measure, patients_file)))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="hms-memory-") as baseline_source:
+        _checkout(args.baseline, baseline_source)
+        before = _run(baseline_source, patients_file)
+    after = _run(ROOT, patients_file)
+    results = {
+        "baseline": args.baseline,
+        "before": before,
+        "after": after,
+        "saved_per_patient": round(before["bytes_per_patient"] - after["bytes_per_patient"], 1),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
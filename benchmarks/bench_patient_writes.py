@@ -0,0 +1,91 @@
+"""Compare the old per-patient append save path with Patient.write_patient_records.
+
+Run from the repository root:
+
+    python benchmarks/bench_patient_writes.py [--sizes 1000 10000 100000]
+
+For each size the old path (truncate, then append_patient_record per patient)
+and the new single-pass writer are timed, and the number of file opens each
+one performs is counted.
+"""
+import argparse
+import builtins
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Patient import Patient, PATIENTS_HEADER
+
+
+class OpenCounter:
+    """Counts calls to open() and os.fdopen() while active."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        self._open = builtins.open
+        self._fdopen = os.fdopen
+
+        def counting_open(*args, **kwargs):
+            self.count += 1
+            return self._open(*args, **kwargs)
+
+        def counting_fdopen(*args, **kwargs):
+            self.count += 1
+            return self._fdopen(*args, **kwargs)
+
+        builtins.open = counting_open
+        os.fdopen = counting_fdopen
+        return self
+
+    def __exit__(self, *exc):
+        builtins.open = self._open
+        os.fdopen = self._fdopen
+
+
+def make_patients(count):
+    return [
+        Patient(f"First{i}", f"Surname{i % 500}", 20 + i % 60, f"07{i:09d}", f"B{i % 99} 1AB",
+                "Kathmandu", ["Fever", "Cough"], "John Smith" if i % 3 else "None")
+        for i in range(count)
+    ]
+
+
+def save_per_patient(path, patients):
+    with open(path, 'w') as f:
+        f.write(PATIENTS_HEADER + "\n")
+    for patient in patients:
+        Patient.append_patient_record(path, patient)
+
+
+def measure(save, path, patients):
+    with OpenCounter() as counter:
+        start = time.perf_counter()
+        save(path, patients)
+        elapsed = time.perf_counter() - start
+    return counter.count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f'{"Records":>10}|{"Old opens":>11}|{"Old time (s)":>14}|{"New opens":>11}|{"New time (s)":>14}|{"Speedup":>9}')
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "patients_file.txt")
+        for size in args.sizes:
+            patients = make_patients(size)
+            old_opens, old_time = measure(save_per_patient, path, patients)
+            new_opens, new_time = measure(Patient.write_patient_records, path, patients)
+            assert len(Patient.read_patient_records(path)) == size
+            print(f"{size:>10}|{old_opens:>11}|{old_time:>14.3f}|{new_opens:>11}|{new_time:>14.3f}|"
+                  f"{old_time / new_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
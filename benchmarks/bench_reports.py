@@ -0,0 +1,90 @@
+"""Compare the per-patient report loops with the columnar snapshot reports.
+
+Run from the repository root:
+
+    python benchmarks/bench_reports.py [--patients 1000000] [--budget-ms 100]
+
+The loops the management reports used before the snapshot (calling getters
+on every patient) are timed against PatientColumns for the age group and
+symptoms-by-age cross-tab reports. Building the snapshot is timed
+separately: it happens once, when the first report is opened after the
+patients changed. Exits with status 1 when a columnar report takes longer
+than the budget.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Patient import Patient
+from Reports import AGE_BANDS, PatientColumns
+
+SYMPTOMS = ["Fever", "Cough", "Headache", "Nausea", "Back Pain", "Chest Pain", "Shortness of Breath",
+            "Sore Throat", "Fatigue", "Dizziness", "Rash", "Joint Pain", "Anxiety", "Abdominal Pain"]
+
+
+def make_patients(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    patients = []
+    for i in range(count):
+        patients.append(Patient(f"First{i}", f"Surname{i % 5000}", rng.randint(1, 95), f"07{i:09d}",
+                                f"B{rng.randint(1, 99)} {rng.randint(1, 9)}AB", f"{i} High Street",
+                                rng.sample(SYMPTOMS, rng.randint(1, 3))))
+    return patients
+
+
+def loop_age_histogram(patients) -> list:
+    counts = [0] * len(AGE_BANDS)
+    for patient in patients:
+        group = 0
+        while group + 1 < len(AGE_BANDS) and patient.get_age() >= AGE_BANDS[group + 1]:
+            group += 1
+        counts[group] += 1
+    return counts
+
+
+def timed(action) -> tuple:
+    start = time.perf_counter()
+    result = action()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=1000000, help="number of patients (default 1000000)")
+    parser.add_argument("--budget-ms", type=float, default=100.0,
+                        help="time allowed per columnar report in milliseconds (default 100)")
+    args = parser.parse_args()
+
+    patients = make_patients(args.patients)
+    build_time, columns = timed(lambda: PatientColumns.from_patients(patients))
+
+    reports = {
+        "age_histogram": (lambda: loop_age_histogram(patients), columns.age_histogram),
+        "symptoms_by_age": (None, columns.symptoms_by_age),
+    }
+
+    print(f"{args.patients} patients")
+    print(f"snapshot built once in {build_time * 1000:.0f}ms")
+    print(f"{'report':<24} {'loop':>10} {'columnar':>10} {'speed-up':>10}")
+    over_budget = []
+    for name, (loop, columnar) in reports.items():
+        columnar_time, _ = timed(columnar)
+        if columnar_time * 1000 > args.budget_ms:
+            over_budget.append(name)
+        if loop is None:
+            print(f"{name:<24} {'-':>10} {columnar_time * 1000:8.1f}ms {'-':>10}")
+            continue
+        loop_time, _ = timed(loop)
+        print(f"{name:<24} {loop_time * 1000:8.1f}ms {columnar_time * 1000:8.1f}ms "
+              f"{loop_time / columnar_time:9.0f}x")
+    if over_budget:
+        print(f"Over the {args.budget_ms:.0f}ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
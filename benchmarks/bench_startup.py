@@ -0,0 +1,178 @@
+"""Measure start-up time of the terminal (Main.py) and GUI (gui.py) entry points.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py [--repeat 5]
+    python benchmarks/bench_startup.py --save-baseline benchmarks/startup_baseline.json
+    python benchmarks/bench_startup.py --check benchmarks/startup_baseline.json [--tolerance 0.25]
+
+For each entry point two things are recorded:
+
+* the cumulative import time of the entry module, taken from
+  ``python -X importtime``, together with the heaviest imports;
+* the wall-clock time from process start until the login prompt is shown
+  (the "Enter the username" prompt for Main.py, LoginWindow.show() for gui.py,
+  run on Qt's offscreen platform).
+
+--check exits with status 1 when a median time exceeds the baseline by more
+than the tolerance, or when a module that must stay out of start-up (such as
+matplotlib) is imported before the login prompt.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Modules only the reports need; importing them at start-up is a regression
+DEFERRED_MODULES = ("matplotlib", "numpy")
+
+GUI_LOGIN_SCRIPT = """
+import gui
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QTimer
+
+show = gui.LoginWindow.show
+
+def login_shown(self):
+    show(self)
+    print("LOGIN_READY", flush=True)
+    QTimer.singleShot(0, QtWidgets.QApplication.quit)
+
+gui.LoginWindow.show = login_shown
+gui.main()
+"""
+
+ENTRY_POINTS = {
+    "cli": {"module": "Main", "command": ["-u", "Main.py"], "marker": b"Enter the username"},
+    "gui": {"module": "gui", "command": ["-u", "-c", GUI_LOGIN_SCRIPT], "marker": b"LOGIN_READY"},
+}
+
+
+def _environment():
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def import_profile(module: str) -> dict:
+    """Imports a module in a fresh interpreter under -X importtime.
+
+    Returns:
+        dict: Cumulative import time of the module in milliseconds, the
+            deferred modules that were imported and the ten slowest imports.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, env=_environment(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr}")
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Column header
+        timings.append((name.strip(), int(cumulative)))
+    names = {name for name, _ in timings}
+    total = next((cumulative for name, cumulative in timings if name == module), 0)
+    others = [(name, cumulative) for name, cumulative in timings if name != module]
+    return {
+        "import_ms": total / 1000,
+        "deferred_imported": sorted(m for m in DEFERRED_MODULES if m in names),
+        "slowest": [[name, cumulative / 1000]
+                    for name, cumulative in sorted(others, key=lambda item: -item[1])[:10]],
+    }
+
+
+def time_to_login(command: list, marker: bytes, timeout: float = 60.0) -> float:
+    """Starts an entry point and returns the seconds until marker appears on its output."""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + command, cwd=ROOT, env=_environment(),
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    output = b""
+    try:
+        while marker not in output:
+            chunk = os.read(process.stdout.fileno(), 4096)
+            if not chunk:
+                raise RuntimeError(f"{' '.join(command)} exited before showing the login prompt")
+            output += chunk
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f"{' '.join(command)} did not show the login prompt in {timeout}s")
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+
+def run(repeat: int) -> dict:
+    results = {}
+    for name, entry in ENTRY_POINTS.items():
+        profile = import_profile(entry["module"])
+        samples = [time_to_login(entry["command"], entry["marker"]) for _ in range(repeat)]
+        results[name] = {
+            "import_ms": profile["import_ms"],
+            "login_ms": statistics.median(samples) * 1000,
+            "login_samples_ms": [sample * 1000 for sample in samples],
+            "deferred_imported": profile["deferred_imported"],
+            "slowest_imports_ms": profile["slowest"],
+        }
+    return results
+
+
+def check(results: dict, baseline: dict, tolerance: float) -> list:
+    """Returns a description of every regression against the baseline."""
+    failures = []
+    for name, result in results.items():
+        if result["deferred_imported"]:
+            failures.append(f"{name}: {', '.join(result['deferred_imported'])} imported before the login prompt")
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        for key in ("import_ms", "login_ms"):
+            limit = expected[key] * (1 + tolerance)
+            if result[key] > limit:
+                failures.append(f"{name}: {key} {result[key]:.1f} ms exceeds baseline "
+                                f"{expected[key]:.1f} ms by more than {tolerance:.0%}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="start-ups timed per entry point")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as the new baseline")
+    parser.add_argument("--check", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown over the baseline (default 0.25)")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    for name, result in results.items():
+        print(f"{name:<4} import {result['import_ms']:8.1f} ms   login prompt {result['login_ms']:8.1f} ms"
+              f"   deferred imported: {', '.join(result['deferred_imported']) or 'none'}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.check:
+        with open(args.check, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures = check(results, baseline, args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            sys.exit(1)
+        print("No start-up regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Compare QTableWidget refreshes with the model-backed patient table.
+
+Run from the repository root:
+
+    python benchmarks/bench_table_refresh.py [--patients 100000]
+
+The old refresh path (one QTableWidgetItem per cell, rebuilt on every change)
+is timed against ObjectTableModel for the initial fill, adding one patient and
+discharging one patient. Qt runs on the offscreen platform unless
+QT_QPA_PLATFORM is already set.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtWidgets
+from PyQt5.QtWidgets import QHeaderView, QTableWidget, QTableWidgetItem
+
+from Patient import Patient
+
+
+def make_patients(count: int) -> list:
+    return [Patient(f"First{i}", f"Surname{i}", 20 + i % 70, f"07{i:09d}", f"B{i % 99} 1AB",
+                    f"{i} High Street", ["Fever", "Cough"], "John Smith")
+            for i in range(count)]
+
+
+def fill_table_widget(table, patients):
+    """The refresh used before the table models: every cell of every row."""
+    table.setRowCount(len(patients))
+    for row, patient in enumerate(patients):
+        table.setItem(row, 0, QTableWidgetItem(str(row + 1)))
+        table.setItem(row, 1, QTableWidgetItem(patient.full_name()))
+        table.setItem(row, 2, QTableWidgetItem(str(patient._Patient__age)))
+        table.setItem(row, 3, QTableWidgetItem(patient._Patient__mobile))
+        table.setItem(row, 4, QTableWidgetItem(patient._Patient__postcode))
+        table.setItem(row, 5, QTableWidgetItem(", ".join(patient.get_symptoms())))
+        table.setItem(row, 6, QTableWidgetItem(patient.get_doctor()))
+
+
+def timed(app, action) -> float:
+    start = time.perf_counter()
+    action()
+    app.processEvents()
+    return time.perf_counter() - start
+
+
+def bench_table_widget(app, patients) -> dict:
+    table = QTableWidget()
+    table.setColumnCount(7)
+    table.setHorizontalHeaderLabels(["ID", "Full Name", "Age", "Mobile", "Postcode", "Symptoms", "Doctor"])
+    table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    table.resize(1000, 600)
+    table.show()
+    results = {"fill": timed(app, lambda: fill_table_widget(table, patients))}
+
+    def add():
+        patients.append(make_patients(1)[0])
+        fill_table_widget(table, patients)
+
+    def discharge():
+        del patients[len(patients) // 2]
+        fill_table_widget(table, patients)
+
+    results["add"] = timed(app, add)
+    results["discharge"] = timed(app, discharge)
+    table.close()
+    return results
+
+
+def bench_model(app, patients) -> dict:
+    import gui
+
+    results = {}
+    views = []
+
+    def fill():
+        model = gui.ObjectTableModel(patients, gui.PATIENT_COLUMNS)
+        view = gui._table_view(model)
+        view.resize(1000, 600)
+        view.show()
+        views.append(view)
+
+    results["fill"] = timed(app, fill)
+    model = views[0].model()
+    results["add"] = timed(app, lambda: model.append(make_patients(1)[0]))
+    results["discharge"] = timed(app, lambda: model.remove(len(patients) // 2))
+    views[0].close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=100000, help="number of patients shown")
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)
+    widget = bench_table_widget(app, make_patients(args.patients))
+    model = bench_model(app, make_patients(args.patients))
+
+    print(f"{args.patients} patients")
+    print(f"{'operation':<10} {'QTableWidget':>14} {'model':>12} {'speed-up':>10}")
+    for operation in ("fill", "add", "discharge"):
+        speed_up = widget[operation] / model[operation] if model[operation] else float("inf")
+        print(f"{operation:<10} {widget[operation] * 1000:12.1f}ms {model[operation] * 1000:10.1f}ms "
+              f"{speed_up:9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
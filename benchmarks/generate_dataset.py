@@ -0,0 +1,169 @@
+"""Generate a synthetic hospital dataset at a configurable scale.
+
+Run from the repository root:
+
+    python benchmarks/generate_dataset.py --out /tmp/hms-100k --patients 100000 --doctors 500 --years 10
+
+Writes admin.txt, credentials.txt, doctor.txt, patients_file.txt,
+discharged_patient.txt and one {year}_appointments.txt per year into --out,
+in the same formats the application reads. The admin logs in as admin/123
+and every doctor as doc<N>/123; the passwords are hashed with the cost set
+by HMS_PASSWORD_ITERATIONS. The same --seed always produces the same files.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Appointment import APPOINTMENT_HEADER, Appointment, appointment_file_for
+from Credentials import (ADMIN_ROLE, CREDENTIALS_FILE, CREDENTIALS_HEADER, DOCTOR_ROLE, SALT_BYTES, Credential,
+                         hash_password)
+from Patient import DISCHARGED_FILE, DISCHARGED_HEADER, PATIENTS_FILE, Patient
+from Storage import DOCTOR_FILE, DOCTOR_HEADER
+
+ADMIN_FILE = "admin.txt"
+PASSWORD = "123"
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William",
+               "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah",
+               "Charles", "Karen", "Nabin", "Sita", "Ram", "Gita", "Bishnu", "Anita", "Hari", "Maya"]
+SURNAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Wilson",
+            "Taylor", "Clark", "Lewis", "Walker", "Hall", "Young", "King", "Wright", "Scott", "Green",
+            "Oli", "Upadhyay", "Sharma", "Thapa", "Gurung", "Rai", "Shrestha", "Karki", "Adhikari"]
+SPECIALITIES = ["Internal Med.", "Pediatrics", "Cardiology", "Neurology", "Orthopedics", "Dermatology",
+                "Psychiatry", "Oncology", "ENT", "Gastroenterology"]
+SYMPTOMS = ["Fever", "Cough", "Headache", "Nausea", "Back Pain", "Chest Pain", "Shortness of Breath",
+            "Sore Throat", "Fatigue", "Dizziness", "Rash", "Joint Pain", "Anxiety", "Abdominal Pain"]
+CITIES = ["Kathmandu", "Birmingham", "London", "Leeds", "Pokhara", "Manchester", "Bristol", "Lalitpur"]
+
+
+def _patient_line(rng, index, doctor, doctor_id):
+    first = rng.choice(FIRST_NAMES)
+    surname = rng.choice(SURNAMES)
+    symptoms = ", ".join(rng.sample(SYMPTOMS, rng.randint(1, 3)))
+    postcode = f"{rng.choice('BLCMS')}{rng.randint(1, 99)} {rng.randint(1, 9)}{rng.choice('ABCDEFGH')}{rng.choice('JKLNPQRS')}"
+    return (f"{first} {surname}|{rng.randint(1, 95)}|07{index % 10 ** 9:09d}|{postcode}|"
+            f"{rng.randint(1, 300)} {rng.choice(CITIES)}|{symptoms}|{doctor}|{index + 1}|{doctor_id or ''}")
+
+
+def generate(out: str, patients: int, doctors: int, discharged: int, years: int, updates: float,
+             first_year: int, seed: int) -> dict:
+    """Writes the dataset files into out.
+
+    Args:
+        out (str): Output directory, created if missing.
+        patients (int): Active patients.
+        doctors (int): Doctors.
+        discharged (int): Discharged patients.
+        years (int): Years of appointment files, starting at first_year.
+        updates (float): Share of assigned patients whose appointment was changed at least once.
+        first_year (int): Year of the first appointment file.
+        seed (int): Random seed.
+
+    Returns:
+        dict: Number of rows written per file.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out, exist_ok=True)
+
+    with open(os.path.join(out, ADMIN_FILE), "w", encoding="utf-8") as f:
+        f.write("admin||B1 1AB\n")
+
+    # Every account shares one hash (and salt) so generating thousands of doctors stays fast
+    salt = random.Random(-seed).getrandbits(8 * SALT_BYTES).to_bytes(SALT_BYTES, "big")
+    password_hash = hash_password(PASSWORD, salt=salt)
+    with open(os.path.join(out, CREDENTIALS_FILE), "w", encoding="utf-8") as f:
+        f.write(CREDENTIALS_HEADER + "\n")
+        f.write(Credential("admin", ADMIN_ROLE, None, password_hash).to_file_format() + "\n")
+        for index in range(doctors):
+            f.write(Credential(f"doc{index}", DOCTOR_ROLE, index + 1, password_hash).to_file_format() + "\n")
+
+    doctor_names = []
+    with open(os.path.join(out, DOCTOR_FILE), "w", encoding="utf-8") as f:
+        f.write(DOCTOR_HEADER + "\n")
+        for index in range(doctors):
+            # Surnames carry the index so every doctor's full name is unique
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}{index}"
+            doctor_names.append(name)
+            f.write(f"{name}|{rng.choice(SPECIALITIES)}|{index + 1}\n")
+
+    # About a tenth of the active patients are still waiting for a doctor
+    assigned = []
+    lines = []
+    for index in range(patients):
+        doctor_id = None if not doctor_names or rng.random() < 0.1 else rng.randint(1, len(doctor_names))
+        doctor = "None" if doctor_id is None else doctor_names[doctor_id - 1]
+        line = _patient_line(rng, index, doctor, doctor_id)
+        lines.append(line)
+        if doctor_id is not None:
+            assigned.append((line.split("|", 1)[0], index + 1, doctor_id))
+    Patient.write_record_lines(os.path.join(out, PATIENTS_FILE), lines)
+    del lines
+
+    with open(os.path.join(out, DISCHARGED_FILE), "w", encoding="utf-8") as f:
+        f.write(DISCHARGED_HEADER + "\n")
+        for index in range(discharged):
+            doctor_id = rng.randint(1, len(doctor_names)) if doctor_names else None
+            doctor = "None" if doctor_id is None else doctor_names[doctor_id - 1]
+            f.write(_patient_line(rng, patients + index, doctor, doctor_id) + "\n")
+
+    # Each assigned patient gets a booking, some later moved; rows land in the file of their year
+    by_year = {first_year + offset: [] for offset in range(years)}
+    start = datetime.datetime(first_year, 1, 1, 9, 0)
+    last_year = first_year + years - 1
+    span_minutes = max((datetime.datetime(last_year, 12, 1) - start).days * 24 * 60, 1)
+    for patient_name, patient_id, doctor_id in assigned:
+        moment = start + datetime.timedelta(minutes=rng.randrange(0, span_minutes, 15))
+        revisions = 1 + (rng.random() < updates) + (rng.random() < updates / 4)
+        for revision in range(1, revisions + 1):
+            if revision > 1:
+                moment += datetime.timedelta(days=rng.randint(1, 30), minutes=15 * rng.randint(0, 20))
+                if rng.random() < 0.3:
+                    doctor_id = rng.randint(1, len(doctor_names))
+            if moment.year > last_year:
+                break
+            appointment = Appointment(patient_name, doctor_names[doctor_id - 1], moment, updated=revision > 1,
+                                      revision=revision, patient_id=patient_id, doctor_id=doctor_id)
+            by_year[moment.year].append(appointment.to_file_format())
+
+    counts = {ADMIN_FILE: 1, CREDENTIALS_FILE: doctors + 1, DOCTOR_FILE: doctors, PATIENTS_FILE: patients, DISCHARGED_FILE: discharged}
+    for year, rows in by_year.items():
+        name = appointment_file_for(year)
+        with open(os.path.join(out, name), "w", encoding="utf-8") as f:
+            f.write(APPOINTMENT_HEADER + "\n")
+            f.writelines(row + "\n" for row in rows)
+        counts[name] = len(rows)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", required=True, help="directory to write the data files to")
+    parser.add_argument("--patients", type=int, default=10000, help="active patients (default 10000)")
+    parser.add_argument("--doctors", type=int, default=100, help="doctors (default 100)")
+    parser.add_argument("--discharged", type=int, default=None,
+                        help="discharged patients (default: a fifth of --patients)")
+    parser.add_argument("--years", type=int, default=10, help="years of appointment files (default 10)")
+    parser.add_argument("--first-year", type=int, default=2017,
+                        help="year of the first appointment file (default 2017)")
+    parser.add_argument("--updates", type=float, default=0.2,
+                        help="share of appointments changed at least once (default 0.2)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default 1)")
+    args = parser.parse_args()
+
+    discharged = args.patients // 5 if args.discharged is None else args.discharged
+    start = time.perf_counter()
+    counts = generate(args.out, args.patients, args.doctors, discharged, args.years, args.updates,
+                      args.first_year, args.seed)
+    elapsed = time.perf_counter() - start
+    for name, rows in counts.items():
+        print(f"{name:<28} {rows:>10} rows")
+    print(f"Written to {args.out} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Time loading, login, the management reports and the save paths on a dataset.
+
+Run from the repository root, on a dataset made by generate_dataset.py:
+
+    python benchmarks/generate_dataset.py --out /tmp/hms-100k --patients 100000 --doctors 500
+    python benchmarks/run_benchmarks.py --data /tmp/hms-100k [--backend sqlite] [--output results.json]
+
+The dataset is copied to a temporary directory first, so the writes made by
+the assign/discharge/save steps never touch it. The report window's chart
+builders are timed too, with one repaint of each chart and the PNG and CSV
+files the batch pack (ReportFigures.py --out) writes for it; the appointments
+chart only has a legend up to MAX_LEGEND_ENTRIES doctors, so include a
+dataset that small (e.g. --doctors 30). Results are printed as JSON
+(timings in seconds, throughput in records per second, peak memory in KiB)
+together with the git commit, so runs can be compared across commits.
+--trace-memory adds the peak Python allocation of every step via tracemalloc,
+which slows the run down.
+"""
+import argparse
+import builtins
+import contextlib
+import datetime
+import glob
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = "123"  # Every account made by generate_dataset.py uses it
+
+REPORTS = {
+    "1": "doctors",
+    "2": "patients_per_doctor",
+    "3": "appointments_per_month",
+    "4": "patients_per_symptom",
+    "5": "total_appointments",
+    "6": "appointments_by_month",
+    "7": "patients_per_age_group",
+    "8": "appointment_conflicts",
+}
+
+
+class Recorder:
+    """Collects the duration, and optionally the peak allocation, of named steps."""
+
+    def __init__(self, trace_memory=False):
+        self.timings = {}
+        self.peak_memory = {}
+        self.trace_memory = trace_memory
+
+    @contextlib.contextmanager
+    def step(self, name):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+            if self.trace_memory:
+                self.peak_memory[name] = tracemalloc.get_traced_memory()[1] // 1024
+                tracemalloc.stop()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _max_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _count_rows(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+
+def _login(admin, registry, username, password):
+    """The credential check of Main.main, without the prompt."""
+    from Credentials import ADMIN_ROLE, get_credentials
+    login = get_credentials().authenticate(username, password)
+    if login is None:
+        return None
+    return admin if login.role == ADMIN_ROLE else registry.doctor(login.record_id)
+
+
+def run(data_dir, backend, operations, trace_memory, reports=tuple(REPORTS)) -> dict:
+    work_dir = tempfile.mkdtemp(prefix="hms-bench-")
+    try:
+        for path in glob.glob(os.path.join(data_dir, "*.txt")):
+            shutil.copy(path, work_dir)
+        os.chdir(work_dir)
+        os.environ["HMS_STORAGE"] = backend
+        os.environ.setdefault("MPLBACKEND", "Agg")
+        dataset = {os.path.basename(path): _count_rows(path) for path in sorted(glob.glob("*.txt"))}
+
+        from Main import load_admin, load_doctors
+        from PatientIndex import PatientIndex
+        from Registry import Registry
+        from Reports import get_report_aggregates
+        from Scheduler import get_scheduler
+        from Storage import get_storage
+
+        recorder = Recorder(trace_memory)
+        with recorder.step("open_storage"):
+            storage = get_storage()
+        with recorder.step("load_admin"):
+            admin = load_admin()
+        with recorder.step("load_doctors"):
+            doctors = load_doctors()
+        with recorder.step("load_patients"):
+            patients = storage.load_patients()
+        with recorder.step("link_patients"):
+            registry = Registry(doctors, patients)
+            registry.link_patients()
+        with recorder.step("index_patients"):
+            patient_index = PatientIndex(patients)
+        with recorder.step("load_report_aggregates"):
+            get_report_aggregates().attach(doctors, patients, patient_index)
+        with recorder.step("load_discharged"):
+            discharged = storage.load_discharged()
+        with recorder.step("stream_discharged"):
+            streamed = sum(1 for _ in storage.iter_discharged(fields=("doctor_id",)))
+        with recorder.step("load_appointments"):
+            appointment_rows = len(storage.load_appointments())
+        scheduler = get_scheduler()
+        with recorder.step("build_schedules"):
+            scheduler.for_doctor("")
+        searched = doctors[:operations]
+        with recorder.step("free_slots"):
+            for doctor in searched:
+                scheduler.free_slots([doctor])
+        with recorder.step("free_slots_speciality"):
+            scheduler.free_slots_for_speciality(doctors, doctors[0].get_speciality())
+
+        with recorder.step("login_admin"):
+            _login(admin, registry, admin.get_username(), PASSWORD)
+        last_doctor = doctors[-1]
+        with recorder.step("login_last_doctor"):
+            _login(admin, registry, last_doctor.get_username(), PASSWORD)
+
+        import matplotlib.pyplot as plt
+        plt.show = lambda *args, **kwargs: None
+        for op in reports:
+            name = REPORTS[op]
+            answers = iter([op])
+            builtins.input = lambda *args: next(answers)
+            with contextlib.redirect_stdout(io.StringIO()):
+                with recorder.step(f"report_{name}"):
+                    admin.get_management_report(doctors, patients, indexes=patient_index)
+            plt.close("all")
+
+        # The report window's builders, one repaint of each finished chart as the
+        # embedded canvas does on resize, and the files the batch pack writes for it
+        from ReportFigures import BATCH_REPORTS, NoReportData, write_report
+        pack_dir = os.path.join(work_dir, "reports")
+        os.makedirs(pack_dir)
+        inputs = {"storage": storage, "doctors": doctors, "aggregates": get_report_aggregates(),
+                  "patients": patients, "index": patient_index, "scheduler": scheduler}
+        for op in reports:
+            name = REPORTS[op]
+            if name not in BATCH_REPORTS:
+                continue
+            builder, input_names = BATCH_REPORTS[name]
+            try:
+                with recorder.step(f"figure_{name}"):
+                    report = builder(*(inputs[input_name] for input_name in input_names))
+            except NoReportData:
+                continue
+            if report.figure is not None:
+                with recorder.step(f"redraw_{name}"):
+                    report.figure.canvas.draw()
+            with recorder.step(f"batch_write_{name}"):
+                write_report(report, os.path.join(pack_dir, name), ("png", "csv"))
+
+        waiting = [patient for patient in patients if patient.get_doctor() == "None"][:operations]
+        appointment_date = datetime.datetime(datetime.date.today().year, 6, 1, 10, 0)
+        with recorder.step("check_bookings"):
+            for index, patient in enumerate(waiting):
+                doctor = doctors[index % len(doctors)]
+                scheduler.conflict(doctor.full_name(), appointment_date, doctor.record_id,
+                                   patient.full_name(), patient.record_id)
+        with recorder.step("assign"):
+            for index, patient in enumerate(waiting):
+                doctor = doctors[index % len(doctors)]
+                patient.link(doctor.full_name(), appointment_date, doctor.record_id)
+                storage.add_appointment(patient.full_name(), doctor.full_name(), appointment_date,
+                                        patient_id=patient.record_id, doctor_id=doctor.record_id)
+                storage.update_patient(patient, patients)
+        discharges = min(operations, len(patients))
+        with recorder.step("discharge"):
+            for _ in range(discharges):
+                patient = patients.pop()
+                storage.discharge_patient(patient, patients)
+        with recorder.step("save_patients"):
+            storage.save_patients(patients)
+
+        timings = recorder.timings
+
+        def rate(count, step):
+            return count / timings[step] if timings[step] else None
+
+        return {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "backend": backend,
+            "dataset": dataset,
+            "loaded": {"patients": len(patients) + discharges, "discharged": len(discharged),
+                       "doctors": len(doctors), "appointment_rows": appointment_rows},
+            "timings_s": timings,
+            "throughput_per_s": {
+                "load_patients": rate(len(patients) + discharges, "load_patients"),
+                "load_discharged": rate(len(discharged), "load_discharged"),
+                "stream_discharged": rate(streamed, "stream_discharged"),
+                "load_appointments": rate(appointment_rows, "load_appointments"),
+                "free_slots": rate(len(searched), "free_slots"),
+                "check_bookings": rate(len(waiting), "check_bookings"),
+                "assign": rate(len(waiting), "assign"),
+                "discharge": rate(discharges, "discharge"),
+                "save_patients": rate(len(patients), "save_patients"),
+            },
+            "peak_memory_kb": recorder.peak_memory or None,
+            "max_rss_kb": _max_rss_kb(),
+        }
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", required=True, help="dataset directory made by generate_dataset.py")
+    parser.add_argument("--backend", choices=("file", "sqlite"), default="file", help="storage backend")
+    parser.add_argument("--operations", type=int, default=100,
+                        help="patients assigned and discharged in the write steps (default 100)")
+    parser.add_argument("--reports", default=",".join(REPORTS),
+                        help="comma-separated management report numbers to time (default all: 1,2,3,4,5,6,7,8)")
+    parser.add_argument("--trace-memory", action="store_true", help="record the peak allocation of every step")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    reports = [op.strip() for op in args.reports.split(",") if op.strip()]
+    unknown = [op for op in reports if op not in REPORTS]
+    if unknown:
+        parser.error(f"unknown report numbers: {', '.join(unknown)}")
+    results = run(os.path.abspath(args.data), args.backend, args.operations, args.trace_memory, reports)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,26 @@
+import itertools
 import os
 import sys
-import time
 
 from PyQt5 import QtWidgets, uic, QtCore
-from PyQt5.QtWidgets import (QMainWindow, QMessageBox, QTableWidgetItem, QHeaderView,
+from PyQt5.QtWidgets import (QMainWindow, QMessageBox, QHeaderView,
                               QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
                               QPushButton, QFormLayout, QComboBox, QDialogButtonBox,
-                              QWidget, QTableWidget, QAction, QInputDialog, QTextBrowser,
+                              QWidget, QTableView, QAction, QInputDialog, QTextBrowser,
                               QProgressBar)
-from PyQt5.QtCore import Qt
-
-import matplotlib
-matplotlib.use('Qt5Agg')
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QAbstractTableModel, QModelIndex
 
+from AutoAssign import suggest_doctor
+from Credentials import ADMIN_ROLE, DOCTOR_ROLE, get_credentials
+from DischargedArchive import PAGE_SIZE
 from Main import load_admin, load_doctors
 from Patient import Patient
 from Doctor import Doctor
+from PatientIndex import PatientIndex
+from Registry import Registry
+from Reports import get_report_aggregates
+from Scheduler import SUGGESTED_SLOTS, get_scheduler
+from Storage import get_storage
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -146,12 +148,234 @@ class LoadingScreen(QDialog):
         """Update progress bar value and status text."""
         self.progress_bar.setValue(value)
         self.status_label.setText(status)
-        QtWidgets.QApplication.processEvents()  # Force UI update
 
-# Prevent matplotlib from closing the application when figure windows are closed
-import matplotlib
-rcParams = matplotlib.rcParams
-rcParams['figure.raise_window'] = False
+
+class DataLoader(QThread):
+    """Loads the admin, doctors, patients and appointments off the GUI thread.
+
+    Progress is reported from the actual work: bytes of the patients file read,
+    then patient records parsed.
+    """
+
+    progress = pyqtSignal(int, str)
+    loaded = pyqtSignal(object, object, object, object)
+    failed = pyqtSignal(str)
+
+    # Progress bar ranges of the loading stages
+    READ_RANGE = (5, 50)
+    PARSE_RANGE = (50, 90)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._last_value = -1
+
+    def _emit(self, value, status):
+        if value != self._last_value:
+            self._last_value = value
+            self.progress.emit(value, status)
+
+    def _patients_progress(self, stage, done, total):
+        start, end = self.READ_RANGE if stage == "read" else self.PARSE_RANGE
+        value = end if not total else start + (end - start) * min(done, total) // total
+        if stage == "read":
+            status = f"Reading patients data... {done / 1048576:.1f} of {total / 1048576:.1f} MB"
+        else:
+            status = f"Parsing patients... {done:,} of {total:,}"
+        self._emit(value, status)
+
+    def run(self):
+        try:
+            self._emit(1, "Loading administrator data...")
+            admin = load_admin()
+            self._emit(3, "Loading doctors data...")
+            doctors = load_doctors()
+            self._emit(self.READ_RANGE[0], "Loading patients data...")
+            storage = get_storage()
+            patients = storage.load_patients(progress=self._patients_progress)
+            Registry(doctors, patients).link_patients()
+            patient_index = PatientIndex(patients)
+            get_report_aggregates().attach(doctors, patients, patient_index)
+            self._emit(self.PARSE_RANGE[1], "Loading appointments...")
+            storage.appointment_index()
+            self._emit(100, "Loading complete!")
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.loaded.emit(admin, doctors, patients, patient_index)
+
+
+class ReportWorker(QThread):
+    """Builds one management report off the GUI thread.
+
+    The builder is named rather than passed so that ReportFigures, and
+    matplotlib with it, is imported on the worker too. Its step callback
+    forwards the progress and ends the build once requestInterruption() was
+    called, which is what the Cancel button does.
+    """
+
+    progress = pyqtSignal(int, str)
+    built = pyqtSignal(object)
+    empty = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, builder, args, parent=None):
+        """
+        Args:
+            builder (str): Name of the ReportFigures builder.
+            args (tuple): Its arguments, before the step callback.
+            parent: The window the worker belongs to.
+        """
+        super().__init__(parent)
+        self._builder = builder
+        self._args = args
+
+    def _step(self, value, status):
+        if self.isInterruptionRequested():
+            from ReportFigures import ReportCancelled
+            raise ReportCancelled()
+        self.progress.emit(value, status)
+
+    def run(self):
+        try:
+            import ReportFigures
+        except ImportError as e:
+            self.failed.emit(str(e))
+            return
+        try:
+            report = getattr(ReportFigures, self._builder)(*self._args, step=self._step)
+        except ReportFigures.ReportCancelled:
+            return
+        except ReportFigures.NoReportData as e:
+            self.empty.emit(str(e))
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if not self.isInterruptionRequested():
+            self.built.emit(report)
+
+class ObjectTableModel(QAbstractTableModel):
+    """Table model over an in-memory list of patients or doctors.
+
+    Cell text is only produced for the cells a view actually paints, so large
+    lists cost no more than the visible rows. Changes made through append(),
+    remove() and row_changed() are signalled row by row, which lets attached
+    views keep their selection and scroll position instead of being rebuilt.
+    """
+
+    def __init__(self, rows, columns, parent=None):
+        """
+        Args:
+            rows (list): The objects shown, one per row. The list is shared, not copied.
+            columns (list): (header, getter) pairs; getter returns the cell text of
+                an object, or is None for the running row number.
+        """
+        super().__init__(parent)
+        self._rows = rows
+        self._headers = [header for header, _ in columns]
+        self._getters = [getter for _, getter in columns]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        getter = self._getters[index.column()]
+        if getter is None:
+            return str(index.row() + 1)
+        return getter(self._rows[index.row()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._headers[section]
+        return str(section + 1)
+
+    def row_object(self, row):
+        """Returns the object shown in a row."""
+        return self._rows[row]
+
+    def append(self, item):
+        """Appends an object to the list and inserts its row."""
+        row = len(self._rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.append(item)
+        self.endInsertRows()
+
+    def remove(self, row):
+        """Removes the object in a row from the list and removes the row."""
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self.endRemoveRows()
+        if None in self._getters and row < len(self._rows):
+            # Rows below moved up, renumber them
+            column = self._getters.index(None)
+            self.dataChanged.emit(self.index(row, column), self.index(len(self._rows) - 1, column))
+
+    def remove_rows(self, rows):
+        """Removes the objects in several rows from the list, one block of adjacent rows at a time."""
+        rows = sorted(set(rows))
+        if not rows:
+            return
+        blocks = []
+        for row in rows:
+            if blocks and row == blocks[-1][1] + 1:
+                blocks[-1][1] = row
+            else:
+                blocks.append([row, row])
+        for first, last in reversed(blocks):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+        if None in self._getters and rows[0] < len(self._rows):
+            # Rows below moved up, renumber them
+            column = self._getters.index(None)
+            self.dataChanged.emit(self.index(rows[0], column), self.index(len(self._rows) - 1, column))
+
+    def row_changed(self, row):
+        """Signals that the object in a row was edited."""
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self._headers) - 1))
+
+    def reset(self, rows=None):
+        """Redraws every row, optionally over a new list."""
+        self.beginResetModel()
+        if rows is not None:
+            self._rows = rows
+        self.endResetModel()
+
+
+def _table_view(model):
+    """Returns a read-only table view with stretched columns over a model."""
+    view = QTableView()
+    view.setModel(model)
+    view.setEditTriggers(QTableView.NoEditTriggers)
+    view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    return view
+
+
+PATIENT_COLUMNS = [
+    ("ID", None),
+    ("Full Name", lambda patient: patient.full_name()),
+    ("Age", lambda patient: str(patient._Patient__age)),
+    ("Mobile", lambda patient: patient._Patient__mobile),
+    ("Postcode", lambda patient: patient._Patient__postcode),
+    ("Symptoms", lambda patient: ", ".join(patient.get_symptoms())),
+    ("Doctor", lambda patient: patient.get_doctor()),
+]
+
+DISCHARGED_COLUMNS = [("ID", lambda patient: str(patient.record_id or ""))] + PATIENT_COLUMNS[1:]
+
+DOCTOR_COLUMNS = [
+    ("ID", None),
+    ("Full Name", lambda doctor: doctor.full_name()),
+    ("Speciality", lambda doctor: doctor.get_speciality()),
+    ("Username", lambda doctor: doctor.get_username()),
+]
 
 
 class DoctorDialog(QDialog):
@@ -254,12 +478,71 @@ class PatientDialog(QDialog):
         }
 
 
+class DischargedPatientsDialog(QDialog):
+    """Pages through the discharged patients, one page held in memory at a time."""
+    def __init__(self, storage, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Discharged Patients")
+        self.resize(800, 450)
+        self._storage = storage
+        self._page = 0
+        self._search = ""
+
+        layout = QVBoxLayout()
+
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search by patient or doctor name")
+        self.search_input.returnPressed.connect(self._apply_search)
+        search_btn = QPushButton("Search")
+        search_btn.clicked.connect(self._apply_search)
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(search_btn)
+        layout.addLayout(search_layout)
+
+        self._model = ObjectTableModel([], DISCHARGED_COLUMNS, self)
+        layout.addWidget(_table_view(self._model))
+
+        nav_layout = QHBoxLayout()
+        self.prev_btn = QPushButton("< Previous")
+        self.prev_btn.clicked.connect(lambda: self._show_page(self._page - 1))
+        self.next_btn = QPushButton("Next >")
+        self.next_btn.clicked.connect(lambda: self._show_page(self._page + 1))
+        self.page_label = QLabel()
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.close)
+        nav_layout.addWidget(self.prev_btn)
+        nav_layout.addWidget(self.page_label)
+        nav_layout.addWidget(self.next_btn)
+        nav_layout.addStretch()
+        nav_layout.addWidget(close_btn)
+        layout.addLayout(nav_layout)
+
+        self.setLayout(layout)
+        self._show_page(0)
+
+    def _apply_search(self):
+        self._search = self.search_input.text().strip()
+        self._show_page(0)
+
+    def _show_page(self, page):
+        total = self._storage.discharged_count(self._search)
+        pages = max((total + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+        self._page = min(max(page, 0), pages - 1)
+        self._model.reset(self._storage.discharged_page(self._page, PAGE_SIZE, self._search))
+        self.page_label.setText(f"Page {self._page + 1} of {pages} ({total:,} patients)")
+        self.prev_btn.setEnabled(self._page > 0)
+        self.next_btn.setEnabled(self._page < pages - 1)
+
+
 class DoctorWindow(QMainWindow):
-    def __init__(self, doctor, patients, parent=None):
+    def __init__(self, doctor, patients, patient_index=None, parent=None):
         super().__init__(parent)
         uic.loadUi(DOCTOR_UI, self)
         self._doctor = doctor
         self._patients = patients
+        self._patient_index = patient_index if patient_index is not None else PatientIndex(patients)
+        self._storage = get_storage()
         self._populate_dashboard()
         self._connect_menu_actions()
 
@@ -268,37 +551,37 @@ class DoctorWindow(QMainWindow):
         QtWidgets.QApplication.quit()
         event.accept()
 
-    def _get_patient_appointment(self, patient_name):
+    def _get_patient_appointment(self, patient, appointments=None):
         """Get appointment information for a specific patient.
         
         Args:
-            patient_name (str): Full name of the patient
+            patient (Patient): The patient
+            appointments (AppointmentIndex): Index to look the appointment up in,
+                fetched from storage when not given
             
         Returns:
             str: Appointment date/time or None if no appointment found
         """
-        import glob
-        
-        appointment_files = glob.glob('*_appointments.txt')
-        for file in appointment_files:
-            try:
-                with open(file, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if '|' in line:
-                            parts = line.split('|')
-                            if len(parts) >= 3:
-                                file_patient_name = parts[0].strip()
-                                doctor_name = parts[1].strip()
-                                appointment_datetime = parts[2].strip()
-                                
-                                # Check if this is the patient and doctor matches
-                                if (file_patient_name == patient_name and 
-                                    doctor_name == self._doctor.full_name()):
-                                    return appointment_datetime
-            except FileNotFoundError:
-                continue
-        return None
+        if appointments is None:
+            appointments = self._storage.appointment_index()
+        appointment = appointments.latest(patient.full_name(), self._doctor.full_name(),
+                                          patient.record_id, self._doctor.record_id)
+        return appointment.datetime_text() if appointment else None
+
+    def _my_patients_model(self, id_header):
+        """Returns a table model over the patients assigned to this doctor."""
+        doctor_patients = self._patient_index.by_doctor(self._doctor.record_id)
+        appointments = self._storage.appointment_index()
+        columns = [
+            (id_header, None),
+            ("Full Name", lambda patient: patient.full_name()),
+            ("Mobile", lambda patient: patient._Patient__mobile),
+            ("Address", lambda patient: patient._Patient__address),
+            ("Symptoms", lambda patient: ', '.join(patient.get_symptoms()) or 'None'),
+            ("Appointment", lambda patient: self._get_patient_appointment(patient, appointments)
+             or 'No appointment'),
+        ]
+        return ObjectTableModel(doctor_patients, columns, self)
 
     def _connect_menu_actions(self):
         """Connect menu actions."""
@@ -319,31 +602,14 @@ class DoctorWindow(QMainWindow):
         # Update welcome label
         self.welcomeLabel.setText(f"Welcome, Dr. {self._doctor.full_name()}")
         
-        # Get doctor's patients
-        doctor_patients = [p for p in self._patients if p.get_doctor() == self._doctor.full_name()]
+        # Populate patients table
+        model = self._my_patients_model("S.N.")
+        self.tableWidget.setModel(model)
+        self.tableWidget.setEditTriggers(QTableView.NoEditTriggers)
+        self.tableWidget.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         
         # Update patient count
-        self.lcdNumber.display(len(doctor_patients))
-        
-        # Populate patients table
-        header = self.tableWidget.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.Stretch)
-        
-        self.tableWidget.setRowCount(len(doctor_patients))
-        for row_index, patient in enumerate(doctor_patients):
-            self.tableWidget.setItem(row_index, 0, QTableWidgetItem(str(row_index + 1)))
-            self.tableWidget.setItem(row_index, 1, QTableWidgetItem(patient.full_name()))
-            self.tableWidget.setItem(row_index, 2, QTableWidgetItem(patient._Patient__mobile))
-            self.tableWidget.setItem(row_index, 3, QTableWidgetItem(patient._Patient__address))
-            
-            # Get symptoms
-            symptoms = patient.get_symptoms()
-            symptoms_str = ', '.join(symptoms) if symptoms else 'None'
-            self.tableWidget.setItem(row_index, 4, QTableWidgetItem(symptoms_str))
-            
-            # Appointment info
-            appointment_info = self._get_patient_appointment(patient.full_name())
-            self.tableWidget.setItem(row_index, 5, QTableWidgetItem(appointment_info if appointment_info else 'No appointment'))
+        self.lcdNumber.display(model.rowCount())
 
     def _show_my_patients(self):
         """Show my patients management interface."""
@@ -375,28 +641,9 @@ class DoctorWindow(QMainWindow):
         
         layout.addLayout(button_layout)
         
-        # Patient table
-        self.patient_mgmt_table = QTableWidget()
-        self.patient_mgmt_table.setColumnCount(6)
-        self.patient_mgmt_table.setHorizontalHeaderLabels(["ID", "Full Name", "Mobile", "Address", "Symptoms", "Appointment"])
-        self.patient_mgmt_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        
-        # Populate with doctor's patients only
-        doctor_patients = [p for p in self._patients if p.get_doctor() == self._doctor.full_name()]
-        self.patient_mgmt_table.setRowCount(len(doctor_patients))
-        
-        for row_index, patient in enumerate(doctor_patients):
-            self.patient_mgmt_table.setItem(row_index, 0, QTableWidgetItem(str(row_index + 1)))
-            self.patient_mgmt_table.setItem(row_index, 1, QTableWidgetItem(patient.full_name()))
-            self.patient_mgmt_table.setItem(row_index, 2, QTableWidgetItem(patient._Patient__mobile))
-            self.patient_mgmt_table.setItem(row_index, 3, QTableWidgetItem(patient._Patient__address))
-            
-            symptoms = patient.get_symptoms()
-            symptoms_str = ', '.join(symptoms) if symptoms else 'None'
-            self.patient_mgmt_table.setItem(row_index, 4, QTableWidgetItem(symptoms_str))
-            
-            appointment_info = self._get_patient_appointment(patient.full_name())
-            self.patient_mgmt_table.setItem(row_index, 5, QTableWidgetItem(appointment_info if appointment_info else 'No appointment'))
+        # Patient table, with the doctor's patients only
+        self._patient_model = self._my_patients_model("ID")
+        self.patient_mgmt_table = _table_view(self._patient_model)
         
         layout.addWidget(self.patient_mgmt_table)
         mgmt_widget.setLayout(layout)
@@ -407,14 +654,14 @@ class DoctorWindow(QMainWindow):
     def _add_symptoms(self):
         """Add symptoms to a patient."""
         # Get doctor's patients
-        doctor_patients = [p for p in self._patients if p.get_doctor() == self._doctor.full_name()]
+        doctor_patients = self._patient_index.by_doctor(self._doctor.record_id)
         
         if not doctor_patients:
             QMessageBox.information(self, "No Patients", "You don't have any patients assigned.")
             return
         
         # Get patient names
-        patient_names = [p.full_name() for p in doctor_patients]
+        patient_names = [f"{p.full_name()} (ID {p.record_id})" for p in doctor_patients]
         
         # Ask which patient
         patient_name, ok = QInputDialog.getItem(
@@ -431,34 +678,28 @@ class DoctorWindow(QMainWindow):
         
         if ok and symptoms.strip():
             # Find the patient
-            patient = next((p for p in doctor_patients if p.full_name() == patient_name), None)
+            patient = doctor_patients[patient_names.index(patient_name)]
             if patient:
                 # Add symptoms directly to patient object
                 patient.add_symptoms(symptoms.strip())
-                # Save all patients to file
-                self._save_all_patients()
+                # Save the updated patient
+                self._storage.update_patient(patient, self._patients)
+                self._patient_index.update(patient)
                 QMessageBox.information(self, "Success", f"Symptoms added to {patient_name}")
-                # Refresh the view
-                self._show_my_patients()
-
-    def _save_all_patients(self):
-        """Save all patients to patients_file.txt."""
-        with open('patients_file.txt', 'w') as f:
-            f.write("Full Name|Age|Mobile|Postcode|Address|Symptoms|Doctor\n")
-        for patient in self._patients:
-            Patient.append_patient_record('patients_file.txt', patient)
+                # Refresh the patient's row
+                self._patient_model.row_changed(doctor_patients.index(patient))
 
     def _view_patient_family(self):
         """View family members of a patient."""
         # Get doctor's patients
-        doctor_patients = [p for p in self._patients if p.get_doctor() == self._doctor.full_name()]
+        doctor_patients = self._patient_index.by_doctor(self._doctor.record_id)
         
         if not doctor_patients:
             QMessageBox.information(self, "No Patients", "You don't have any patients assigned.")
             return
         
         # Get patient names
-        patient_names = [p.full_name() for p in doctor_patients]
+        patient_names = [f"{p.full_name()} (ID {p.record_id})" for p in doctor_patients]
         
         # Ask which patient
         patient_name, ok = QInputDialog.getItem(
@@ -469,9 +710,9 @@ class DoctorWindow(QMainWindow):
             return
         
         # Find the patient
-        patient = next((p for p in doctor_patients if p.full_name() == patient_name), None)
+        patient = doctor_patients[patient_names.index(patient_name)]
         if patient:
-            family_members = [p for p in self._patients if p.is_family_member(patient)]
+            family_members = [p for p in self._patient_index.by_surname(patient.get_surname()) if p is not patient]
             
             if family_members:
                 family_info = f"Family members of {patient_name}:\n\n"
@@ -557,6 +798,9 @@ class DoctorWindow(QMainWindow):
         )
         
         if ok and new_username.strip():
+            if not get_credentials().is_available(new_username.strip(), DOCTOR_ROLE, self._doctor.record_id):
+                QMessageBox.warning(self, "Duplicate", "This username is already taken.")
+                return
             self._doctor.set_username(new_username.strip())
             self._doctor._persist_credentials()
             QMessageBox.information(self, "Success", "Username changed successfully!")
@@ -587,16 +831,24 @@ class DoctorWindow(QMainWindow):
 
 
 class AdminWindow(QMainWindow):
-    def __init__(self, doctors, patients, parent=None):
+    def __init__(self, doctors, patients, patient_index=None, parent=None):
         super().__init__(parent)
         uic.loadUi(ADMIN_UI, self)
         self._doctors = doctors
         self._patients = patients
+        self._patient_index = patient_index if patient_index is not None else PatientIndex(patients)
+        self._storage = get_storage()
+        self._reports_page = None
+        self._report_worker = None  # The report the reports page is waiting for
+        self._report_threads = []  # Every ReportWorker still running, cancelled ones included
         self._populate_dashboard()
         self._connect_menu_actions()
 
     def closeEvent(self, event):
         """Handle close event to properly quit the application."""
+        for worker in self._report_threads:
+            worker.requestInterruption()
+            worker.wait()
         QtWidgets.QApplication.quit()
         event.accept()
 
@@ -668,11 +920,8 @@ class AdminWindow(QMainWindow):
         layout.addLayout(button_layout)
         
         # Doctor table
-        self.doctor_mgmt_table = QTableWidget()
-        self.doctor_mgmt_table.setColumnCount(4)
-        self.doctor_mgmt_table.setHorizontalHeaderLabels(["ID", "Full Name", "Speciality", "Username"])
-        self.doctor_mgmt_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self._refresh_doctor_table()
+        self._doctor_model = ObjectTableModel(self._doctors, DOCTOR_COLUMNS, self)
+        self.doctor_mgmt_table = _table_view(self._doctor_model)
         
         layout.addWidget(self.doctor_mgmt_table)
         mgmt_widget.setLayout(layout)
@@ -682,15 +931,6 @@ class AdminWindow(QMainWindow):
         # Restore geometry
         self.setGeometry(current_geometry)
     
-    def _refresh_doctor_table(self):
-        """Refresh the doctor management table."""
-        self.doctor_mgmt_table.setRowCount(len(self._doctors))
-        for row, doctor in enumerate(self._doctors):
-            self.doctor_mgmt_table.setItem(row, 0, QTableWidgetItem(str(row + 1)))
-            self.doctor_mgmt_table.setItem(row, 1, QTableWidgetItem(doctor.full_name()))
-            self.doctor_mgmt_table.setItem(row, 2, QTableWidgetItem(doctor.get_speciality()))
-            self.doctor_mgmt_table.setItem(row, 3, QTableWidgetItem(doctor.get_username()))
-    
     def _register_doctor_inline(self):
         """Register a new doctor."""
         dialog = DoctorDialog(parent=self)
@@ -712,6 +952,10 @@ class AdminWindow(QMainWindow):
             if name_exists:
                 QMessageBox.warning(self, "Duplicate", "A doctor with this name already exists.")
                 return
+
+            if not get_credentials().is_available(data['username'], DOCTOR_ROLE):
+                QMessageBox.warning(self, "Duplicate", "This username is already taken.")
+                return
             
             # Create new doctor
             new_doctor = Doctor(
@@ -721,10 +965,10 @@ class AdminWindow(QMainWindow):
                 data['username'],
                 data['password']
             )
-            self._doctors.append(new_doctor)
+            self._doctor_model.append(new_doctor)
             new_doctor._persist_credentials()
+            get_report_aggregates().add_doctor(new_doctor)
             
-            self._refresh_doctor_table()
             QMessageBox.information(self, "Success", "Doctor registered successfully.")
     
     def _update_doctor_inline(self):
@@ -749,15 +993,16 @@ class AdminWindow(QMainWindow):
             
             doctor.set_first_name(data['first_name'])
             doctor.set_surname(data['surname'])
+            get_report_aggregates().change_speciality(doctor.get_speciality(), data['speciality'])
             doctor.set_speciality(data['speciality'])
             
             if data['password']:
                 doctor.set_password(data['password'])
             
-            # Save all doctors to avoid duplicates when updating
-            self._save_all_doctors()
+            # Save the updated doctor record
+            self._storage.update_doctor(doctor)
             
-            self._refresh_doctor_table()
+            self._doctor_model.row_changed(row)
             QMessageBox.information(self, "Success", "Doctor updated successfully.")
     
     def _delete_doctor_inline(self):
@@ -779,22 +1024,14 @@ class AdminWindow(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            del self._doctors[row]
-            self._save_all_doctors()
-            self._refresh_doctor_table()
+            self._doctor_model.remove(row)
+            self._storage.delete_doctor(doctor, self._doctors)
+            get_report_aggregates().remove_doctor(doctor)
             QMessageBox.information(self, "Success", "Doctor deleted successfully.")
     
     def _save_all_doctors(self):
-        """Save all doctors to doctor.txt file."""
-        import base64
-        header = "Full Name|Speciality|Username|Password"
-        
-        with open("doctor.txt", "w", encoding="utf-8") as f:
-            f.write(header + "\n")
-            for doctor in self._doctors:
-                encoded_password = base64.b64encode(doctor.get_password().encode("utf-8")).decode("ascii")
-                f.write(f"{doctor.full_name()}|{doctor.get_speciality()}|"
-                       f"{doctor.get_username()}|{encoded_password}\n")
+        """Save all doctors to storage."""
+        self._storage.save_doctors(self._doctors)
     
     def _show_patient_management(self):
         """Show patient management in the main window."""
@@ -859,12 +1096,11 @@ class AdminWindow(QMainWindow):
         layout.addLayout(button_layout1)
         layout.addLayout(button_layout2)
         
-        # Patient table
-        self.patient_mgmt_table = QTableWidget()
-        self.patient_mgmt_table.setColumnCount(7)
-        self.patient_mgmt_table.setHorizontalHeaderLabels(["ID", "Full Name", "Age", "Mobile", "Postcode", "Symptoms", "Doctor"])
-        self.patient_mgmt_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self._refresh_patient_table()
+        # Patient table; Ctrl/Shift-click selects several patients for discharge, assign, relocate and symptoms
+        self._patient_model = ObjectTableModel(self._patients, PATIENT_COLUMNS, self)
+        self.patient_mgmt_table = _table_view(self._patient_model)
+        self.patient_mgmt_table.setSelectionBehavior(QTableView.SelectRows)
+        self.patient_mgmt_table.setSelectionMode(QTableView.ExtendedSelection)
         
         layout.addWidget(self.patient_mgmt_table)
         mgmt_widget.setLayout(layout)
@@ -874,18 +1110,6 @@ class AdminWindow(QMainWindow):
         # Restore geometry
         self.setGeometry(current_geometry)
     
-    def _refresh_patient_table(self):
-        """Refresh the patient management table."""
-        self.patient_mgmt_table.setRowCount(len(self._patients))
-        for row, patient in enumerate(self._patients):
-            self.patient_mgmt_table.setItem(row, 0, QTableWidgetItem(str(row + 1)))
-            self.patient_mgmt_table.setItem(row, 1, QTableWidgetItem(patient.full_name()))
-            self.patient_mgmt_table.setItem(row, 2, QTableWidgetItem(str(patient._Patient__age)))
-            self.patient_mgmt_table.setItem(row, 3, QTableWidgetItem(patient._Patient__mobile))
-            self.patient_mgmt_table.setItem(row, 4, QTableWidgetItem(patient._Patient__postcode))
-            self.patient_mgmt_table.setItem(row, 5, QTableWidgetItem(", ".join(patient.get_symptoms())))
-            self.patient_mgmt_table.setItem(row, 6, QTableWidgetItem(patient.get_doctor()))
-    
     def _add_patient_inline(self):
         """Add a new patient."""
         dialog = PatientDialog(parent=self)
@@ -913,10 +1137,10 @@ class AdminWindow(QMainWindow):
                 data['address'],
                 data['symptoms']
             )
-            self._patients.append(new_patient)
-            Patient.append_patient_record('patients_file.txt', new_patient)
+            self._patient_model.append(new_patient)
+            self._storage.add_patient(new_patient)
+            self._patient_index.add(new_patient)
             
-            self._refresh_patient_table()
             QMessageBox.information(self, "Success", "Patient added successfully.")
     
     def _update_patient_inline(self):
@@ -947,70 +1171,77 @@ class AdminWindow(QMainWindow):
             
             patient.set_first_name(data['first_name'])
             patient.set_surname(data['surname'])
-            patient._Patient__age = age
-            patient._Patient__mobile = data['mobile']
-            patient._Patient__postcode = data['postcode']
-            patient._Patient__address = data['address']
+            patient.set_age(age)
+            patient.set_mobile(data['mobile'])
+            patient.set_postcode(data['postcode'])
+            patient.set_address(data['address'])
             if data['symptoms']:
                 patient.set_symptoms([s.strip() for s in data['symptoms'].split(',')])
             
-            self._save_all_patients()
-            self._refresh_patient_table()
+            self._storage.update_patient(patient, self._patients)
+            self._patient_index.update(patient)
+            self._patient_model.row_changed(row)
             QMessageBox.information(self, "Success", "Patient updated successfully.")
     
+    def _selected_patient_rows(self, message):
+        """Returns the selected rows of the patient table in order, warning with message if there are none."""
+        rows = sorted(index.row() for index in self.patient_mgmt_table.selectionModel().selectedRows())
+        if not rows:
+            QMessageBox.warning(self, "No Selection", message)
+        return rows
+
+    def _selected_patients_text(self, patients):
+        """Returns the name of a single patient, or the number of patients."""
+        return patients[0].full_name() if len(patients) == 1 else f"{len(patients)} patients"
+
     def _discharge_patient_inline(self):
-        """Discharge a patient."""
-        selected_rows = self.patient_mgmt_table.selectionModel().selectedRows()
-        
-        if not selected_rows:
-            QMessageBox.warning(self, "No Selection", "Please select a patient to discharge.")
+        """Discharge the selected patients, writing the discharge and patient files once."""
+        rows = self._selected_patient_rows("Please select a patient to discharge.")
+        if not rows:
             return
         
-        row = selected_rows[0].row()
-        patient = self._patients[row]
+        patients = [self._patients[row] for row in rows]
         
         reply = QMessageBox.question(
             self, 
             "Confirm Discharge", 
-            f"Are you sure you want to discharge {patient.full_name()}?",
+            f"Are you sure you want to discharge {self._selected_patients_text(patients)}?",
             QMessageBox.Yes | QMessageBox.No
         )
         
         if reply == QMessageBox.Yes:
-            Patient.append_discharged_patient(patient)
-            del self._patients[row]
-            self._save_all_patients()
-            self._refresh_patient_table()
-            QMessageBox.information(self, "Success", "Patient discharged successfully.")
+            self._patient_model.remove_rows(rows)
+            for patient in patients:
+                self._patient_index.remove(patient)
+            self._storage.discharge_patients(patients, self._patients)
+            QMessageBox.information(self, "Success", f"{self._selected_patients_text(patients)} discharged successfully.")
     
-    def _save_all_patients(self):
-        """Save all patients to patients_file.txt."""
-        with open('patients_file.txt', 'w') as f:
-            f.write("Full Name|Age|Mobile|Postcode|Address|Symptoms|Doctor\n")
-        for patient in self._patients:
-            Patient.append_patient_record('patients_file.txt', patient)
-
     def _view_add_symptoms_inline(self):
-        """View or add symptoms for a patient."""
-        selected_rows = self.patient_mgmt_table.selectionModel().selectedRows()
-        
-        if not selected_rows:
-            QMessageBox.warning(self, "No Selection", "Please select a patient.")
+        """View or add symptoms for the selected patients."""
+        rows = self._selected_patient_rows("Please select a patient.")
+        if not rows:
             return
         
-        row = selected_rows[0].row()
-        patient = self._patients[row]
+        patients = [self._patients[row] for row in rows]
+        patient = patients[0]
         
         # Ask what to do
         msg = QMessageBox(self)
         msg.setWindowTitle("Symptoms Options")
-        msg.setText(f"What would you like to do for {patient.full_name()}?")
+        msg.setText(f"What would you like to do for {self._selected_patients_text(patients)}?")
         view_btn = msg.addButton("View Symptoms", QMessageBox.ActionRole)
         add_btn = msg.addButton("Add Symptoms", QMessageBox.ActionRole)
         cancel_btn = msg.addButton("Cancel", QMessageBox.RejectRole)
         msg.exec_()
         
-        if msg.clickedButton() == view_btn:
+        if msg.clickedButton() == view_btn and len(patients) > 1:
+            QMessageBox.information(
+                self,
+                "Patient Symptoms",
+                "\n".join(f"{p.full_name()}: {', '.join(p.get_symptoms()) or 'none'}" for p in patients)
+            )
+        
+        elif msg.clickedButton() == view_btn:
             symptoms = patient.get_symptoms()
             if symptoms:
                 QMessageBox.information(
@@ -1022,48 +1253,59 @@ class AdminWindow(QMainWindow):
                 QMessageBox.information(self, "No Symptoms", "This patient has no symptoms recorded.")
         
         elif msg.clickedButton() == add_btn:
-            current_symptoms = ", ".join(patient.get_symptoms())
+            if len(patients) == 1:
+                current = f"Current symptoms: {', '.join(patient.get_symptoms())}"
+            else:
+                current = f"Adding to {len(patients)} patients."
             text, ok = QInputDialog.getText(
                 self,
                 "Add Symptoms",
-                f"Current symptoms: {current_symptoms}\n\nEnter new symptoms to add:",
+                f"{current}\n\nEnter new symptoms to add:",
                 QLineEdit.Normal
             )
             
             if ok and text:
-                patient.add_symptoms(text)
-                self._save_all_patients()
-                self._refresh_patient_table()
+                for patient in patients:
+                    patient.add_symptoms(text)
+                self._storage.update_patients(patients, self._patients)
+                for row, patient in zip(rows, patients):
+                    self._patient_index.update(patient)
+                    self._patient_model.row_changed(row)
                 QMessageBox.information(self, "Success", "Symptoms added successfully.")
 
     def _assign_doctor_inline(self):
-        """Assign a doctor to a patient."""
-        selected_rows = self.patient_mgmt_table.selectionModel().selectedRows()
-        
-        if not selected_rows:
-            QMessageBox.warning(self, "No Selection", "Please select a patient.")
+        """Assign a doctor to the selected patients, booking them into consecutive free slots."""
+        rows = self._selected_patient_rows("Please select a patient.")
+        if not rows:
             return
         
-        row = selected_rows[0].row()
-        patient = self._patients[row]
-        
-        # Check if already assigned
-        if patient.get_doctor() != "None":
-            QMessageBox.warning(
-                self, 
-                "Already Assigned", 
-                f"This patient is already assigned to Dr. {patient.get_doctor()}.\nUse 'Relocate Doctor' option to change."
-            )
+        # Patients who already have a doctor are left alone
+        waiting = [row for row in rows if self._patients[row].get_doctor() == "None"]
+        if not waiting:
+            if len(rows) == 1:
+                message = f"This patient is already assigned to Dr. {self._patients[rows[0]].get_doctor()}."
+            else:
+                message = "The selected patients are already assigned to doctors."
+            QMessageBox.warning(self, "Already Assigned", message + "\nUse 'Relocate Doctor' option to change.")
             return
-        
-        # Show doctor selection dialog
+        rows = waiting
+        patients = [self._patients[row] for row in rows]
+        patient = patients[0]
+
+        # Show doctor selection dialog, starting at the least-loaded doctor of the (first) patient's speciality
         doctor_names = [f"{i+1}. {d.full_name()} - {d.get_speciality()}" for i, d in enumerate(self._doctors)]
+        speciality, suggested = suggest_doctor(patient, self._doctors, self._patient_index)
+        suggestion = f"Suggested for {speciality}: Dr. {suggested.full_name()}" if suggested else ""
+        if len(patients) == 1:
+            selection = f"Patient symptoms: {', '.join(patient.get_symptoms())}"
+        else:
+            selection = f"{len(patients)} patients without a doctor selected"
         doctor_name, ok = QInputDialog.getItem(
             self,
             "Select Doctor",
-            f"Patient symptoms: {', '.join(patient.get_symptoms())}\n\nSelect doctor:",
+            f"{selection}\n{suggestion}\n\nSelect doctor:",
             doctor_names,
-            0,
+            self._doctors.index(suggested) if suggested else 0,
             False
         )
         
@@ -1075,12 +1317,14 @@ class AdminWindow(QMainWindow):
             from datetime import datetime
             
             # Simple dialog for appointment date/time
+            suggested_date, suggested_time, slot_note = self._free_slot_defaults(doctor)
+
             date_str, ok = QInputDialog.getText(
                 self,
                 "Appointment Date",
-                "Enter appointment date (YYYY-MM-DD):",
+                f"Enter appointment date (YYYY-MM-DD):\n\n{slot_note}",
                 QLineEdit.Normal,
-                "2026-02-20"
+                suggested_date
             )
             
             if not ok:
@@ -1091,7 +1335,7 @@ class AdminWindow(QMainWindow):
                 "Appointment Time",
                 "Enter appointment time (HH:MM):",
                 QLineEdit.Normal,
-                "10:00"
+                suggested_time
             )
             
             if not ok:
@@ -1099,84 +1343,112 @@ class AdminWindow(QMainWindow):
             
             try:
                 appointment_date = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
-                
+                if not self._booking_confirmed(doctor.full_name(), doctor.record_id, appointment_date, patient):
+                    return
+                appointment_dates = self._consecutive_slots(doctor, appointment_date, len(patients))
+                if appointment_dates is None:
+                    return
+
                 # Assign doctor
-                patient.link(doctor.full_name(), appointment_date)
-                doctor.add_patient(patient.full_name())
-                doctor.add_appointment(appointment_date)
-                
-                # Save appointment to file
-                appointment_file = f"{appointment_date.year}_appointments.txt"
-                import os
-                if not os.path.exists(appointment_file):
-                    with open(appointment_file, 'w') as f:
-                        f.write("Patient Name|Doctor Name|Appointment DateTime\n")
-                
-                with open(appointment_file, 'a') as f:
-                    f.write(f"{patient.full_name()}|{doctor.full_name()}|{appointment_date.strftime('%Y/%m/%d %H:%M')}\n")
-                
-                self._save_all_patients()
-                self._refresh_patient_table()
+                for patient, appointment_date in zip(patients, appointment_dates):
+                    patient.link(doctor.full_name(), appointment_date, doctor.record_id)
+                    doctor.add_patient(patient)
+                    doctor.add_appointment(appointment_date)
+
+                # Save the appointments and the updated patients, once for the whole selection
+                self._storage.add_appointments([(patient.full_name(), doctor.full_name(), appointment_date,
+                                                 patient.record_id, doctor.record_id)
+                                                for patient, appointment_date in zip(patients, appointment_dates)])
+                self._storage.update_patients(patients, self._patients)
+                for row, patient in zip(rows, patients):
+                    self._patient_index.update(patient)
+                    self._patient_model.row_changed(row)
                 QMessageBox.information(
-                    self, 
-                    "Success", 
-                    f"Patient assigned to Dr. {doctor.full_name()} on {appointment_date.strftime('%Y/%m/%d %H:%M')}"
+                    self,
+                    "Success",
+                    f"{self._selected_patients_text(patients)} assigned to Dr. {doctor.full_name()} "
+                    f"{'on' if len(patients) == 1 else 'from'} {appointment_dates[0].strftime('%Y/%m/%d %H:%M')}"
                 )
             except ValueError as e:
                 QMessageBox.warning(self, "Invalid Date/Time", f"Please enter valid date and time.\nError: {e}")
 
+    def _free_slot_defaults(self, doctor, others=True):
+        """Returns the date and time the appointment dialogs suggest, and a note listing the next free slots.
+
+        Args:
+            doctor (Doctor): The doctor being booked, or None if unknown.
+            others (bool): Point out an earlier free slot of another doctor with the same speciality.
+
+        Returns:
+            tuple: (date as YYYY-MM-DD, time as HH:MM, note)
+        """
+        from datetime import datetime
+
+        scheduler = get_scheduler()
+        slots = [start for start, _ in scheduler.free_slots([doctor], count=SUGGESTED_SLOTS)] if doctor else []
+        if not slots:
+            return datetime.now().strftime("%Y-%m-%d"), "10:00", "No free slot found within working hours."
+        note = "Next free slots: " + ", ".join(start.strftime("%Y-%m-%d %H:%M") for start in slots)
+        if others:
+            colleagues = [other for other in self._doctors if other is not doctor]
+            earlier = scheduler.free_slots_for_speciality(colleagues, doctor.get_speciality(), end=slots[0], count=1)
+            if earlier:
+                start, other = earlier[0]
+                note += (f"\nDr. {other.full_name()} ({other.get_speciality()}) is free earlier, "
+                         f"on {start.strftime('%Y-%m-%d %H:%M')}.")
+        return slots[0].strftime("%Y-%m-%d"), slots[0].strftime("%H:%M"), note
+
+    def _consecutive_slots(self, doctor, appointment_date, count):
+        """Returns the chosen appointment followed by the doctor's next free slots, one per selected patient.
+
+        Warns and returns None when the doctor has too few free slots within SEARCH_DAYS.
+        """
+        if count == 1:
+            return [appointment_date]
+        scheduler = get_scheduler()
+        following = scheduler.iter_free_slots(doctor, appointment_date + scheduler.slot)
+        appointment_dates = [appointment_date] + list(itertools.islice(following, count - 1))
+        if len(appointment_dates) < count:
+            QMessageBox.warning(
+                self,
+                "Not Enough Free Slots",
+                f"Dr. {doctor.full_name()} has only {len(appointment_dates) - 1} free slots after "
+                f"{appointment_date.strftime('%Y/%m/%d %H:%M')} for the other {count - 1} patients."
+            )
+            return None
+        return appointment_dates
+
+    def _booking_confirmed(self, doctor_name, doctor_id, appointment_date, patient) -> bool:
+        """Checks the doctor's schedule for the new appointment and asks before double booking.
+
+        Returns:
+            bool: True if the slot is free or the admin chose to book it anyway.
+        """
+        conflict = get_scheduler().conflict(doctor_name, appointment_date, doctor_id,
+                                            patient.full_name(), patient.record_id)
+        if conflict is None:
+            return True
+        reply = QMessageBox.question(
+            self,
+            "Double Booking",
+            f"Dr. {doctor_name} already has an appointment with {conflict.get_patient()} "
+            f"at {conflict.get_datetime().strftime('%Y/%m/%d %H:%M')}.\n\nBook anyway?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        return reply == QMessageBox.Yes
+
     def _view_discharged_inline(self):
         """View discharged patients."""
-        try:
-            with open('discharged_patient.txt', 'r') as f:
-                lines = f.readlines()[1:]  # Skip header
-            
-            if not lines:
-                QMessageBox.information(self, "No Discharged Patients", "There are no discharged patients.")
-                return
-            
-            # Create dialog to show discharged patients
-            dialog = QDialog(self)
-            dialog.setWindowTitle("Discharged Patients")
-            dialog.resize(800, 400)
-            
-            layout = QVBoxLayout()
-            
-            table = QTableWidget()
-            table.setColumnCount(7)
-            table.setHorizontalHeaderLabels(["ID", "Full Name", "Age", "Mobile", "Postcode", "Symptoms", "Doctor"])
-            table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-            table.setRowCount(len(lines))
-            
-            for row, line in enumerate(lines):
-                parts = line.strip().split('|')
-                if len(parts) >= 7:
-                    table.setItem(row, 0, QTableWidgetItem(str(row + 1)))
-                    table.setItem(row, 1, QTableWidgetItem(parts[0]))
-                    table.setItem(row, 2, QTableWidgetItem(parts[1]))
-                    table.setItem(row, 3, QTableWidgetItem(parts[2]))
-                    table.setItem(row, 4, QTableWidgetItem(parts[3]))
-                    table.setItem(row, 5, QTableWidgetItem(parts[5]))
-                    table.setItem(row, 6, QTableWidgetItem(parts[6]))
-            
-            layout.addWidget(table)
-            
-            close_btn = QPushButton("Close")
-            close_btn.clicked.connect(dialog.close)
-            layout.addWidget(close_btn)
-            
-            dialog.setLayout(layout)
-            dialog.exec_()
-            
-        except FileNotFoundError:
+        if not self._storage.discharged_count():
             QMessageBox.information(self, "No Discharged Patients", "There are no discharged patients.")
+            return
+
+        DischargedPatientsDialog(self._storage, self).exec_()
 
     def _view_family_inline(self):
         """View patients grouped by family."""
-        same_family = {}
-        for patient in self._patients:
-            patient_surname = patient.get_surname()
-            same_family.setdefault(patient_surname, []).append(patient)
+        same_family = self._patient_index.families()
         
         if not same_family:
             QMessageBox.information(self, "No Patients", "There are no patients to group.")
@@ -1246,358 +1518,179 @@ class AdminWindow(QMainWindow):
         # Row 2 Buttons
         button_layout2 = QHBoxLayout()
         patients_by_symptom_btn = QPushButton("Patients by Symptom")
+        patients_by_age_btn = QPushButton("Patients by Age Group")
         all_appointments_btn = QPushButton("All Appointments")
+        appointment_conflicts_btn = QPushButton("Appointment Conflicts")
         
         patients_by_symptom_btn.setStyleSheet("padding: 12px 16px; font-size: 11pt;")
+        patients_by_age_btn.setStyleSheet("padding: 12px 16px; font-size: 11pt;")
         all_appointments_btn.setStyleSheet("padding: 12px 16px; font-size: 11pt;")
+        appointment_conflicts_btn.setStyleSheet("padding: 12px 16px; font-size: 11pt;")
         
         patients_by_symptom_btn.clicked.connect(self._report_patients_by_symptom)
+        patients_by_age_btn.clicked.connect(self._report_patients_by_age)
         all_appointments_btn.clicked.connect(self._report_all_appointments)
+        appointment_conflicts_btn.clicked.connect(self._report_appointment_conflicts)
         
         button_layout2.addWidget(patients_by_symptom_btn)
+        button_layout2.addWidget(patients_by_age_btn)
         button_layout2.addWidget(all_appointments_btn)
+        button_layout2.addWidget(appointment_conflicts_btn)
         button_layout2.addStretch()
         
         layout.addLayout(button_layout1)
         layout.addLayout(button_layout2)
         
-        # Info label
+        # Progress of the report being built, which keeps the window responsive
+        progress_layout = QHBoxLayout()
+        self._report_status = QLabel("")
+        self._report_status.setStyleSheet("font-size: 10pt; color: #374151;")
+        self._report_progress = QProgressBar()
+        self._report_progress.setRange(0, 100)
+        self._report_cancel_btn = QPushButton("Cancel")
+        self._report_cancel_btn.clicked.connect(self._cancel_report)
+        for widget in (self._report_progress, self._report_cancel_btn):
+            # Showing them must not resize the chart below, which would redraw it on this thread
+            policy = widget.sizePolicy()
+            policy.setRetainSizeWhenHidden(True)
+            widget.setSizePolicy(policy)
+            widget.hide()
+        progress_layout.addWidget(self._report_status, 1)
+        progress_layout.addWidget(self._report_progress, 2)
+        progress_layout.addWidget(self._report_cancel_btn)
+        layout.addLayout(progress_layout)
+        
+        # Finished reports are shown here
+        self._report_area = QVBoxLayout()
         info = QLabel("Click a button above to generate a report")
         info.setStyleSheet("font-size: 12pt; color: #6b7280; margin: 20px; text-align: center;")
-        layout.addWidget(info)
-        
-        layout.addStretch()
+        self._report_area.addWidget(info)
+        layout.addLayout(self._report_area, 1)
         
         reports_widget.setLayout(layout)
+        if self._report_worker is not None:
+            self._report_worker.requestInterruption()
+            self._report_worker = None
+        self._reports_page = reports_widget
         self.setCentralWidget(reports_widget)
         
         # Restore geometry
         self.setGeometry(current_geometry)
     
-    def _report_total_doctors(self):
-        """Generate report for total number of doctors."""
-        # Close all existing figures first
-        plt.close('all')
-        
-        total_doctors = len(self._doctors)
-        
-        # Count doctors by speciality
-        speciality_counts = {}
-        for doctor in self._doctors:
-            speciality = doctor.get_speciality()
-            speciality_counts[speciality] = speciality_counts.get(speciality, 0) + 1
-        
-        # Create visualization with unique figure
-        fig = plt.figure(num="Total Doctors Report", figsize=(14, 6))
-        ax1, ax2 = fig.subplots(1, 2)
-        
-        # Bar chart for total doctors
-        ax1.bar(['Total Doctors'], [total_doctors], color='#3498db', width=0.5)
-        ax1.set_ylabel('Count', fontsize=12)
-        ax1.set_title('Total Number of Doctors', fontsize=14, fontweight='bold')
-        ax1.set_ylim(0, total_doctors + 2)
-        for i, v in enumerate([total_doctors]):
-            ax1.text(i, v + 0.1, str(v), ha='center', va='bottom', fontsize=12, fontweight='bold')
-        
-        # Pie chart for specialties
-        if speciality_counts:
-            colors = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12', '#9b59b6', '#1abc9c']
-            ax2.pie(speciality_counts.values(), labels=speciality_counts.keys(), autopct='%1.1f%%',
-                startangle=90, colors=colors[:len(speciality_counts)])
-            ax2.set_title('Doctors by Speciality', fontsize=14, fontweight='bold')
-        
-        plt.tight_layout()
-        
-        # Get figure manager and prevent it from closing the app
-        fig_manager = plt.get_current_fig_manager()
-        if fig_manager is not None and hasattr(fig_manager, 'window'):
-            # Prevent the figure window from closing the entire application
-            def closeEvent(event):
-                event.accept()  # Just close the figure window, don't quit the app
-            fig_manager.window.closeEvent = closeEvent
-        
-        plt.show(block=False)
-        
-        QMessageBox.information(
-            self, 
-            "Total Doctors Report", 
-            f"Total number of doctors: {total_doctors}\n\nChart displayed separately."
-        )
-    
-    def _report_patients_per_doctor(self):
-        """Generate report for patients per doctor."""
-        # Close all existing figures first
-        plt.close('all')
-        
-        doctor_names = []
-        total_patients_list = []
-        
-        for doctor in self._doctors:
-            total_patients = doctor.get_total_patients()
-            doctor_names.append(doctor.full_name())
-            total_patients_list.append(total_patients)
-        
-        if doctor_names:
-            # Create bar chart with colors
-            fig = plt.figure(num="Patients per Doctor Report", figsize=(12, 6))
-            colors = plt.cm.viridis(range(len(doctor_names)))
-            bars = plt.bar(doctor_names, total_patients_list, color=colors, edgecolor='black', linewidth=1.2)
-            
-            # Add value labels on top of bars
-            for bar in bars:
-                height = bar.get_height()
-                plt.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{int(height)}', ha='center', va='bottom', fontsize=10, fontweight='bold')
-            
-            plt.xlabel('Doctors', fontsize=12, fontweight='bold')
-            plt.ylabel('Number of Patients', fontsize=12, fontweight='bold')
-            plt.title('Total Patients per Doctor', fontsize=14, fontweight='bold')
-            plt.xticks(rotation=45, ha='right')
-            plt.grid(axis='y', alpha=0.3, linestyle='--')
-            plt.tight_layout()
-            
-            # Get figure manager and prevent it from closing the app
-            fig_manager = plt.get_current_fig_manager()
-            if fig_manager is not None and hasattr(fig_manager, 'window'):
-                # Prevent the figure window from closing the entire application
-                def closeEvent(event):
-                    event.accept()  # Just close the figure window, don't quit the app
-                fig_manager.window.closeEvent = closeEvent
-            
-            plt.show(block=False)
-            
-            # Show summary
-            summary = "Patients per Doctor:\n\n"
-            for name, count in zip(doctor_names, total_patients_list):
-                summary += f"{name}: {count} patients\n"
-            
-            QMessageBox.information(self, "Patients per Doctor Report", summary + "\nChart displayed separately.")
-        else:
-            QMessageBox.information(self, "No Data", "No doctors found.")
-    
-    def _report_appointments_per_month(self):
-        """Generate report for appointments per month per doctor."""
-        # Close all existing figures first
-        plt.close('all')
-        
-        import glob
-        
-        appointments_data = {}
-        APPOINTMENT_HEADER = "Patient Name|Doctor Name|Appointment DateTime"
-        
-        appointment_files = glob.glob('*_appointments.txt')
-        for file in appointment_files:
-            try:
-                with open(file, 'r') as f:
-                    for line in f:
-                        if line.strip() == APPOINTMENT_HEADER:
-                            continue
-                        data = line.strip().split('|')
-                        if len(data) >= 3:
-                            doctor_name = data[1].strip()
-                            appointment_datetime = data[2].strip().split()[0]  # Get date part
-                            year_month = '/'.join(appointment_datetime.split('/')[:2])
-                            
-                            if doctor_name not in appointments_data:
-                                appointments_data[doctor_name] = {}
-                            appointments_data[doctor_name][year_month] = appointments_data[doctor_name].get(year_month, 0) + 1
-            except FileNotFoundError:
-                continue
-        
-        if appointments_data:
-            # Create visualization with unique figure
-            fig = plt.figure(num="Appointments per Month Report", figsize=(14, 8))
-            ax = fig.add_subplot(111)
-            
-            # Get all unique months
-            all_months = sorted(set(month for months in appointments_data.values() for month in months.keys()))
-            
-            # Prepare data for grouped bar chart
-            x = range(len(all_months))
-            width = 0.8 / len(appointments_data) if appointments_data else 0.8
-            
-            for i, (doctor_name, months) in enumerate(appointments_data.items()):
-                counts = [months.get(month, 0) for month in all_months]
-                offset = width * i - (width * (len(appointments_data) - 1) / 2)
-                bars = ax.bar([pos + offset for pos in x], counts, width, label=doctor_name)
-                
-                # Add value labels
-                for bar in bars:
-                    height = bar.get_height()
-                    if height > 0:
-                        ax.text(bar.get_x() + bar.get_width()/2., height,
-                            f'{int(height)}', ha='center', va='bottom', fontsize=8)
-            
-            # Format x-axis labels
-            month_labels = []
-            for month in all_months:
-                year, month_num = month.split('/')
-                month_names = ['', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                            'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-                month_labels.append(f"{month_names[int(month_num)]} {year}")
-            
-            ax.set_xlabel('Month', fontsize=12, fontweight='bold')
-            ax.set_ylabel('Number of Appointments', fontsize=12, fontweight='bold')
-            ax.set_title('Total Appointments per Month per Doctor', fontsize=14, fontweight='bold')
-            ax.set_xticks(x)
-            ax.set_xticklabels(month_labels, rotation=45, ha='right')
-            ax.legend()
-            ax.grid(axis='y', alpha=0.3, linestyle='--')
-            plt.tight_layout()
-            
-            # Get figure manager and prevent it from closing the app
-            fig_manager = plt.get_current_fig_manager()
-            if fig_manager is not None and hasattr(fig_manager, 'window'):
-                # Prevent the figure window from closing the entire application
-                def closeEvent(event):
-                    event.accept()  # Just close the figure window, don't quit the app
-                fig_manager.window.closeEvent = closeEvent
-            
-            plt.show(block=False)
-            
-            QMessageBox.information(self, "Appointments Report", "Appointments per month chart displayed.")
-        else:
-            QMessageBox.information(self, "No Data", "No appointments found.")
-    
-    def _report_patients_by_symptom(self):
-        """Generate report for patients by symptom type."""
-        # Close all existing figures first
-        plt.close('all')
-        
-        symptom_counts = {}
-        for patient in self._patients:
-            for symptom in patient.get_symptoms():
-                symptom = symptom.strip()
-                if symptom:
-                    symptom_counts[symptom] = symptom_counts.get(symptom, 0) + 1
-
-        if symptom_counts:
-            # Prepare data for visualization
-            symptom_names = list(symptom_counts.keys())
-            pt_wt_symp = list(symptom_counts.values())
-
-            # Create a more appealing visualization with unique figure
-            fig = plt.figure(num="Patients by Symptom Report", figsize=(16, 6))
-            ax1, ax2 = fig.subplots(1, 2)
-            
-            # Horizontal bar chart
-            colors = plt.cm.plasma(range(len(symptom_names)))
-            bars = ax1.barh(symptom_names, pt_wt_symp, color=colors, edgecolor='black', linewidth=1.2)
-            ax1.set_xlabel('Number of Patients', fontsize=12, fontweight='bold')
-            ax1.set_ylabel('Symptoms', fontsize=12, fontweight='bold')
-            ax1.set_title('Patients by Symptom Type', fontsize=14, fontweight='bold')
-            ax1.grid(axis='x', alpha=0.3, linestyle='--')
-            
-            # Add value labels
-            for i, (bar, count) in enumerate(zip(bars, pt_wt_symp)):
-                ax1.text(count + 0.1, bar.get_y() + bar.get_height()/2,
-                        str(count), va='center', fontsize=10, fontweight='bold')
-            
-            # Pie chart
-            colors_pie = plt.cm.Set3(range(len(symptom_names)))
-            wedges, texts, autotexts = ax2.pie(pt_wt_symp, labels=symptom_names, autopct='%1.1f%%',
-                                                startangle=90, colors=colors_pie)
-            ax2.set_title('Distribution of Symptoms', fontsize=14, fontweight='bold')
-            
-            # Make percentage text bold
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_fontweight('bold')
-            
-            plt.tight_layout()
-            
-            # Get figure manager and prevent it from closing the app
-            fig_manager = plt.get_current_fig_manager()
-            if fig_manager is not None and hasattr(fig_manager, 'window'):
-                # Prevent the figure window from closing the entire application
-                def closeEvent(event):
-                    event.accept()  # Just close the figure window, don't quit the app
-                fig_manager.window.closeEvent = closeEvent
-            
-            plt.show(block=False)
-            
-            # Show summary
-            summary = "Patients per Symptom:\n\n"
-            for symptom, count in sorted(symptom_counts.items(), key=lambda x: x[1], reverse=True):
-                summary += f"{symptom}: {count} patients\n"
-            
-            QMessageBox.information(self, "Patients by Symptom Report", summary + "\nChart displayed separately.")
-        else:
-            QMessageBox.information(self, "No Data", "No symptoms data available.")
-    
-    def _report_all_appointments(self):
-        """Generate report showing all appointments."""
-        import glob
-        
-        appointments = {}
-        
-        # Read appointments from all year-specific files
-        appointment_files = glob.glob('*_appointments.txt')
-        
-        if not appointment_files:
-            QMessageBox.information(self, "No Data", "No appointment files found.")
-            return
-        
-        for file in appointment_files:
-            try:
-                with open(file, 'r') as f:
-                    for line in f:
-                        data = line.strip().split('|')
-                        if len(data) >= 3:
-                            patient_name = data[0].strip()
-                            doctor_name = data[1].strip()
-                            appointment_datetime = data[2].strip()
-                            
-                            # Skip header
-                            if patient_name == "Patient Name":
-                                continue
-                            
-                            # Parse date to get year and month
-                            date_part = appointment_datetime.split()[0]  # Get YYYY/MM/DD
-                            year_month = '/'.join(date_part.split('/')[:2])  # Get YYYY/MM
-                            
-                            # Group by year/month
-                            if year_month not in appointments:
-                                appointments[year_month] = []
-                            appointments[year_month].append({
-                                'patient': patient_name,
-                                'doctor': doctor_name,
-                                'datetime': appointment_datetime
-                            })
-            except FileNotFoundError:
-                continue
-        
-        if not appointments:
-            QMessageBox.information(self, "No Data", "No appointments found.")
+    def _report_aggregates(self):
+        """Returns the report counters, following this window's doctors and patients."""
+        return get_report_aggregates().attach(self._doctors, self._patients, self._patient_index)
+
+    def _start_report(self, builder, *args):
+        """Builds a report on a ReportWorker, showing its progress on the reports page.
+
+        Args:
+            builder (str): Name of the ReportFigures builder.
+            *args: Its arguments, before the step callback.
+        """
+        if self._report_worker is not None:
+            self._report_worker.requestInterruption()
+        worker = ReportWorker(builder, args, self)
+        worker.progress.connect(self._report_progress_changed)
+        worker.built.connect(self._report_built)
+        worker.empty.connect(self._report_empty)
+        worker.failed.connect(self._report_failed)
+        worker.finished.connect(self._report_worker_finished)
+        self._report_worker = worker
+        self._report_threads.append(worker)
+        self._report_progress.setValue(0)
+        self._report_status.setText("Starting the report...")
+        self._report_progress.show()
+        self._report_cancel_btn.show()
+        worker.start()
+
+    def _is_current_report(self) -> bool:
+        """True when the signal being handled comes from the report the reports page is waiting for."""
+        return (self.sender() is not None and self.sender() is self._report_worker
+                and self.centralWidget() is self._reports_page)
+
+    def _end_report(self, status):
+        self._report_worker = None
+        self._report_progress.hide()
+        self._report_cancel_btn.hide()
+        self._report_status.setText(status)
+
+    def _cancel_report(self):
+        """Stops the report being built; its worker finishes at its next progress step."""
+        if self._report_worker is not None:
+            self._report_worker.requestInterruption()
+        self._end_report("Report cancelled.")
+
+    def _report_progress_changed(self, value, status):
+        if self._is_current_report():
+            self._report_progress.setValue(value)
+            self._report_status.setText(status)
+
+    def _report_built(self, report):
+        if not self._is_current_report():
             return
-        
-        # Create dialog to show appointments
+        self._end_report("")
+        if report.html is not None:
+            self._show_report_document(report)
+        else:
+            self._show_report_figure(report)
+
+    def _report_empty(self, message):
+        if self._is_current_report():
+            self._end_report("")
+            QMessageBox.information(self, "No Data", message)
+
+    def _report_failed(self, message):
+        if self._is_current_report():
+            self._end_report("")
+            QMessageBox.warning(self, "Report Failed", f"Could not build the report:\n{message}")
+
+    def _report_worker_finished(self):
+        worker = self.sender()
+        if worker in self._report_threads:
+            self._report_threads.remove(worker)
+            worker.deleteLater()
+
+    def _show_report_figure(self, report):
+        """Embeds a finished chart, with its toolbar and summary, in the reports page."""
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
+
+        while self._report_area.count():
+            widget = self._report_area.takeAt(0).widget()
+            if widget is not None:
+                widget.deleteLater()
+
+        view = QWidget()
+        layout = QVBoxLayout(view)
+        layout.setContentsMargins(0, 0, 0, 0)
+        title = QLabel(report.title)
+        title.setStyleSheet("font-size: 14pt; font-weight: 600; color: #111827;")
+        layout.addWidget(title)
+
+        canvas = FigureCanvasQTAgg(report.figure)
+        canvas.setMinimumSize(400, 300)
+        layout.addWidget(NavigationToolbar2QT(canvas, view))
+
+        chart_layout = QHBoxLayout()
+        chart_layout.addWidget(canvas, 3)
+        summary = QTextBrowser()
+        summary.setPlainText(report.summary)
+        chart_layout.addWidget(summary, 1)
+        layout.addLayout(chart_layout)
+
+        self._report_area.addWidget(view)
+
+    def _show_report_document(self, report):
+        """Shows a finished table report in a dialog."""
         dialog = QDialog(self)
-        dialog.setWindowTitle("All Appointments")
+        dialog.setWindowTitle(report.title)
         dialog.resize(900, 600)
         
         layout = QVBoxLayout()
         
         # Create text browser to display appointments
         text_browser = QTextBrowser()
-        
-        content = "<h2>All Appointments</h2>"
-        for year_month in sorted(appointments.keys()):
-            year, month = year_month.split('/')
-            month_names = ['', 'January', 'February', 'March', 'April', 'May', 'June',
-                        'July', 'August', 'September', 'October', 'November', 'December']
-            month_name = month_names[int(month)]
-            
-            content += f"<h3>{month_name} {year}</h3>"
-            content += "<table border='1' cellpadding='5' cellspacing='0' width='100%'>"
-            content += "<tr><th>Patient Name</th><th>Doctor Name</th><th>Appointment Date/Time</th></tr>"
-            
-            for appointment in appointments[year_month]:
-                content += f"<tr><td>{appointment['patient']}</td><td>{appointment['doctor']}</td><td>{appointment['datetime']}</td></tr>"
-            
-            content += "</table><br>"
-        
-        text_browser.setHtml(content)
+        text_browser.setHtml(report.html)
         layout.addWidget(text_browser)
         
         close_btn = QPushButton("Close")
@@ -1607,42 +1700,78 @@ class AdminWindow(QMainWindow):
         dialog.setLayout(layout)
         dialog.exec_()
 
+    def _report_total_doctors(self):
+        """Generate report for total number of doctors."""
+        self._start_report("total_doctors_report", list(self._doctors), self._report_aggregates())
+    
+    def _report_patients_per_doctor(self):
+        """Generate report for patients per doctor."""
+        self._start_report("patients_per_doctor_report", list(self._doctors), self._report_aggregates())
+    
+    def _report_appointments_per_month(self):
+        """Generate report for appointments per month per doctor."""
+        self._start_report("appointments_per_month_report", list(self._doctors), self._report_aggregates())
+    
+    def _report_patients_by_symptom(self):
+        """Generate report for patients by symptom type."""
+        self._start_report("patients_by_symptom_report", self._report_aggregates())
+    
+    def _report_patients_by_age(self):
+        """Generate report for patients per age group, with their symptoms."""
+        self._start_report("patients_by_age_report", self._patients, self._patient_index)
+    
+    def _report_all_appointments(self):
+        """Generate report showing all appointments."""
+        self._start_report("all_appointments_report", self._storage)
+
+    def _report_appointment_conflicts(self):
+        """Generate report listing the double-booked appointments of every doctor."""
+        self._start_report("appointment_conflicts_report", get_scheduler())
+
     def _relocate_doctor_inline(self):
-        """Relocate doctor or update appointment for a patient."""
-        selected_rows = self.patient_mgmt_table.selectionModel().selectedRows()
-        
-        if not selected_rows:
-            QMessageBox.warning(self, "No Selection", "Please select a patient.")
+        """Relocate the selected patients to another doctor, or update the appointment of one patient."""
+        rows = self._selected_patient_rows("Please select a patient.")
+        if not rows:
             return
         
-        row = selected_rows[0].row()
-        patient = self._patients[row]
-        
-        # Check if patient has a doctor assigned
-        if patient.get_doctor() == "None":
+        # Check if the patients have a doctor assigned; those without one are left alone
+        rows = [row for row in rows if self._patients[row].get_doctor() != "None"]
+        if not rows:
             QMessageBox.warning(
                 self, 
                 "No Doctor Assigned", 
                 "This patient has no doctor assigned yet. Please use 'Assign Doctor' first."
             )
             return
+        patients = [self._patients[row] for row in rows]
+        patient = patients[0]
         
-        # Ask what to do
+        # Ask what to do; appointments are updated one patient at a time
         msg = QMessageBox(self)
         msg.setWindowTitle("Relocate/Update Options")
-        msg.setText(f"Current doctor: Dr. {patient.get_doctor()}\n\nWhat would you like to do?")
+        if len(patients) == 1:
+            current = self._storage.appointment_index().current_for(patient.full_name(), patient.record_id)
+            current_appointment = current.datetime_text() if current else "No appointment"
+            msg.setText(f"Current doctor: Dr. {patient.get_doctor()}\n"
+                        f"Current appointment: {current_appointment}\n\nWhat would you like to do?")
+        else:
+            msg.setText(f"{len(patients)} patients with a doctor selected.\n\nWhat would you like to do?")
         relocate_btn = msg.addButton("Relocate to Different Doctor", QMessageBox.ActionRole)
-        update_btn = msg.addButton("Update Appointment Only", QMessageBox.ActionRole)
+        update_btn = msg.addButton("Update Appointment Only", QMessageBox.ActionRole) if len(patients) == 1 else None
         cancel_btn = msg.addButton("Cancel", QMessageBox.RejectRole)
         msg.exec_()
         
         if msg.clickedButton() == relocate_btn:
             # Relocate to different doctor
             doctor_names = [f"{i+1}. {d.full_name()} - {d.get_speciality()}" for i, d in enumerate(self._doctors)]
+            if len(patients) == 1:
+                selection = f"Patient symptoms: {', '.join(patient.get_symptoms())}"
+            else:
+                selection = f"{len(patients)} patients selected"
             doctor_name, ok = QInputDialog.getItem(
                 self,
                 "Select New Doctor",
-                f"Patient symptoms: {', '.join(patient.get_symptoms())}\n\nSelect new doctor:",
+                f"{selection}\n\nSelect new doctor:",
                 doctor_names,
                 0,
                 False
@@ -1657,12 +1786,14 @@ class AdminWindow(QMainWindow):
             # Get appointment details
             from datetime import datetime
             
+            suggested_date, suggested_time, slot_note = self._free_slot_defaults(new_doctor)
+
             date_str, ok = QInputDialog.getText(
                 self,
                 "Appointment Date",
-                "Enter appointment date (YYYY-MM-DD):",
+                f"Enter appointment date (YYYY-MM-DD):\n\n{slot_note}",
                 QLineEdit.Normal,
-                "2026-02-20"
+                suggested_date
             )
             
             if not ok:
@@ -1673,7 +1804,7 @@ class AdminWindow(QMainWindow):
                 "Appointment Time",
                 "Enter appointment time (HH:MM):",
                 QLineEdit.Normal,
-                "10:00"
+                suggested_time
             )
             
             if not ok:
@@ -1681,43 +1812,55 @@ class AdminWindow(QMainWindow):
             
             try:
                 appointment_date = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+                if not self._booking_confirmed(new_doctor.full_name(), new_doctor.record_id, appointment_date, patient):
+                    return
+                appointment_dates = self._consecutive_slots(new_doctor, appointment_date, len(patients))
+                if appointment_dates is None:
+                    return
                 
                 old_doctor_name = patient.get_doctor()
                 
-                # Update patient's doctor and appointment
-                patient.link(new_doctor.full_name(), appointment_date)
-                new_doctor.add_patient(patient.full_name())
-                
-                # Save appointment to file
-                appointment_file = f"{appointment_date.year}_appointments.txt"
-                import os
-                if not os.path.exists(appointment_file):
-                    with open(appointment_file, 'w') as f:
-                        f.write("Patient Name|Doctor Name|Appointment DateTime\n")
-                
-                with open(appointment_file, 'a') as f:
-                    f.write(f"{patient.full_name()}|{new_doctor.full_name()}|{appointment_date.strftime('%Y/%m/%d %H:%M')}\n")
-                
-                self._save_all_patients()
-                self._refresh_patient_table()
-                QMessageBox.information(
-                    self, 
-                    "Success", 
-                    f"Successfully relocated from Dr. {old_doctor_name} to Dr. {new_doctor.full_name()} on {appointment_date.strftime('%Y/%m/%d %H:%M')}"
-                )
+                # Update the patients' doctor and appointment
+                doctors_by_id = {doctor.record_id: doctor for doctor in self._doctors}
+                for patient, appointment_date in zip(patients, appointment_dates):
+                    old_doctor = doctors_by_id.get(patient.doctor_id)
+                    if old_doctor is not None:
+                        old_doctor.remove_patient(patient)
+                    patient.link(new_doctor.full_name(), appointment_date, new_doctor.record_id)
+                    new_doctor.add_patient(patient)
+                    new_doctor.add_appointment(appointment_date)
+
+                # Save the appointments and the updated patients, once for the whole selection
+                self._storage.add_appointments([(patient.full_name(), new_doctor.full_name(), appointment_date,
+                                                 patient.record_id, new_doctor.record_id)
+                                                for patient, appointment_date in zip(patients, appointment_dates)])
+                self._storage.update_patients(patients, self._patients)
+                for row, patient in zip(rows, patients):
+                    self._patient_index.update(patient)
+                    self._patient_model.row_changed(row)
+                if len(patients) == 1:
+                    message = (f"Successfully relocated from Dr. {old_doctor_name} to Dr. {new_doctor.full_name()} "
+                               f"on {appointment_date.strftime('%Y/%m/%d %H:%M')}")
+                else:
+                    message = (f"Successfully relocated {len(patients)} patients to Dr. {new_doctor.full_name()} "
+                               f"from {appointment_dates[0].strftime('%Y/%m/%d %H:%M')}")
+                QMessageBox.information(self, "Success", message)
             except ValueError as e:
                 QMessageBox.warning(self, "Invalid Date/Time", f"Please enter valid date and time.\nError: {e}")
         
-        elif msg.clickedButton() == update_btn:
+        elif update_btn is not None and msg.clickedButton() == update_btn:
             # Update appointment only
             from datetime import datetime
             
+            current_doctor = next((doctor for doctor in self._doctors if doctor.record_id == patient.doctor_id), None)
+            suggested_date, suggested_time, slot_note = self._free_slot_defaults(current_doctor, others=False)
+
             date_str, ok = QInputDialog.getText(
                 self,
                 "Appointment Date",
-                "Enter new appointment date (YYYY-MM-DD):",
+                f"Enter new appointment date (YYYY-MM-DD):\n\n{slot_note}",
                 QLineEdit.Normal,
-                "2026-02-20"
+                suggested_date
             )
             
             if not ok:
@@ -1728,7 +1871,7 @@ class AdminWindow(QMainWindow):
                 "Appointment Time",
                 "Enter new appointment time (HH:MM):",
                 QLineEdit.Normal,
-                "10:00"
+                suggested_time
             )
             
             if not ok:
@@ -1737,18 +1880,14 @@ class AdminWindow(QMainWindow):
             try:
                 appointment_date = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
                 doctor_name = patient.get_doctor()
+                if not self._booking_confirmed(doctor_name, patient.doctor_id, appointment_date, patient):
+                    return
                 
                 patient.appointment_date = appointment_date
                 
-                # Save updated appointment to file
-                appointment_file = f"{appointment_date.year}_appointments.txt"
-                import os
-                if not os.path.exists(appointment_file):
-                    with open(appointment_file, 'w') as f:
-                        f.write("Patient Name|Doctor Name|Appointment DateTime\n")
-                
-                with open(appointment_file, 'a') as f:
-                    f.write(f"{patient.full_name()}|{doctor_name}|{appointment_date.strftime('%Y/%m/%d %H:%M')} (Updated)\n")
+                # Save updated appointment
+                self._storage.add_appointment(patient.full_name(), doctor_name, appointment_date, updated=True,
+                                              patient_id=patient.record_id, doctor_id=patient.doctor_id)
                 
                 QMessageBox.information(
                     self, 
@@ -1822,6 +1961,10 @@ class AdminWindow(QMainWindow):
                 QMessageBox.warning(self, "Invalid Input", "Username cannot be empty.")
                 return
             
+            if not get_credentials().is_available(new_username, ADMIN_ROLE):
+                QMessageBox.warning(self, "Duplicate", "This username is already taken.")
+                return
+
             # Update admin username
             from Main import load_admin
             admin = load_admin()
@@ -1848,7 +1991,7 @@ class AdminWindow(QMainWindow):
         # Verify current password
         from Main import load_admin
         admin = load_admin()
-        if current_password != admin.get_password():
+        if get_credentials().authenticate(admin.get_username(), current_password) is None:
             QMessageBox.warning(self, "Error", "Current password is incorrect.")
             return
         
@@ -1909,43 +2052,31 @@ class AdminWindow(QMainWindow):
         self.lcdNumber.display(len(self._doctors))
         self.lcdNumber_2.display(len(self._patients))
 
-        header = self.tableWidget.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.Stretch)
-
-        self.tableWidget.setRowCount(len(self._doctors))
-        for row_index, doctor in enumerate(self._doctors):
-            self.tableWidget.setItem(row_index, 0, QTableWidgetItem(str(row_index + 1)))
-            self.tableWidget.setItem(row_index, 1, QTableWidgetItem(doctor.full_name()))
-            self.tableWidget.setItem(row_index, 2, QTableWidgetItem(doctor.get_speciality()))
+        self.tableWidget.setModel(ObjectTableModel(self._doctors, [("S.N.", None)] + DOCTOR_COLUMNS[1:3], self))
+        self.tableWidget.setEditTriggers(QTableView.NoEditTriggers)
+        self.tableWidget.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
 
 
 class LoginWindow(QMainWindow):
-    def __init__(self, loading_screen=None):
+    def __init__(self, admin, doctors, patients, patient_index=None):
+        """
+        Args:
+            admin (Admin): The administrator.
+            doctors (list): Loaded doctors.
+            patients (list): Loaded patients.
+            patient_index (PatientIndex): Lookups over patients shared by the
+                windows opened from here; built from patients when not given.
+        """
         super().__init__()
         uic.loadUi(LOGIN_UI, self)
         self.lineEdit_3.setEchoMode(QtWidgets.QLineEdit.Password)
         self.pushButton.clicked.connect(self._handle_login)
 
-        # Load data with progress updates
-        if loading_screen:
-            loading_screen.update_progress(20, "Loading administrator data...")
-            time.sleep(0.5)  # Delay to show progress
-        self._admin = load_admin()
-        
-        if loading_screen:
-            loading_screen.update_progress(50, "Loading doctors data...")
-            time.sleep(0.5)  # Delay to show progress
-        self._doctors = load_doctors()
-        
-        if loading_screen:
-            loading_screen.update_progress(80, "Loading patients data...")
-            time.sleep(0.5)  # Delay to show progress
-        self._patients = self._load_patients()
-        
-        if loading_screen:
-            loading_screen.update_progress(100, "Loading complete!")
-            time.sleep(0.3)  # Brief pause before closing
-
+        self._admin = admin
+        self._doctors = doctors
+        self._registry = Registry(doctors)
+        self._patients = patients
+        self._patient_index = patient_index if patient_index is not None else PatientIndex(patients)
         self._admin_window = None
 
     def closeEvent(self, event):
@@ -1953,12 +2084,6 @@ class LoginWindow(QMainWindow):
         QtWidgets.QApplication.quit()
         event.accept()
 
-    def _load_patients(self):
-        patients_file = os.path.join(BASE_DIR, "patients_file.txt")
-        if not os.path.exists(patients_file) or os.path.getsize(patients_file) == 0:
-            return []
-        return Patient.read_patient_records(patients_file)
-
     def _handle_login(self):
         username = self.lineEdit.text().strip()
         password = self.lineEdit_3.text().strip()
@@ -1967,15 +2092,21 @@ class LoginWindow(QMainWindow):
             QMessageBox.warning(self, "Login Failed", "Please enter username and password.")
             return
 
-        if self._admin.get_username() == username and self._admin.get_password() == password:
-            self._admin_window = AdminWindow(self._doctors, self._patients, parent=self)
+        login = get_credentials().authenticate(username, password)
+        if login is not None and login.role == ADMIN_ROLE:
+            self._admin_window = AdminWindow(self._doctors, self._patients, self._patient_index, parent=self)
             self._admin_window.show()
             self.hide()
             return
 
-        for doctor in self._doctors:
-            if doctor.get_username() == username and doctor.get_password() == password:
-                self._doctor_window = DoctorWindow(doctor, self._patients, parent=self)
+        if login is not None:
+            doctor = self._registry.doctor(login.record_id)
+            if doctor is None:
+                # Registered since the login window was opened
+                self._registry = Registry(self._doctors)
+                doctor = self._registry.doctor(login.record_id)
+            if doctor is not None:
+                self._doctor_window = DoctorWindow(doctor, self._patients, self._patient_index, parent=self)
                 self._doctor_window.show()
                 self.hide()
                 return
@@ -1987,21 +2118,32 @@ def main():
     app = QtWidgets.QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)  # Prevent app from quitting when matplotlib figures close
     
-    # Show loading screen
+    # Show loading screen while the data loads on a worker thread
     loading_screen = LoadingScreen()
     loading_screen.show()
-    loading_screen.update_progress(10, "Initializing application...")
-    QtWidgets.QApplication.processEvents()
-    time.sleep(0.5)  # Initial delay
-    
-    # Load main window with progress updates
-    window = LoginWindow(loading_screen)
-    
-    # Close loading screen and show login window
-    loading_screen.close()
-    window.show()
-    
-    sys.exit(app.exec_())
+    loading_screen.update_progress(0, "Initializing application...")
+    windows = []
+
+    def show_login(admin, doctors, patients, patient_index):
+        window = LoginWindow(admin, doctors, patients, patient_index)
+        windows.append(window)
+        loading_screen.close()
+        window.show()
+
+    def show_error(message):
+        loading_screen.close()
+        QMessageBox.critical(None, "Loading Failed", f"Could not load the hospital data:\n{message}")
+        app.quit()
+
+    loader = DataLoader()
+    loader.progress.connect(loading_screen.update_progress)
+    loader.loaded.connect(show_login)
+    loader.failed.connect(show_error)
+    loader.start()
+
+    exit_code = app.exec_()
+    loader.wait()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":